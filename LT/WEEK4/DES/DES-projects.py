@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import sys, os
 #sys.path.append(os.getcwd())
+# The modes come from the shared ciphermodes package (python -m pip install -e LT/ciphermodes);
+# without the install, mypackages uses the sources in LT/ciphermodes.
 from mypackages import DES, modes
 DEFAULT_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)))
@@ -18,34 +20,95 @@ def bin_to_message(binary_message):
         byte_array.append(int(byte, 2))
     return byte_array.decode('utf-8')
 
+def is_binary_string(text):
+    """Ciphertext printed by the old string API: '0'/'1' characters, whole 64-bit blocks."""
+    return len(text) > 0 and len(text) % 64 == 0 and set(text) <= {"0", "1"}
+
 def main(key, encrypt, decrypt):
-    # Convert the key to binary format (assuming key is given as a string)
-    binary_key = ''.join(format(ord(i), '08b') for i in key)
-    # Create a DES instance with the given key
-    ecb_instance = modes.DES_ECB.ecb_instance(binary_key)
-   
+    try:
+        crypt_message(key, encrypt, decrypt)
+    except ValueError as error:
+        # Bad key length, bad hex, bad padding or a result that is not UTF-8
+        print("Error:", error)
+
+def crypt_message(key, encrypt, decrypt):
+    # DES on bytes: the message is never expanded to a '0'/'1' string
+    ecb_instance = modes.bytes_modes(key, "ECB")
+
     # Check if the user wants to encrypt
     if encrypt=="yes":
         plaintext = input("Enter the plaintext message (UTF-8): ")
-        # Convert plaintext to binary format
-        binary_plaintext = message_to_bin(plaintext)
-        print("tex binary:", len(binary_plaintext))
-        # Encrypt using the desired mode (e.g., ECB)
-        ciphertext = ecb_instance.encrypt(binary_plaintext)  # Adjust as per your modes.py structure
-        print("Encrypted Ciphertext:", ciphertext)
+        ciphertext = ecb_instance.encrypt("ECB", plaintext)
+        print("Encrypted Ciphertext (hex):", ciphertext.hex())
 
     # Check if the user wants to decrypt
     if decrypt=="yes":
-        ciphertext = input("Enter the ciphertext: ")
-        # Decrypt using the desired mode (e.g., ECB)
-        decrypted_bỉnary = ecb_instance.decrypt(ciphertext)  # Adjust as per your modes.py structure
-        decrypted_text = bin_to_message(decrypted_bỉnary)
+        ciphertext = input("Enter the ciphertext (hex): ").strip()
+        if is_binary_string(ciphertext):
+            # Output of the string API (modes.DES_ECB)
+            binary_key = ''.join(format(ord(i), '08b') for i in key)
+            decrypted_text = bin_to_message(modes.DES_ECB.ecb_instance(binary_key).decrypt(ciphertext))
+        else:
+            decrypted_text = ecb_instance.decrypt("ECB", bytes.fromhex(ciphertext)).decode('utf-8')
         print("plaintex: ", decrypted_text)
+
+# Bytes read per step when streaming a file through the cipher
+CHUNK_SIZE = 1 << 20
+
+def process_file(input_path, output_path, des_mode_obj, operation):
+    """
+    Stream a file (binary) through DES/3DES, CHUNK_SIZE bytes at a time,
+    so memory stays constant for any file size (e.g. LAB/LAB1-GROUP5/random_1M.txt).
+    If decryption fails (bad key or padding) the output file is removed.
+    """
+    if operation == "encrypt":
+        cipher = des_mode_obj.encryptor()
+    else:
+        cipher = des_mode_obj.decryptor()
+    with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+        try:
+            while True:
+                chunk = f_in.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f_out.write(cipher.update(chunk))
+            f_out.write(cipher.finalize())
+        except BaseException:
+            # Bad key or damaged ciphertext: don't leave a partial output file
+            f_out.close()
+            os.remove(output_path)
+            raise
+    print(f"Done! {operation.title()}ed file saved as: {output_path}")
+
+def file_main(operation):
+    key = input("Enter the key (8 characters for DES, 16 or 24 for 3DES): ")
+    mode = input("Enter the mode (ECB/CBC/CFB/OFB/CTR): ").strip().upper()
+    if mode not in ("ECB", "CBC", "CFB", "OFB", "CTR"):
+        print("Invalid mode.")
+        return
+    input_file = input("Enter input file path: ").strip()
+    if not os.path.isfile(input_file):
+        print(f"Error: File '{input_file}' does not exist.")
+        return
+    if operation == "encrypt":
+        output_file = input_file + ".enc"
+    elif input_file.lower().endswith(".enc"):
+        output_file = input_file[:-4]
+    else:
+        output_file = input_file + ".dec"
+    try:
+        process_file(input_file, output_file, modes.bytes_modes(key, mode), operation)
+    except ValueError as error:
+        # Bad key length, or a ciphertext with a bad length or padding
+        print("Error:", error)
+
 def user_selection():
     print("Please select an option:")
     print("1. Encrypt Message")
     print("2. Decrypt Message")
-    choice = input("Enter your choice (1/2): ")
+    print("3. Encrypt File")
+    print("4. Decrypt File")
+    choice = input("Enter your choice (1/2/3/4): ")
 
     if choice == "1":
         key = input("Enter the DES key (8 characters): ")
@@ -53,7 +116,11 @@ def user_selection():
     elif choice == "2":
         key = input("Enter the DES key (8 characters): ")
         main(key, encrypt ="no", decrypt="yes")
+    elif choice == "3":
+        file_main("encrypt")
+    elif choice == "4":
+        file_main("decrypt")
     else:
         print("Invalid choice. Please select a valid option.")
 if __name__ == "__main__":
-    user_selection()
\ No newline at end of file
+    user_selection()
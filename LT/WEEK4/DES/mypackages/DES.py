@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import struct
+from functools import lru_cache
+
 class DES:
     # Initial permutation table
     # Permutation Choice 1
@@ -30,9 +33,35 @@ class DES:
         return data[shifts:] + data[:shifts]
 
 
-    def __init__(self, key):
+    def __init__(self, key, engine="integer"):
+        """
+        'key' is a 64-character '0'/'1' string.
+        'engine' selects the block function used by encrypt()/decrypt():
+          - "integer"   : 64-bit ints, byte-indexed IP/FP/E tables and combined SP tables (default)
+          - "reference" : the step-by-step string functions below
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown DES engine: {engine}")
         self.key = key
-        self.subkeys = self.generate_subkeys(key)
+        self.engine = engine
+        if engine == "reference":
+            self.subkeys = self.generate_subkeys(key)
+            self.round_keys = [int(subkey, 2) for subkey in self.subkeys]
+        else:
+            # Table-driven schedule, shared by every instance with the same key
+            self.round_keys = key_schedule(int(key, 2))
+            self._subkeys = None
+
+    @property
+    def subkeys(self):
+        """The 16 subkeys as 48-character '0'/'1' strings, built from round_keys on first use."""
+        if self._subkeys is None:
+            self._subkeys = [format(k, '048b') for k in self.round_keys]
+        return self._subkeys
+
+    @subkeys.setter
+    def subkeys(self, value):
+        self._subkeys = value
 
     def generate_subkeys(self, key):
         # Apply PC-1 permutation on the key
@@ -212,6 +241,18 @@ class DES:
     
     ##################Encryption one block (64 bits)
     def encrypt(self, plaintext):
+        """Encrypt one block given as a 64-character '0'/'1' string."""
+        if self.engine == "reference":
+            return self.encrypt_reference(plaintext)
+        return format(self.encrypt_int(int(plaintext, 2)), '064b')
+
+    def decrypt(self, ciphertext):
+        """Decrypt one block given as a 64-character '0'/'1' string."""
+        if self.engine == "reference":
+            return self.decrypt_reference(ciphertext)
+        return format(self.decrypt_int(int(ciphertext, 2)), '064b')
+
+    def encrypt_reference(self, plaintext):
         # Step 1: Initial Permutation
         permuted_block = self.initial_permutation(plaintext)
 
@@ -231,7 +272,7 @@ class DES:
 
         return ciphertext
     ##################Decryption one block (64 bits)
-    def decrypt(self, ciphertext):
+    def decrypt_reference(self, ciphertext):
         # Step 1: Initial Permutation
         permuted_block = self.initial_permutation(ciphertext)
 
@@ -254,5 +295,167 @@ class DES:
     ################## XOR helper function for CBC
     def xor(self, block1, block2):
         return ''.join(['1' if b1 != b2 else '0' for b1, b2 in zip(block1, block2)])
-# Usage:
 
+    ################## Integer engine (one block as a 64-bit int)
+    def encrypt_int(self, block):
+        """
+        Encrypt a block given as a 64-bit int (bit 1 of the tables = most significant bit).
+        Each round is the E expansion (4 byte lookups), the subkey XOR and the
+        S-boxes with P folded in (8 SP lookups).
+        """
+        e0, e1, e2, e3 = E_TABLES
+        sp0, sp1, sp2, sp3, sp4, sp5, sp6, sp7 = SP_TABLES
+        x = initial_permutation_int(block)
+        left, right = x >> 32, x & 0xffffffff
+        for k in self.round_keys:
+            e = (e0[right >> 24] | e1[(right >> 16) & 0xff] | e2[(right >> 8) & 0xff] | e3[right & 0xff]) ^ k
+            left, right = right, left ^ (
+                sp0[e >> 42] ^ sp1[(e >> 36) & 0x3f] ^ sp2[(e >> 30) & 0x3f] ^ sp3[(e >> 24) & 0x3f]
+                ^ sp4[(e >> 18) & 0x3f] ^ sp5[(e >> 12) & 0x3f] ^ sp6[(e >> 6) & 0x3f] ^ sp7[e & 0x3f])
+        # Halves are combined without a final swap, as in encrypt_reference()
+        return final_permutation_int((left << 32) | right)
+
+    def decrypt_int(self, block):
+        """Decrypt a block given as a 64-bit int (inverse of encrypt_int)."""
+        e0, e1, e2, e3 = E_TABLES
+        sp0, sp1, sp2, sp3, sp4, sp5, sp6, sp7 = SP_TABLES
+        x = initial_permutation_int(block)
+        left, right = x >> 32, x & 0xffffffff
+        for k in reversed(self.round_keys):
+            e = (e0[left >> 24] | e1[(left >> 16) & 0xff] | e2[(left >> 8) & 0xff] | e3[left & 0xff]) ^ k
+            left, right = right ^ (
+                sp0[e >> 42] ^ sp1[(e >> 36) & 0x3f] ^ sp2[(e >> 30) & 0x3f] ^ sp3[(e >> 24) & 0x3f]
+                ^ sp4[(e >> 18) & 0x3f] ^ sp5[(e >> 12) & 0x3f] ^ sp6[(e >> 6) & 0x3f] ^ sp7[e & 0x3f]), left
+        return final_permutation_int((left << 32) | right)
+
+    ################## Bulk bytes API
+    def encrypt_blocks(self, data):
+        """Encrypt whole 8-byte blocks of a bytes-like object; returns bytes."""
+        return crypt_blocks(self.encrypt_int, data)
+
+    def decrypt_blocks(self, data):
+        """Decrypt whole 8-byte blocks of a bytes-like object; returns bytes."""
+        return crypt_blocks(self.decrypt_int, data)
+
+
+################ Integer engine tables
+# A bit permutation is split into one table per input byte: the output is the
+# OR of 8 (IP/FP) or 4 (E) lookups. Each SP table merges one S-box with the
+# P permutation, so the round function is 8 lookups XORed together.
+ENGINES = ("integer", "reference")
+# Blocks converted per struct call in crypt_blocks()
+BULK_BLOCKS = 1 << 12
+
+def permute_int(value, table, in_bits):
+    """Bit permutation on ints with the 1-based tables above (bit 1 = most significant)."""
+    out = 0
+    for src in table:
+        out = (out << 1) | ((value >> (in_bits - src)) & 1)
+    return out
+
+def build_byte_tables(table, in_bits):
+    """tables[j][v] = permute_int of an input whose only set bits are byte j (0 = most significant) = v."""
+    return [[permute_int(v << (in_bits - 8 - 8 * j), table, in_bits) for v in range(256)]
+            for j in range(in_bits // 8)]
+
+def build_sp_tables(sboxes, p_table):
+    """
+    SP[i][b] = P applied to the 4-bit output of S-box i for the 6-bit input b,
+    placed at its position in the 32-bit S-box output.
+    """
+    tables = []
+    for i, sbox in enumerate(sboxes):
+        row = []
+        for b in range(64):
+            # Outer bits select the row, the middle four the column
+            s = sbox[((b >> 4) & 2) | (b & 1)][(b >> 1) & 0xf]
+            row.append(permute_int(s << (28 - 4 * i), p_table, 32))
+        tables.append(row)
+    return tables
+
+IP_TABLES = build_byte_tables(DES.IP, 64)
+FP_TABLES = build_byte_tables(DES.FP, 64)
+E_TABLES = build_byte_tables(DES.E, 32)
+SP_TABLES = build_sp_tables(DES.S, DES.P)
+
+def initial_permutation_int(block):
+    t = IP_TABLES
+    return (t[0][block >> 56] | t[1][(block >> 48) & 0xff] | t[2][(block >> 40) & 0xff] | t[3][(block >> 32) & 0xff]
+            | t[4][(block >> 24) & 0xff] | t[5][(block >> 16) & 0xff] | t[6][(block >> 8) & 0xff] | t[7][block & 0xff])
+
+def final_permutation_int(block):
+    t = FP_TABLES
+    return (t[0][block >> 56] | t[1][(block >> 48) & 0xff] | t[2][(block >> 40) & 0xff] | t[3][(block >> 32) & 0xff]
+            | t[4][(block >> 24) & 0xff] | t[5][(block >> 16) & 0xff] | t[6][(block >> 8) & 0xff] | t[7][block & 0xff])
+
+def crypt_blocks(crypt_int, data):
+    """Apply a 64-bit block function to every 8-byte block of 'data' (big-endian)."""
+    if len(data) % 8:
+        raise ValueError("Data length must be a multiple of 8 bytes (64-bit blocks).")
+    data = memoryview(data).cast('B')
+    out = bytearray(len(data))
+    for start in range(0, len(data), 8 * BULK_BLOCKS):
+        chunk = data[start:start + 8 * BULK_BLOCKS]
+        count = len(chunk) // 8
+        struct.pack_into(f'>{count}Q', out, start, *map(crypt_int, struct.unpack(f'>{count}Q', chunk)))
+    return bytes(out)
+
+
+################ Key schedule on 28-bit halves
+# PC-1 and PC-2 are byte-indexed tables like IP/FP above: PC-1 maps the 64-bit
+# key to C||D (56 bits), PC-2 maps the 56-bit C||D to a 48-bit round key.
+# Every round key bit is a copy of one key bit, so the whole schedule is also
+# split into one table per key byte: SCHEDULE_TABLES[j][v] holds the 16 round
+# keys (48 bits each, round 1 first) of a key whose only set bits are byte j = v.
+PC1_TABLES = build_byte_tables(DES.PC1, 64)
+PC2_TABLES = build_byte_tables(DES.PC2, 56)
+ROUND_KEY_SHIFTS = [48 * (15 - r) for r in range(16)]
+# Distinct keys whose schedules are kept by key_schedule()
+KEY_SCHEDULE_CACHE_SIZE = 1 << 10
+
+def expand_key_halves(key):
+    """The 16 round keys (48-bit ints) of a 64-bit key, rotating C and D as 28-bit ints."""
+    t = PC1_TABLES
+    cd = (t[0][key >> 56] | t[1][(key >> 48) & 0xff] | t[2][(key >> 40) & 0xff] | t[3][(key >> 32) & 0xff]
+          | t[4][(key >> 24) & 0xff] | t[5][(key >> 16) & 0xff] | t[6][(key >> 8) & 0xff] | t[7][key & 0xff])
+    c, d = cd >> 28, cd & 0xfffffff
+    p0, p1, p2, p3, p4, p5, p6 = PC2_TABLES
+    round_keys = []
+    for shift in DES.LEFT_ROTATIONS:
+        c = ((c << shift) | (c >> (28 - shift))) & 0xfffffff
+        d = ((d << shift) | (d >> (28 - shift))) & 0xfffffff
+        # C||D bytes, most significant first: C holds bytes 0-2 and the high nibble of byte 3
+        round_keys.append(p0[c >> 20] | p1[(c >> 12) & 0xff] | p2[(c >> 4) & 0xff]
+                          | p3[((c & 0xf) << 4) | (d >> 24)]
+                          | p4[(d >> 16) & 0xff] | p5[(d >> 8) & 0xff] | p6[d & 0xff])
+    return round_keys
+
+def build_schedule_tables():
+    tables = []
+    for j in range(8):
+        row = []
+        for v in range(256):
+            packed = 0
+            for k in expand_key_halves(v << (56 - 8 * j)):
+                packed = (packed << 48) | k
+            row.append(packed)
+        tables.append(row)
+    return tables
+
+SCHEDULE_TABLES = build_schedule_tables()
+
+def expand_key_int(key):
+    """The 16 round keys of a 64-bit key: 8 lookups, then the 48-bit fields are split off."""
+    t = SCHEDULE_TABLES
+    packed = (t[0][key >> 56] | t[1][(key >> 48) & 0xff] | t[2][(key >> 40) & 0xff] | t[3][(key >> 32) & 0xff]
+              | t[4][(key >> 24) & 0xff] | t[5][(key >> 16) & 0xff] | t[6][(key >> 8) & 0xff] | t[7][key & 0xff])
+    mask = (1 << 48) - 1
+    return [(packed >> shift) & mask for shift in ROUND_KEY_SHIFTS]
+
+@lru_cache(maxsize=KEY_SCHEDULE_CACHE_SIZE)
+def key_schedule(key):
+    """
+    Round keys of a 64-bit int key as a tuple (same values as generate_subkeys()),
+    memoized in a bounded LRU cache (key_schedule.cache_info() / key_schedule.cache_clear()).
+    """
+    return tuple(expand_key_int(key))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+DES course package. The block-cipher modes come from the shared ciphermodes
+package (LT/ciphermodes); install it once with
+    python -m pip install -e LT/ciphermodes
+If it is not installed, the sources in LT/ciphermodes next to this course
+folder are put on sys.path, so the scripts here still run on their own.
+"""
+try:
+    import ciphermodes  # noqa: F401
+except ImportError:
+    import os
+    import sys
+    # LT/ciphermodes, relative to this folder
+    SHARED_PATH = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), *[os.pardir] * 3, "ciphermodes"))
+    if not os.path.isdir(os.path.join(SHARED_PATH, "ciphermodes")):
+        raise ImportError("The ciphermodes package is required: "
+                          "python -m pip install -e LT/ciphermodes") from None
+    sys.path.append(SHARED_PATH)
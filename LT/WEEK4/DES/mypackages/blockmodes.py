@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+DES and 3DES on the shared block-cipher mode layer (the ciphermodes package,
+LT/ciphermodes): ECB/CBC/CFB/OFB/CTR, streaming update()/finalize(), dedup
+ECB, keystream prefetch, asyncio streaming and the multi-process paths, all
+with 8-byte blocks.
+
+    m = des_modes(key)                  # 8-byte key; triple_des_modes(16 or 24 bytes)
+    ct = m.encrypt("CBC", data)         # IV (8 bytes) || ciphertext
+    pt = m.decrypt("CBC", ct)
+
+Blocks go through the integer DES engine; with NumPy, the modes whose blocks
+are independent (ECB, CTR, CBC/CFB decryption) use the vectorized engine.
+"""
+from ciphermodes.blockmodes import BlockModes, BulkBlockCipher
+from .DES import DES
+try:
+    from .des_numpy import DESNumpy, TripleDESNumpy
+except ImportError:  # NumPy is optional; fall back to the integer engine per block
+    DESNumpy = TripleDESNumpy = None
+
+BLOCK_SIZE = 8
+
+
+def bytes_to_bits(data):
+    """8 bytes -> the 64-character '0'/'1' string used by the DES class."""
+    return format(int.from_bytes(data, 'big'), '064b')
+
+
+def bits_to_bytes(bits):
+    return int(bits, 2).to_bytes(BLOCK_SIZE, 'big')
+
+
+class DESCipher(BulkBlockCipher):
+    """DES over bytes: 'key' is 8 bytes (parity bits ignored)."""
+    block_size = BLOCK_SIZE
+    name = "DES"
+
+    def __init__(self, key):
+        if len(key) != 8:
+            raise ValueError("Invalid DES key length. The key must be 8 bytes (64 bits).")
+        self.key = bytes(key)
+        self.des = DES(bytes_to_bits(self.key))
+
+    def encrypt_blocks(self, data):
+        return self.des.encrypt_blocks(data)
+
+    def decrypt_blocks(self, data):
+        return self.des.decrypt_blocks(data)
+
+    def batch_engine(self):
+        return DESNumpy(self.des)
+
+
+class TripleDESCipher(BulkBlockCipher):
+    """
+    3DES (EDE): C = E_K3(D_K2(E_K1(P))). 'key' is K1 || K2 || K3 (24 bytes)
+    or K1 || K2 (16 bytes, K3 = K1).
+    """
+    block_size = BLOCK_SIZE
+    name = "3DES"
+
+    def __init__(self, key):
+        if len(key) not in [16, 24]:
+            raise ValueError("Invalid 3DES key length. Supported lengths are 128 and 192 bits.")
+        self.key = bytes(key)
+        k1, k2 = self.key[:8], self.key[8:16]
+        k3 = self.key[16:] or k1
+        self.stages = DESCipher(k1), DESCipher(k2), DESCipher(k3)
+
+    def encrypt_blocks(self, data):
+        first, second, third = self.stages
+        return third.encrypt_blocks(second.decrypt_blocks(first.encrypt_blocks(data)))
+
+    def decrypt_blocks(self, data):
+        first, second, third = self.stages
+        return first.decrypt_blocks(second.encrypt_blocks(third.decrypt_blocks(data)))
+
+    def batch_engine(self):
+        return TripleDESNumpy(*(stage.des for stage in self.stages))
+
+
+def block_modes(cipher, batch=True):
+    """
+    BlockModes for 'cipher'; 'batch' runs independent blocks through the NumPy engine.
+    Its one-shot encrypt() / decrypt() return a bytearray (see ciphermodes.blockmodes).
+    """
+    return BlockModes(cipher, cipher.batch_engine() if batch and DESNumpy is not None else None)
+
+
+def des_modes(key, batch=True):
+    return block_modes(DESCipher(key), batch)
+
+
+def triple_des_modes(key, batch=True):
+    return block_modes(TripleDESCipher(key), batch)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized DES over many blocks at once (NumPy), with the tables of the
+integer engine in DES.py.
+
+Blocks are given as an (N,8) uint8 array; internally each block is a
+big-endian 64-bit word. The byte-indexed IP/FP/E tables are indexed with a
+whole column of bytes at once and every round runs on all N blocks.
+expand_keys() runs the key schedule the same way for many keys, and
+DESKeyBatch encrypts block i under key i (key search, per-record keys).
+"""
+import numpy as np
+from .DES import DES, IP_TABLES, FP_TABLES, E_TABLES, SP_TABLES, PC1_TABLES, PC2_TABLES
+
+BLOCK_SIZE = 8
+IP = np.array(IP_TABLES, dtype=np.uint64)
+FP = np.array(FP_TABLES, dtype=np.uint64)
+E = np.array(E_TABLES, dtype=np.uint64)
+SP = np.array(SP_TABLES, dtype=np.uint64)
+PC1 = np.array(PC1_TABLES, dtype=np.uint64)
+PC2 = np.array(PC2_TABLES, dtype=np.uint64)
+SIX_BITS = np.uint64(0x3f)
+BYTE = np.uint64(0xff)
+LOW_32 = np.uint64(0xffffffff)
+# Shifts that pick byte j (0 = most significant) of a 64-bit word / S-box input i of a 48-bit value
+BYTE_SHIFTS = [np.uint64(56 - 8 * j) for j in range(8)]
+SIX_SHIFTS = [np.uint64(42 - 6 * i) for i in range(8)]
+SHIFT_32 = np.uint64(32)
+LOW_28 = np.uint64(0xfffffff)
+SHIFT_28 = np.uint64(28)
+# Byte j of a 56-bit C||D value
+PC2_SHIFTS = [np.uint64(48 - 8 * j) for j in range(7)]
+
+# Blocks processed per batch, bounds the temporary arrays to a few MB
+BATCH_BLOCKS = 1 << 16
+
+
+def permute_words(words, tables):
+    """OR of the byte-indexed lookups: the IP or FP permutation of uint64 words."""
+    out = tables[0][words >> BYTE_SHIFTS[0]]
+    for j in range(1, 8):
+        out |= tables[j][(words >> BYTE_SHIFTS[j]) & BYTE]
+    return out
+
+
+def feistel(half, k):
+    """f(half, k) on uint64 arrays holding 32-bit halves: E, subkey XOR, 8 SP lookups."""
+    e = E[0][half >> BYTE_SHIFTS[4]] | E[1][(half >> BYTE_SHIFTS[5]) & BYTE] \
+        | E[2][(half >> BYTE_SHIFTS[6]) & BYTE] | E[3][half & BYTE]
+    e ^= k
+    f = SP[0][e >> SIX_SHIFTS[0]]
+    for i in range(1, 8):
+        f ^= SP[i][(e >> SIX_SHIFTS[i]) & SIX_BITS]
+    return f
+
+
+def encrypt_words(words, round_keys):
+    """DES on an array of words; each round key is a scalar or broadcasts against 'words'."""
+    x = permute_words(words, IP)
+    left, right = x >> SHIFT_32, x & LOW_32
+    for k in round_keys:
+        left, right = right, left ^ feistel(right, k)
+    # No swap before FP, as in the integer engine
+    return permute_words((left << SHIFT_32) | right, FP)
+
+
+def decrypt_words(words, round_keys):
+    x = permute_words(words, IP)
+    left, right = x >> SHIFT_32, x & LOW_32
+    for k in round_keys[::-1]:
+        left, right = right ^ feistel(left, k), left
+    return permute_words((left << SHIFT_32) | right, FP)
+
+
+def as_words(blocks):
+    """(N,8) uint8 array or bytes-like data -> (N,) uint64 array of big-endian words."""
+    if isinstance(blocks, np.ndarray):
+        blocks = np.ascontiguousarray(blocks, dtype=np.uint8)
+    return np.frombuffer(blocks, dtype='>u8').astype(np.uint64)
+
+
+def from_words(words):
+    return words.astype('>u8').view(np.uint8).reshape(-1, BLOCK_SIZE)
+
+
+class DESNumpy:
+    # Below this many blocks the integer engine is faster than setting up arrays
+    min_blocks = 16
+
+    def __init__(self, des):
+        """
+        'des' is a DES instance; its 48-bit round keys are reused.
+        """
+        self.des = des
+        self.round_keys = [np.uint64(k) for k in des.round_keys]
+
+    def encrypt_words(self, words):
+        return encrypt_words(words, self.round_keys)
+
+    def decrypt_words(self, words):
+        return decrypt_words(words, self.round_keys)
+
+    def encrypt_blocks(self, blocks):
+        """Encrypt an (N,8) uint8 array of independent blocks. Returns a new (N,8) array."""
+        return self.crypt_blocks(self.encrypt_words, blocks)
+
+    def decrypt_blocks(self, blocks):
+        """Decrypt an (N,8) uint8 array of independent blocks. Returns a new (N,8) array."""
+        return self.crypt_blocks(self.decrypt_words, blocks)
+
+    @staticmethod
+    def crypt_blocks(crypt_words, blocks):
+        words = as_words(blocks)
+        out = np.empty_like(words)
+        for i in range(0, len(words), BATCH_BLOCKS):
+            out[i:i + BATCH_BLOCKS] = crypt_words(words[i:i + BATCH_BLOCKS])
+        return from_words(out)
+
+    def ctr_keystream(self, iv, num_blocks):
+        """
+        Keystream for CTR mode: E(IV), E(IV+1), ... as an (N,8) array.
+        The counter is the IV read as a 64-bit big-endian integer (wraps mod 2^64).
+        """
+        counters = np.uint64(int.from_bytes(iv[:BLOCK_SIZE], 'big')) + np.arange(num_blocks, dtype=np.uint64)
+        return self.crypt_blocks(self.encrypt_words, from_words(counters))
+
+
+class TripleDESNumpy(DESNumpy):
+    """3DES (EDE) batch engine over the three DES stages of a TripleDESCipher."""
+
+    def __init__(self, first, second, third):
+        self.stages = DESNumpy(first), DESNumpy(second), DESNumpy(third)
+
+    def encrypt_words(self, words):
+        first, second, third = self.stages
+        return third.encrypt_words(second.decrypt_words(first.encrypt_words(words)))
+
+    def decrypt_words(self, words):
+        first, second, third = self.stages
+        return first.decrypt_words(second.encrypt_words(third.decrypt_words(words)))
+
+
+class DESKeyBatch:
+    """
+    Many DES keys at once: all K key schedules are expanded together, and
+    block i is encrypted under key i in one vectorized pass.
+
+        batch = DESKeyBatch(keys)             # (K,8) uint8 or a sequence of 8-byte keys
+        out = batch.encrypt_blocks(blocks)    # (K,8) -> (K,8), or (K,M,8) -> (K,M,8)
+    """
+
+    def __init__(self, keys):
+        keys = as_keys(keys)
+        self.num_keys = len(keys)
+        # (16, K, 1): broadcasts over the M blocks of each key
+        self.round_keys = expand_keys(keys)[:, :, None]
+
+    def _words(self, blocks):
+        """Blocks as a (K, M) array of words."""
+        blocks = np.asarray(blocks, dtype=np.uint8)
+        if blocks.shape[0] != self.num_keys or blocks.shape[-1] != BLOCK_SIZE:
+            raise ValueError(f"Expected blocks of shape ({self.num_keys},8) or ({self.num_keys},M,8).")
+        return as_words(blocks).reshape(self.num_keys, -1)
+
+    def encrypt_blocks(self, blocks):
+        """Encrypt block(s) i under key i; returns an array of the same shape."""
+        return from_words(encrypt_words(self._words(blocks), self.round_keys)).reshape(np.shape(blocks))
+
+    def decrypt_blocks(self, blocks):
+        """Decrypt block(s) i under key i; returns an array of the same shape."""
+        return from_words(decrypt_words(self._words(blocks), self.round_keys)).reshape(np.shape(blocks))
+
+
+def as_keys(keys):
+    """A sequence of 8-byte keys or an array as a (K,8) uint8 array."""
+    if not isinstance(keys, np.ndarray):
+        keys = np.frombuffer(b''.join(bytes(k) for k in keys), dtype=np.uint8).reshape(len(keys), -1)
+    keys = keys.astype(np.uint8, copy=False)
+    if keys.ndim != 2 or keys.shape[1] != BLOCK_SIZE:
+        raise ValueError("Keys must form a (K,8) array.")
+    return keys
+
+
+def rotate28(half, shift):
+    shift = np.uint64(shift)
+    return ((half << shift) | (half >> (SHIFT_28 - shift))) & LOW_28
+
+
+def expand_keys(keys):
+    """
+    Vectorized key schedule of K keys ((K,8) array or 8-byte keys).
+    Returns the round keys as a (16, K) uint64 array: row r holds round r
+    of every key, with the same values as DES(...).round_keys.
+    """
+    cd = permute_words(as_words(as_keys(keys)), PC1)
+    c, d = cd >> SHIFT_28, cd & LOW_28
+    round_keys = np.empty((len(DES.LEFT_ROTATIONS), len(cd)), dtype=np.uint64)
+    for r, shift in enumerate(DES.LEFT_ROTATIONS):
+        c, d = rotate28(c, shift), rotate28(d, shift)
+        cd = (c << SHIFT_28) | d
+        k = PC2[0][cd >> PC2_SHIFTS[0]]
+        for j in range(1, 7):
+            k |= PC2[j][(cd >> PC2_SHIFTS[j]) & BYTE]
+        round_keys[r] = k
+    return round_keys
@@ -35,7 +35,6 @@ def pkcs7_pad(plaintext, block_size=64):
     # Repeat the padding byte for the required number of times
     padding = padding_byte * padding_length_bytes
     
-    print("padded text length:", len(plaintext + padding))
     return plaintext + padding
 
 def pkcs7_unpad(padded_text):
@@ -63,24 +62,23 @@ class DES_ECB:
         plaintext=pkcs7_pad_binary(plaintext)
         plaintext=pkcs7_pad(plaintext, block_size=64)
 
-        ciphertext = ""
+        ciphertext = []
         # Encrypt each 64-bit block of plaintext
         for i in range(0, len(plaintext), 64):
             block = plaintext[i:i+64]
-            print("block:", len(block), block)
-            ciphertext += self.des.encrypt(block)
-        return ciphertext
+            ciphertext.append(self.des.encrypt(block))
+        return ''.join(ciphertext)
 
     def decrypt(self, ciphertext):
         # Ensure the ciphertext is a multiple of 64 bits
         if len(ciphertext) % 64 != 0:
             raise ValueError("Ciphertext length must be a multiple of 64 bits in ECB mode.")
-        padded_text = ""
+        blocks = []
         # Decrypt each 64-bit block of ciphertext
         for i in range(0, len(ciphertext), 64):
             block = ciphertext[i:i+64]
-            padded_text += self.des.decrypt(block)
-        padded_text = pkcs7_unpad(padded_text)
+            blocks.append(self.des.decrypt(block))
+        padded_text = pkcs7_unpad(''.join(blocks))
         binarytext=pkcs7_unpad_binary(padded_text)
         return binarytext
 
@@ -95,7 +93,7 @@ class DES_CBC:
         if len(plaintext) % 64 != 0:
             raise ValueError("Plaintext length must be a multiple of 64 bits in CBC mode.")
 
-        ciphertext = ""
+        ciphertext = []
         previous_block = self.iv
         # Encrypt each 64-bit block of plaintext
         for i in range(0, len(plaintext), 64):
@@ -103,16 +101,16 @@ class DES_CBC:
             # XOR the block with the previous ciphertext block (or IV for the first block)
             block_to_encrypt = self.xor(block, previous_block)
             encrypted_block = self.des.encrypt(block_to_encrypt)
-            ciphertext += encrypted_block
+            ciphertext.append(encrypted_block)
             previous_block = encrypted_block
 
-        return ciphertext
+        return ''.join(ciphertext)
     def decrypt(self, ciphertext):
         # Ensure the ciphertext is a multiple of 64 bits
         if len(ciphertext) % 64 != 0:
             raise ValueError("Ciphertext length must be a multiple of 64 bits in CBC mode.")
 
-        plaintext = ""
+        plaintext = []
         previous_block = self.iv
         # Decrypt each 64-bit block of ciphertext
         for i in range(0, len(ciphertext), 64):
@@ -120,10 +118,33 @@ class DES_CBC:
             decrypted_block = self.des.decrypt(block)
             # XOR the decrypted block with the previous ciphertext block (or IV for the first block)
             plaintext_block = self.xor(decrypted_block, previous_block)
-            plaintext += plaintext_block
+            plaintext.append(plaintext_block)
             previous_block = block
 
-        return plaintext
+        return ''.join(plaintext)
 
     def xor(self, block1, block2):
         return ''.join(['1' if b1 != b2 else '0' for b1, b2 in zip(block1, block2)])
+
+
+############# Bytes modes
+# DES_ECB / DES_CBC above work on '0'/'1' strings, 8 characters per byte.
+# bytes_modes() takes and returns bytes-like objects instead (see blockmodes.py):
+#     m = bytes_modes(key, "CBC")          # 8-byte key: DES, 16/24 bytes: 3DES
+#     ct = m.encrypt("CBC", data)          # IV || ciphertext, PKCS7 on bytes
+#     enc = m.encryptor()                  # streaming: update(chunk) ... finalize()
+def bytes_modes(key, mode=None, batch=True):
+    """
+    DES or 3DES mode object for 'key' (bytes, or text encoded as UTF-8).
+    'mode' (ECB, CBC, CFB, OFB, CTR) becomes the default of encryptor()/decryptor().
+    """
+    # Imported here so the string API above does not need ciphermodes or NumPy
+    from .blockmodes import des_modes, triple_des_modes
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    if len(key) not in (8, 16, 24):
+        raise ValueError("Invalid DES/3DES key length. The key must be 8 bytes (DES) or 16 or 24 bytes (3DES).")
+    factory = des_modes if len(key) == 8 else triple_des_modes
+    mode_obj = factory(bytes(key), batch)
+    mode_obj.mode = mode
+    return mode_obj
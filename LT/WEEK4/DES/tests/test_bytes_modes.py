@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import os
+import random
+import pytest
+from mypackages import modes
+from mypackages.blockmodes import DESCipher, TripleDESCipher
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("des_projects", os.path.join(HERE, "DES-projects.py"))
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    return script
+
+
+def answer(monkeypatch, *replies):
+    replies = iter(replies)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+
+
+@pytest.mark.parametrize("key_size, cipher", [(8, DESCipher), (16, TripleDESCipher), (24, TripleDESCipher)])
+def test_key_size_selects_cipher(key_size, cipher):
+    assert isinstance(modes.bytes_modes(os.urandom(key_size)).cipher, cipher)
+    assert isinstance(modes.bytes_modes("k" * key_size).cipher, cipher)
+
+
+@pytest.mark.parametrize("key", [b"", b"short", os.urandom(12), os.urandom(32), "clé-8oct"])
+def test_invalid_key_length(key):
+    # "clé-8oct" is 8 characters but 9 bytes in UTF-8
+    with pytest.raises(ValueError, match="DES/3DES key length"):
+        modes.bytes_modes(key)
+
+
+@pytest.mark.parametrize("batch", [True, False], ids=["batch", "no-batch"])
+@pytest.mark.parametrize("key_size", [8, 16, 24])
+@pytest.mark.parametrize("mode", MODES)
+def test_streaming_random_chunks_match_one_shot(mode, key_size, batch):
+    rng = random.Random(mode)
+    m = modes.bytes_modes(os.urandom(key_size), mode, batch)
+    data = os.urandom(3001)
+    expected = bytes(m.encrypt(mode, data))
+    for make, src, result in ((m.encryptor, data, expected), (m.decryptor, expected, data)):
+        cipher, out, pos = make(), bytearray(), 0
+        while pos < len(src):
+            step = rng.randrange(1, 200)
+            out += cipher.update(src[pos:pos + step])
+            pos += step
+        assert out + cipher.finalize() == result
+
+
+def test_main_prints_key_error(monkeypatch, capsys):
+    script = load_script()
+    answer(monkeypatch, "hello")
+    script.main("too-long-key", encrypt="yes", decrypt="no")
+    assert "Error: Invalid DES/3DES key length" in capsys.readouterr().out
+
+
+def test_main_round_trip_and_bad_ciphertext(monkeypatch, capsys):
+    script = load_script()
+    answer(monkeypatch, "hello DES")
+    script.main("8bytekey", encrypt="yes", decrypt="no")
+    ciphertext = capsys.readouterr().out.split(":")[-1].strip()
+    answer(monkeypatch, ciphertext)
+    script.main("8bytekey", encrypt="no", decrypt="yes")
+    assert "hello DES" in capsys.readouterr().out
+    answer(monkeypatch, "not hex")
+    script.main("8bytekey", encrypt="no", decrypt="yes")
+    assert "Error:" in capsys.readouterr().out
+
+
+def test_file_main(tmp_path, monkeypatch, capsys):
+    script = load_script()
+    plain = tmp_path / "data.bin"
+    data = os.urandom(5000)
+    plain.write_bytes(data)
+    answer(monkeypatch, "a" * 24, "cbc", str(plain))
+    script.file_main("encrypt")
+    plain.unlink()
+    answer(monkeypatch, "a" * 24, "CBC", str(plain) + ".enc")
+    script.file_main("decrypt")
+    assert plain.read_bytes() == data
+
+    answer(monkeypatch, "a" * 10, "CBC", str(plain))
+    script.file_main("encrypt")
+    assert "Error: Invalid DES/3DES key length" in capsys.readouterr().out
+
+    bad = tmp_path / "bad.enc"
+    bad.write_bytes(os.urandom(8 * 5 + 3))
+    answer(monkeypatch, "a" * 8, "CBC", str(bad))
+    script.file_main("decrypt")
+    assert "Error:" in capsys.readouterr().out
+    assert not (tmp_path / "bad").exists()
+
+
+def test_process_file_failure_removes_output(tmp_path, monkeypatch):
+    script = load_script()
+    monkeypatch.setattr(script, "CHUNK_SIZE", 64)  # some chunks are written before the failure
+    enc, out = tmp_path / "data.enc", tmp_path / "data"
+    ciphertext = bytearray(modes.bytes_modes("a" * 8, "CBC").encrypt("CBC", os.urandom(300)))
+    ciphertext[-9] ^= 0x80  # pad value > block size
+    enc.write_bytes(bytes(ciphertext))
+    with pytest.raises(ValueError, match="padding"):
+        script.process_file(str(enc), str(out), modes.bytes_modes("a" * 8, "CBC"), "decrypt")
+    assert not out.exists()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import numpy as np
+import pytest
+from mypackages.DES import DES
+from mypackages.des_numpy import DESNumpy, TripleDESNumpy
+from mypackages.blockmodes import DESCipher, TripleDESCipher, des_modes, triple_des_modes
+
+# Textbook key/plaintext. This DES skips the swap of the halves before the final
+# permutation, so the expected value differs from the standard 85e813540f0ab405.
+KEY, PLAIN, CIPHER = "133457799BBCDFF1", "0123456789ABCDEF", "4ad423a80f05780a"
+
+
+def bits(value, width=64):
+    return format(value, f'0{width}b')
+
+
+@pytest.mark.parametrize("engine", ["integer", "reference"])
+def test_known_answer(engine):
+    des = DES(bits(int(KEY, 16)), engine)
+    assert hex(int(des.encrypt(bits(int(PLAIN, 16))), 2)) == "0x" + CIPHER
+    assert des.decrypt(bits(int(CIPHER, 16))) == bits(int(PLAIN, 16))
+
+
+def test_known_answer_on_bytes():
+    cipher = DESCipher(bytes.fromhex(KEY))
+    assert cipher.encrypt(bytes.fromhex(PLAIN)).hex() == CIPHER
+    assert DES(bits(int(KEY, 16))).encrypt_blocks(bytes.fromhex(PLAIN)).hex() == CIPHER
+    block = np.frombuffer(bytes.fromhex(PLAIN), np.uint8).reshape(1, 8)
+    assert DESNumpy(cipher.des).encrypt_blocks(block).tobytes().hex() == CIPHER
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_integer_matches_reference(seed):
+    rng = random.Random(seed)
+    key = bits(rng.getrandbits(64))
+    fast, reference = DES(key), DES(key, "reference")
+    for _ in range(40):
+        block = bits(rng.getrandbits(64))
+        ciphertext = fast.encrypt(block)
+        assert ciphertext == reference.encrypt(block)
+        assert fast.decrypt(ciphertext) == block == reference.decrypt(ciphertext)
+        assert fast.encrypt_int(int(block, 2)) == int(ciphertext, 2)
+
+
+@pytest.mark.parametrize("num_blocks", [1, 7, 37, 1000])
+def test_batch_engines_match_integer(num_blocks):
+    des = DES(bits(random.getrandbits(64)))
+    data = os.urandom(8 * num_blocks)
+    blocks = np.frombuffer(data, np.uint8).reshape(-1, 8)
+    engine = DESNumpy(des)
+    assert engine.encrypt_blocks(blocks).tobytes() == des.encrypt_blocks(data)
+    assert engine.decrypt_blocks(blocks).tobytes() == des.decrypt_blocks(data)
+    assert des.decrypt_blocks(des.encrypt_blocks(data)) == data
+
+
+@pytest.mark.parametrize("key_size", [16, 24])
+def test_triple_des(key_size):
+    key = os.urandom(key_size)
+    cipher = TripleDESCipher(key)
+    data = os.urandom(8 * 50)
+    blocks = np.frombuffer(data, np.uint8).reshape(-1, 8)
+    expected = b''.join(cipher.encrypt(data[i:i + 8]) for i in range(0, len(data), 8))
+    assert TripleDESNumpy(*(stage.des for stage in cipher.stages)).encrypt_blocks(blocks).tobytes() == expected
+    assert cipher.decrypt_blocks(expected) == data
+    # EDE with three equal keys is single DES
+    single = os.urandom(8)
+    assert TripleDESCipher(single * 3).encrypt(PLAIN.encode()[:8]) == DESCipher(single).encrypt(PLAIN.encode()[:8])
+
+
+@pytest.mark.parametrize("factory, key_size", [(des_modes, 8), (triple_des_modes, 16), (triple_des_modes, 24)])
+@pytest.mark.parametrize("mode", ["ECB", "CBC", "CFB", "OFB", "CTR"])
+def test_modes_batch_matches_single_blocks(factory, key_size, mode):
+    key = os.urandom(key_size)
+    batched, single = factory(key), factory(key, False)
+    single.iv = batched.iv
+    data = os.urandom(3001)
+    ciphertext = batched.encrypt(mode, data)
+    assert ciphertext == single.encrypt(mode, data)
+    assert batched.decrypt(mode, ciphertext) == data
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        DES(bits(0), "tables")
+    with pytest.raises(ValueError):
+        DES(bits(0)).encrypt_blocks(bytes(12))
+    with pytest.raises(ValueError):
+        DESCipher(bytes(7))
+    with pytest.raises(ValueError):
+        TripleDESCipher(bytes(8))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import numpy as np
+import pytest
+from mypackages.DES import DES, expand_key_int, expand_key_halves, key_schedule
+from mypackages.des_numpy import expand_keys, DESKeyBatch
+
+# K1 and K16 of the textbook key 133457799BBCDFF1
+KEY = 0x133457799BBCDFF1
+K1, K16 = 0x1B02EFFC7072, 0xCB3D8B0E17F5
+
+
+def test_known_subkeys():
+    for expand in (expand_key_int, expand_key_halves):
+        round_keys = expand(KEY)
+        assert (round_keys[0], round_keys[15]) == (K1, K16)
+    reference = DES(format(KEY, '064b'), "reference")
+    assert int(reference.subkeys[0], 2) == K1 and int(reference.subkeys[15], 2) == K16
+    assert list(expand_keys([KEY.to_bytes(8, 'big')])[[0, 15], 0]) == [K1, K16]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_all_schedules_match_reference(seed):
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(64) for _ in range(100)]
+    batch = expand_keys([k.to_bytes(8, 'big') for k in keys])
+    for i, key in enumerate(keys):
+        bits = format(key, '064b')
+        reference = DES(bits, "reference")
+        expected = [int(subkey, 2) for subkey in reference.subkeys]
+        assert expand_key_int(key) == expand_key_halves(key) == list(key_schedule(key)) == expected
+        assert list(batch[:, i]) == expected
+        des = DES(bits)
+        assert des.subkeys == reference.subkeys
+        assert list(des.round_keys) == expected
+
+
+def test_parity_bits_are_ignored():
+    key = random.getrandbits(64)
+    assert expand_key_int(key) == expand_key_int(key ^ 0x0101010101010101)
+
+
+def test_cache_is_shared_and_bounded():
+    key_schedule.cache_clear()
+    bits = format(random.getrandbits(64), '064b')
+    DES(bits)
+    DES(bits)
+    info = key_schedule.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert info.maxsize is not None
+    # The subkeys setter still works for code that replaces the schedule
+    des = DES(bits)
+    des.subkeys = DES(format(KEY, '064b'), "reference").subkeys
+    assert des.subkeys[0] == format(K1, '048b')
+
+
+@pytest.mark.parametrize("shape", [(), (5,)], ids=["one-block", "five-blocks"])
+def test_key_batch_matches_single_keys(shape):
+    keys = [os.urandom(8) for _ in range(30)]
+    blocks = np.frombuffer(os.urandom(8 * 30 * (shape[0] if shape else 1)), np.uint8).reshape(30, *shape, 8)
+    batch = DESKeyBatch(keys)
+    encrypted = batch.encrypt_blocks(blocks)
+    assert encrypted.shape == blocks.shape
+    for i, key in enumerate(keys):
+        des = DES(format(int.from_bytes(key, 'big'), '064b'))
+        assert encrypted[i].tobytes() == des.encrypt_blocks(blocks[i].tobytes())
+    assert (batch.decrypt_blocks(encrypted) == blocks).all()
+    assert (DESKeyBatch(np.frombuffer(b''.join(keys), np.uint8).reshape(30, 8)).encrypt_blocks(blocks)
+            == encrypted).all()
+
+
+def test_key_batch_rejects_bad_shapes():
+    with pytest.raises(ValueError):
+        DESKeyBatch([bytes(8), bytes(7)])
+    batch = DESKeyBatch([bytes(8)] * 3)
+    with pytest.raises(ValueError):
+        batch.encrypt_blocks(np.zeros((2, 8), np.uint8))
+    with pytest.raises(ValueError):
+        batch.encrypt_blocks(np.zeros((3, 16), np.uint8))
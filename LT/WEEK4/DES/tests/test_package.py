@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import subprocess
+import sys
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = "import mypackages.modes, ciphermodes; print(ciphermodes.__file__)"
+
+
+def import_without_site(cwd):
+    """Import the package with site-packages disabled (-S), i.e. without the ciphermodes install."""
+    return subprocess.run([sys.executable, "-S", "-c", SCRIPT], cwd=cwd, capture_output=True, text=True)
+
+
+def test_falls_back_to_the_shared_sources():
+    result = import_without_site(PROJECT)
+    assert result.returncode == 0, result.stderr
+    shared = os.path.join(PROJECT, *[os.pardir] * 2, "ciphermodes", "ciphermodes")
+    assert os.path.dirname(result.stdout.strip()) == os.path.abspath(shared)
+
+
+def test_missing_shared_sources_raise_a_clear_error(tmp_path):
+    # The course folder copied on its own, without LT/ciphermodes next to it
+    copy = tmp_path.joinpath("LT", "WEEK4", "DES")
+    shutil.copytree(os.path.join(PROJECT, "mypackages"), copy / "mypackages",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    result = import_without_site(copy)
+    assert result.returncode != 0
+    assert "pip install -e LT/ciphermodes" in result.stderr
@@ -9,15 +9,22 @@ AES Encryption/Decryption Script with optional image handling.
     - On decrypt, reconstruct the image from raw data
 - Otherwise, treat the file as a generic binary
 - Retain file extension or rename for clarity
+
+Needs the shared ciphermodes package (python -m pip install -e LT/ciphermodes);
+without the install, mypackages uses the sources in LT/ciphermodes.
 """
 
 import sys
 import os
 import secrets
 from mypackages import key_expansion, modes
+from ciphermodes import filemap
 from PIL import Image
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Set to True for images with large flat regions: ECB then processes each
+# distinct block once (see ciphermodes/dedup.py)
+ECB_DEDUP = False
 
 def read_or_generate_key() -> bytes:
     """
@@ -137,59 +144,34 @@ def process_file(input_path: str, output_path: str, aes_mode_obj, operation: str
         * re-create the image from raw data => e.g. write as .png
 
     - Otherwise, fallback: treat as generic binary file
+
+    Ciphertext files are read through a read-only memory map and written
+    through a pre-sized writable map (ciphermodes/filemap.py), chunk by chunk.
     """
+    mode = aes_mode_obj.mode
+    if mode not in ["ECB", "CBC", "CFB", "OFB", "CTR"]:
+        raise ValueError(f"Unsupported mode: {mode}")
+
     if operation == "encrypt":
         if is_image_file(input_path):
+            cipher = aes_mode_obj.encryptor(mode, dedup=ECB_DEDUP)
             # Convert the image to raw uncompressed bytes
             raw_data, (width, height) = encode_image_to_raw_bytes(input_path)
 
-            # Encrypt 
-            mode = aes_mode_obj.mode
-            if mode == "ECB":
-                ciphertext = aes_mode_obj.ecb_encrypt(raw_data)
-            elif mode == "CBC":
-                ciphertext = aes_mode_obj.cbc_encrypt(raw_data)
-            elif mode == "CFB":
-                ciphertext = aes_mode_obj.cfb_encrypt(raw_data)
-            elif mode == "OFB":
-                ciphertext = aes_mode_obj.ofb_encrypt(raw_data)
-            elif mode == "CTR":
-                ciphertext = aes_mode_obj.ctr_encrypt(raw_data)
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
-
+            # Encrypt straight into the mapped output file.
             # We should store the (width, height) so we can reconstruct
             # Easiest way: write them as 4-byte ints at the start of the output
             # Then write the ciphertext
-            with open(output_path, "wb") as f_out:
-                f_out.write(width.to_bytes(4, 'big'))
-                f_out.write(height.to_bytes(4, 'big'))
-                f_out.write(ciphertext)
+            header = width.to_bytes(4, 'big') + height.to_bytes(4, 'big')
+            filemap.crypt_file(cipher, raw_data, output_path, header=header)
 
             print(f"\nEncrypted image data saved to {output_path}")
             print("Width/Height stored in first 8 bytes for decoding.\n")
 
         else:
             # Generic binary encryption
-            with open(input_path, "rb") as f_in:
-                data = f_in.read()
-
-            mode = aes_mode_obj.mode
-            if mode == "ECB":
-                result = aes_mode_obj.ecb_encrypt(data)
-            elif mode == "CBC":
-                result = aes_mode_obj.cbc_encrypt(data)
-            elif mode == "CFB":
-                result = aes_mode_obj.cfb_encrypt(data)
-            elif mode == "OFB":
-                result = aes_mode_obj.ofb_encrypt(data)
-            elif mode == "CTR":
-                result = aes_mode_obj.ctr_encrypt(data)
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
-
-            with open(output_path, "wb") as f_out:
-                f_out.write(result)
+            cipher = aes_mode_obj.encryptor(mode)
+            filemap.crypt_file(cipher, input_path, output_path)
 
             print(f"\nDone! Encrypted file saved as: {output_path}")
 
@@ -199,7 +181,6 @@ def process_file(input_path: str, output_path: str, aes_mode_obj, operation: str
         # If that doesn't look valid, fallback to binary decrypt
         with open(input_path, "rb") as f_in:
             possibly_header = f_in.read(8)
-            remainder = f_in.read()
 
         # Attempt to parse the first 8 bytes as width, height
         width = int.from_bytes(possibly_header[:4], 'big')
@@ -209,45 +190,19 @@ def process_file(input_path: str, output_path: str, aes_mode_obj, operation: str
         # e.g. not zero or extremely large
         if (1 <= width <= 10000) and (1 <= height <= 10000):
             print(f"Detected encrypted image with size {width}x{height}")
-            ciphertext = remainder
-            mode = aes_mode_obj.mode
-            if mode == "ECB":
-                decrypted = aes_mode_obj.ecb_decrypt(ciphertext)
-            elif mode == "CBC":
-                decrypted = aes_mode_obj.cbc_decrypt(ciphertext)
-            elif mode == "CFB":
-                decrypted = aes_mode_obj.cfb_decrypt(ciphertext)
-            elif mode == "OFB":
-                decrypted = aes_mode_obj.ofb_decrypt(ciphertext)
-            elif mode == "CTR":
-                decrypted = aes_mode_obj.ctr_decrypt(ciphertext)
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
+            cipher = aes_mode_obj.decryptor(mode, dedup=ECB_DEDUP)
+            # The pixels are needed in memory for Pillow; decrypt from the mapped file
+            decrypted = filemap.crypt_to_memory(cipher, input_path, skip=8)
 
             # Rebuild the image from raw data and save
             # We'll pick output_path + ".png" or so
             image_out_path = output_path + ".png"
-            decode_raw_bytes_to_image(decrypted, (width, height), image_out_path)
+            decode_raw_bytes_to_image(bytes(decrypted), (width, height), image_out_path)
 
         else:
             # Not an encrypted image => do normal binary decrypt
-            data = possibly_header + remainder
-            mode = aes_mode_obj.mode
-            if mode == "ECB":
-                result = aes_mode_obj.ecb_decrypt(data)
-            elif mode == "CBC":
-                result = aes_mode_obj.cbc_decrypt(data)
-            elif mode == "CFB":
-                result = aes_mode_obj.cfb_decrypt(data)
-            elif mode == "OFB":
-                result = aes_mode_obj.ofb_decrypt(data)
-            elif mode == "CTR":
-                result = aes_mode_obj.ctr_decrypt(data)
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
-
-            with open(output_path, "wb") as f_out:
-                f_out.write(result)
+            cipher = aes_mode_obj.decryptor(mode)
+            filemap.crypt_file(cipher, input_path, output_path)
 
             print(f"\nDone! Decrypted file saved as: {output_path}")
 
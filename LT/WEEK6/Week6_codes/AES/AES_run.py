@@ -7,11 +7,17 @@ AES Encryption/Decryption Script
 - Encrypt or decrypt a binary file
 - Retain file extension on encryption by appending ".enc"
 - On decryption, remove ".enc" suffix to restore original extension
+- Optionally write the chunked container format (mypackages/container.py),
+  whose chunks are encrypted in parallel and can be decrypted one at a time
+
+Needs the shared ciphermodes package (python -m pip install -e LT/ciphermodes);
+without the install, mypackages uses the sources in LT/ciphermodes.
 """
 import sys
 import os
 import secrets  # for random key generation
-from mypackages import key_expansion, modes
+from mypackages import key_expansion, modes, container
+from ciphermodes import filemap
 
 def read_or_generate_key() -> bytes:
     """
@@ -82,48 +88,68 @@ def select_operation() -> str:
             return "decrypt"
         print("Invalid choice. Please enter 'E' for encrypt or 'D' for decrypt.")
 
-def process_file(input_path: str, output_path: str, aes_mode_obj, operation: str):
+def select_container() -> bool:
+    """
+    Ask whether to write the chunked container format instead of IV || ciphertext.
+    """
+    while True:
+        choice = input("\nWrite chunked container (parallel, random access)? (Y/N): ").strip().lower()
+        if choice in ["y", "yes"]:
+            return True
+        elif choice in ["n", "no"]:
+            return False
+        print("Invalid choice. Please enter 'Y' or 'N'.")
+
+# Bytes read per step when streaming a file through the cipher
+CHUNK_SIZE = 1 << 20
+
+def process_file(input_path: str, output_path: str, aes_mode_obj, operation: str, use_mmap: bool = True,
+                 use_container: bool = False):
     """
-    Read input file (binary) -> encrypt/decrypt -> write output file (binary).
+    Stream input file (binary) -> encrypt/decrypt -> output file (binary),
+    CHUNK_SIZE bytes at a time so memory stays constant for any file size.
     'aes_mode_obj' is an instance of modes.modes(...) with the selected key + mode.
     'operation' is either 'encrypt' or 'decrypt'.
+    With 'use_mmap' the input is mapped read-only and the cipher writes straight
+    into a mapped, pre-sized output file (see ciphermodes/filemap.py); otherwise
+    the file is read and written with plain read()/write() calls.
+    With 'use_container' encryption writes the chunked container format;
+    containers are recognized by their magic bytes when decrypting.
     """
-    # 1) Read the entire input file as bytes
-    with open(input_path, "rb") as f_in:
-        data = f_in.read()
-
-    # 2) Perform encryption or decryption in the chosen mode
+    # 0) Chunked container: chunks are processed by worker processes
+    if operation == "encrypt" and use_container:
+        num_chunks = container.write_container(aes_mode_obj, aes_mode_obj.mode, input_path, output_path)
+        print(f"\nDone! Encrypted container ({num_chunks} chunks) saved as: {output_path}")
+        return
+    if operation == "decrypt" and container.is_container(input_path):
+        container.read_container(aes_mode_obj, input_path, output_path)
+        print(f"\nDone! Decrypted container saved as: {output_path}")
+        return
+
+    # 1) Create the incremental cipher object for the chosen mode
     mode = aes_mode_obj.mode
     if operation == "encrypt":
-        if mode == "ECB":
-            result = aes_mode_obj.ecb_encrypt(data)
-        elif mode == "CBC":
-            result = aes_mode_obj.cbc_encrypt(data)
-        elif mode == "CFB":
-            result = aes_mode_obj.cfb_encrypt(data)
-        elif mode == "OFB":
-            result = aes_mode_obj.ofb_encrypt(data)
-        elif mode == "CTR":
-            result = aes_mode_obj.ctr_encrypt(data)
-        else:
-            raise ValueError(f"Unsupported mode: {mode}")
+        cipher = aes_mode_obj.encryptor(mode)
     else:  # operation == "decrypt"
-        if mode == "ECB":
-            result = aes_mode_obj.ecb_decrypt(data)
-        elif mode == "CBC":
-            result = aes_mode_obj.cbc_decrypt(data)
-        elif mode == "CFB":
-            result = aes_mode_obj.cfb_decrypt(data)
-        elif mode == "OFB":
-            result = aes_mode_obj.ofb_decrypt(data)
-        elif mode == "CTR":
-            result = aes_mode_obj.ctr_decrypt(data)
-        else:
-            raise ValueError(f"Unsupported mode: {mode}")
+        cipher = aes_mode_obj.decryptor(mode)
 
-    # 3) Write the result to the output file
-    with open(output_path, "wb") as f_out:
-        f_out.write(result)
+    # 2) Process chunk by chunk; padding is handled in the final step
+    if use_mmap:
+        filemap.crypt_file(cipher, input_path, output_path, chunk_size=CHUNK_SIZE)
+    else:
+        with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+            try:
+                while True:
+                    chunk = f_in.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f_out.write(cipher.update(chunk))
+                f_out.write(cipher.finalize())
+            except BaseException:
+                # Bad key or damaged ciphertext: don't leave a partial output file
+                f_out.close()
+                os.remove(output_path)
+                raise
 
     print(f"\nDone! {operation.title()}ed file saved as: {output_path}")
 
@@ -142,6 +168,8 @@ def main():
     # 4) Choose encrypt or decrypt
     operation = select_operation()
 
+    use_container = operation == "encrypt" and select_container()
+
     # 5) Get input file path
     input_file = input("\nEnter input file path (binary): ").strip()
     if not os.path.isfile(input_file):
@@ -151,7 +179,9 @@ def main():
     # 6) Determine output file path
     #    a) If encrypting, append ".enc"
     #    b) If decrypting and file ends with ".enc", remove it
-    if operation == "encrypt":
+    if operation == "encrypt" and use_container:
+        output_file = input_file + ".enc"
+    elif operation == "encrypt":
         output_file = "cipher_"+input_file
     else:
         # If the input ends with ".enc", remove that suffix
@@ -162,7 +192,7 @@ def main():
             output_file = "decrypt_"+input_file
 
     # 7) Process the file (encrypt or decrypt)
-    process_file(input_file, output_file, aes_mode, operation)
+    process_file(input_file, output_file, aes_mode, operation, use_container=use_container)
 
     # Optionally, show round keys or debug info:
     # expanded_keys = key_expansion.key_expansion(key_bytes).key_expansion_128()
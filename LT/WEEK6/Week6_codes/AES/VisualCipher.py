@@ -7,6 +7,10 @@ import matplotlib.pyplot as plt
 from PIL import Image
 from mypackages import modes  # Your AES modes implementation
 
+# Set to True for images with large flat regions: ECB then processes each
+# distinct block once (see ciphermodes/dedup.py)
+ECB_DEDUP = False
+
 def read_or_generate_key() -> bytes:
     """
     Prompt user for a key in hex or 'random' (16/24/32 bytes).
@@ -84,7 +88,7 @@ def main():
 
     # 6) Encrypt the raw grayscale data
     if mode_str == "ECB":
-        ciphertext = aes_mode.ecb_encrypt(raw_data)
+        ciphertext = aes_mode.ecb_encrypt(raw_data, dedup=ECB_DEDUP)
     elif mode_str == "CBC":
         ciphertext = aes_mode.cbc_encrypt(raw_data)
     elif mode_str == "CFB":
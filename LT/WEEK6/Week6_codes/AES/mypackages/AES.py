@@ -1,8 +1,43 @@
+import struct
+from .key_cache import KeySchedule, KeyScheduleCache
+
+# Writes the 16 output bytes of a block into a buffer in one call
+BLOCK = struct.Struct('16B')
+
 class AES:
-    def __init__(self,key,key_length):
+    __slots__ = ("key", "key_length", "engine", "schedule", "round_words", "dec_round_words", "_round_keys")
+    name = "AES"
+    block_size = 16
+
+    def __init__(self,key,key_length,engine="ttable"):
+        """
+        'engine' selects the block function used by encrypt():
+          - "ttable"    : merged SubBytes/ShiftRows/MixColumns lookup tables (default)
+          - "reference" : the step-by-step FIPS-197 functions below
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown AES engine: {engine}")
+        if key_length not in (128, 192, 256):
+            raise ValueError("Invalid key length. Supported lengths are 128, 192, and 256 bits.")
         self.key = key
         self.key_length=key_length
-        self.round_keys = self.key_expansion(key,key_length)
+        self.engine = engine
+        # Shared, cached expansion: encryption words and equivalent-inverse-cipher words
+        self.schedule = KEY_SCHEDULES.get(key[:key_length // 8])
+        self.round_words = self.schedule.enc
+        self.dec_round_words = self.schedule.dec
+        self._round_keys = None
+
+    @property
+    def round_keys(self):
+        """Round keys as 4-byte lists, built from the cached schedule on first use."""
+        if self._round_keys is None:
+            self._round_keys = self.schedule.round_keys()
+        return self._round_keys
+
+    @round_keys.setter
+    def round_keys(self, value):
+        self._round_keys = value
     ###AES constants
     # S-box constants
     S_BOX = [
@@ -240,6 +275,82 @@ class AES:
     ################ Encryt one block (128 bits) 
 
     def encrypt(self, data):
+        """
+        Encrypt one 16-byte block with the selected engine.
+        """
+        if self.engine == "reference":
+            return self.encrypt_reference(data)
+        out = bytearray(16)
+        self.encrypt_into(data, out)
+        return bytes(out)
+
+    def encrypt_into(self, src, dst, offset=0, dst_offset=None, xor_src=None, xor_offset=0):
+        """
+        Encrypt the block src[offset:offset+16] into dst[dst_offset:dst_offset+16]
+        without building intermediate lists or bytes (T-table engine).
+        - 'src' is any bytes-like object (bytes, bytearray, memoryview); 'dst' a writable buffer.
+        - 'dst_offset' defaults to 'offset'; src and dst may be the same buffer.
+        - If 'xor_src' is given, xor_src[xor_offset:xor_offset+16] is XORed into the
+          input block first (the CBC chaining step).
+        The state is kept as four column words; column c holds
+        data[c], data[4+c], data[8+c], data[12+c] (row 0 in the high byte),
+        matching the state layout used by the reference functions.
+        """
+        if dst_offset is None:
+            dst_offset = offset
+        if self.engine == "reference":
+            block = bytes(src[offset:offset + 16])
+            if xor_src is not None:
+                block = bytes(a ^ b for a, b in zip(block, xor_src[xor_offset:xor_offset + 16]))
+            dst[dst_offset:dst_offset + 16] = self.encrypt_reference(block)
+            return
+
+        te0, te1, te2, te3, sbox = TE0, TE1, TE2, TE3, self.S_BOX
+        rk = self.round_words
+        num_rounds = len(rk) // 4 - 1
+        data, o = src, offset
+
+        # Initial round: load columns and add round key 0
+        s0 = ((data[o] << 24) | (data[o + 4] << 16) | (data[o + 8] << 8) | data[o + 12]) ^ rk[0]
+        s1 = ((data[o + 1] << 24) | (data[o + 5] << 16) | (data[o + 9] << 8) | data[o + 13]) ^ rk[1]
+        s2 = ((data[o + 2] << 24) | (data[o + 6] << 16) | (data[o + 10] << 8) | data[o + 14]) ^ rk[2]
+        s3 = ((data[o + 3] << 24) | (data[o + 7] << 16) | (data[o + 11] << 8) | data[o + 15]) ^ rk[3]
+        if xor_src is not None:
+            x, o = xor_src, xor_offset
+            s0 ^= (x[o] << 24) | (x[o + 4] << 16) | (x[o + 8] << 8) | x[o + 12]
+            s1 ^= (x[o + 1] << 24) | (x[o + 5] << 16) | (x[o + 9] << 8) | x[o + 13]
+            s2 ^= (x[o + 2] << 24) | (x[o + 6] << 16) | (x[o + 10] << 8) | x[o + 14]
+            s3 ^= (x[o + 3] << 24) | (x[o + 7] << 16) | (x[o + 11] << 8) | x[o + 15]
+
+        # Main rounds: one lookup per byte does SubBytes + ShiftRows + MixColumns
+        for k in range(4, 4 * num_rounds, 4):
+            t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xff] ^ te2[(s2 >> 8) & 0xff] ^ te3[s3 & 0xff] ^ rk[k]
+            t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xff] ^ te2[(s3 >> 8) & 0xff] ^ te3[s0 & 0xff] ^ rk[k + 1]
+            t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xff] ^ te2[(s0 >> 8) & 0xff] ^ te3[s1 & 0xff] ^ rk[k + 2]
+            t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xff] ^ te2[(s1 >> 8) & 0xff] ^ te3[s2 & 0xff] ^ rk[k + 3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+
+        # Final round: SubBytes + ShiftRows + AddRoundKey (no MixColumns)
+        k = 4 * num_rounds
+        t0 = ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xff] << 16) | (sbox[(s2 >> 8) & 0xff] << 8) | sbox[s3 & 0xff]) ^ rk[k]
+        t1 = ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xff] << 16) | (sbox[(s3 >> 8) & 0xff] << 8) | sbox[s0 & 0xff]) ^ rk[k + 1]
+        t2 = ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xff] << 16) | (sbox[(s0 >> 8) & 0xff] << 8) | sbox[s1 & 0xff]) ^ rk[k + 2]
+        t3 = ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xff] << 16) | (sbox[(s1 >> 8) & 0xff] << 8) | sbox[s2 & 0xff]) ^ rk[k + 3]
+
+        # Store columns back in the row-major byte order of the state matrix
+        BLOCK.pack_into(
+            dst, dst_offset,
+            t0 >> 24, t1 >> 24, t2 >> 24, t3 >> 24,
+            (t0 >> 16) & 0xff, (t1 >> 16) & 0xff, (t2 >> 16) & 0xff, (t3 >> 16) & 0xff,
+            (t0 >> 8) & 0xff, (t1 >> 8) & 0xff, (t2 >> 8) & 0xff, (t3 >> 8) & 0xff,
+            t0 & 0xff, t1 & 0xff, t2 & 0xff, t3 & 0xff,
+        )
+
+    def encrypt_reference(self, data):
+        """
+        Encrypt one block step by step (SubBytes, ShiftRows, MixColumns, AddRoundKey).
+        Kept as the reference path for checking the table-driven engine.
+        """
         # Generate round_keys if not already available
         if not hasattr(self, 'round_keys') or not self.round_keys:
             self.round_keys = self.key_expansion(self.key, len(self.key))
@@ -268,6 +379,73 @@ class AES:
     ################ Decrypt one block (128 bits) 
 
     def decrypt(self, ciphertext):
+        """
+        Decrypt one 16-byte block with the selected engine.
+        """
+        if self.engine == "reference":
+            return self.decrypt_reference(ciphertext)
+        out = bytearray(16)
+        self.decrypt_into(ciphertext, out)
+        return bytes(out)
+
+    def decrypt_into(self, src, dst, offset=0, dst_offset=None, xor_src=None, xor_offset=0):
+        """
+        Decrypt the block src[offset:offset+16] into dst[dst_offset:dst_offset+16] using the
+        equivalent inverse cipher with inverse T-tables. Same buffer rules as encrypt_into();
+        here 'xor_src' is XORed into the decrypted block (the CBC un-chaining step).
+        """
+        if dst_offset is None:
+            dst_offset = offset
+        if self.engine == "reference":
+            block = self.decrypt_reference(bytes(src[offset:offset + 16]))
+            if xor_src is not None:
+                block = bytes(a ^ b for a, b in zip(block, xor_src[xor_offset:xor_offset + 16]))
+            dst[dst_offset:dst_offset + 16] = block
+            return
+
+        td0, td1, td2, td3, inv_sbox = TD0, TD1, TD2, TD3, self.INV_S_BOX
+        dk = self.dec_round_words
+        num_rounds = len(dk) // 4 - 1
+        data, o = src, offset
+
+        s0 = ((data[o] << 24) | (data[o + 4] << 16) | (data[o + 8] << 8) | data[o + 12]) ^ dk[0]
+        s1 = ((data[o + 1] << 24) | (data[o + 5] << 16) | (data[o + 9] << 8) | data[o + 13]) ^ dk[1]
+        s2 = ((data[o + 2] << 24) | (data[o + 6] << 16) | (data[o + 10] << 8) | data[o + 14]) ^ dk[2]
+        s3 = ((data[o + 3] << 24) | (data[o + 7] << 16) | (data[o + 11] << 8) | data[o + 15]) ^ dk[3]
+
+        # Main rounds: InvSubBytes + InvShiftRows + InvMixColumns in one lookup per byte
+        for k in range(4, 4 * num_rounds, 4):
+            t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xff] ^ td2[(s2 >> 8) & 0xff] ^ td3[s1 & 0xff] ^ dk[k]
+            t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xff] ^ td2[(s3 >> 8) & 0xff] ^ td3[s2 & 0xff] ^ dk[k + 1]
+            t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xff] ^ td2[(s0 >> 8) & 0xff] ^ td3[s3 & 0xff] ^ dk[k + 2]
+            t3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xff] ^ td2[(s1 >> 8) & 0xff] ^ td3[s0 & 0xff] ^ dk[k + 3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+
+        # Final round: InvSubBytes + InvShiftRows + AddRoundKey
+        k = 4 * num_rounds
+        t0 = ((inv_sbox[s0 >> 24] << 24) | (inv_sbox[(s3 >> 16) & 0xff] << 16) | (inv_sbox[(s2 >> 8) & 0xff] << 8) | inv_sbox[s1 & 0xff]) ^ dk[k]
+        t1 = ((inv_sbox[s1 >> 24] << 24) | (inv_sbox[(s0 >> 16) & 0xff] << 16) | (inv_sbox[(s3 >> 8) & 0xff] << 8) | inv_sbox[s2 & 0xff]) ^ dk[k + 1]
+        t2 = ((inv_sbox[s2 >> 24] << 24) | (inv_sbox[(s1 >> 16) & 0xff] << 16) | (inv_sbox[(s0 >> 8) & 0xff] << 8) | inv_sbox[s3 & 0xff]) ^ dk[k + 2]
+        t3 = ((inv_sbox[s3 >> 24] << 24) | (inv_sbox[(s2 >> 16) & 0xff] << 16) | (inv_sbox[(s1 >> 8) & 0xff] << 8) | inv_sbox[s0 & 0xff]) ^ dk[k + 3]
+        if xor_src is not None:
+            x, o = xor_src, xor_offset
+            t0 ^= (x[o] << 24) | (x[o + 4] << 16) | (x[o + 8] << 8) | x[o + 12]
+            t1 ^= (x[o + 1] << 24) | (x[o + 5] << 16) | (x[o + 9] << 8) | x[o + 13]
+            t2 ^= (x[o + 2] << 24) | (x[o + 6] << 16) | (x[o + 10] << 8) | x[o + 14]
+            t3 ^= (x[o + 3] << 24) | (x[o + 7] << 16) | (x[o + 11] << 8) | x[o + 15]
+
+        BLOCK.pack_into(
+            dst, dst_offset,
+            t0 >> 24, t1 >> 24, t2 >> 24, t3 >> 24,
+            (t0 >> 16) & 0xff, (t1 >> 16) & 0xff, (t2 >> 16) & 0xff, (t3 >> 16) & 0xff,
+            (t0 >> 8) & 0xff, (t1 >> 8) & 0xff, (t2 >> 8) & 0xff, (t3 >> 8) & 0xff,
+            t0 & 0xff, t1 & 0xff, t2 & 0xff, t3 & 0xff,
+        )
+
+    def decrypt_reference(self, ciphertext):
+        """
+        Decrypt one block step by step with the inverse functions (reference path).
+        """
         # Ensure round_keys are generated
         if not hasattr(self, 'round_keys') or not self.round_keys:
             self.round_keys = self.key_expansion(self.key, len(self.key))
@@ -296,4 +474,103 @@ class AES:
         # Convert state matrix back to bytes
         return b''.join(bytes(row) for row in state)
 
-    
\ No newline at end of file
+
+################ T-tables
+# Each table entry merges SubBytes and MixColumns for one byte of a column;
+# ShiftRows is folded in by choosing which column each byte is read from.
+ENGINES = ("ttable", "reference")
+
+def xtime(a):
+    """Multiply by x (0x02) in GF(2^8)."""
+    a <<= 1
+    return a ^ 0x11b if a & 0x100 else a
+
+def build_te_tables(sbox):
+    """
+    TE0[x] = (2*S[x], S[x], S[x], 3*S[x]) packed big-endian;
+    TE1..TE3 are TE0 rotated right by 8, 16, 24 bits.
+    """
+    te0, te1, te2, te3 = [], [], [], []
+    for x in range(256):
+        s = sbox[x]
+        s2 = xtime(s)
+        s3 = s2 ^ s
+        te0.append((s2 << 24) | (s << 16) | (s << 8) | s3)
+        te1.append((s3 << 24) | (s2 << 16) | (s << 8) | s)
+        te2.append((s << 24) | (s3 << 16) | (s2 << 8) | s)
+        te3.append((s << 24) | (s << 16) | (s3 << 8) | s2)
+    return te0, te1, te2, te3
+
+def gmul(a, b):
+    """Galois Field multiplication."""
+    p = 0
+    while b:
+        if b & 1:
+            p ^= a
+        a = xtime(a)
+        b >>= 1
+    return p
+
+def build_td_tables(inv_sbox):
+    """
+    TD0[x] = (0e*IS[x], 09*IS[x], 0d*IS[x], 0b*IS[x]) packed big-endian;
+    TD1..TD3 are TD0 rotated right by 8, 16, 24 bits.
+    """
+    td0, td1, td2, td3 = [], [], [], []
+    for x in range(256):
+        s = inv_sbox[x]
+        s9, sb, sd, se = gmul(s, 0x09), gmul(s, 0x0b), gmul(s, 0x0d), gmul(s, 0x0e)
+        td0.append((se << 24) | (s9 << 16) | (sd << 8) | sb)
+        td1.append((sb << 24) | (se << 16) | (s9 << 8) | sd)
+        td2.append((sd << 24) | (sb << 16) | (se << 8) | s9)
+        td3.append((s9 << 24) | (sd << 16) | (sb << 8) | se)
+    return td0, td1, td2, td3
+
+TE0, TE1, TE2, TE3 = build_te_tables(AES.S_BOX)
+TD0, TD1, TD2, TD3 = build_td_tables(AES.INV_S_BOX)
+
+################ Key schedule on 32-bit words (shared through the key cache)
+def sub_word32(w):
+    sbox = AES.S_BOX
+    return (sbox[w >> 24] << 24) | (sbox[(w >> 16) & 0xff] << 16) | (sbox[(w >> 8) & 0xff] << 8) | sbox[w & 0xff]
+
+def expand_key_words(key):
+    """
+    FIPS-197 KeyExpansion on 32-bit words: returns 4*(Nr+1) words.
+    """
+    if len(key) not in (16, 24, 32):
+        raise ValueError("Invalid key length. Supported lengths are 128, 192, and 256 bits.")
+    nk = len(key) // 4
+    num_words = 4 * (nk + 7)
+    words = [int.from_bytes(key[i:i+4], 'big') for i in range(0, len(key), 4)]
+    for i in range(nk, num_words):
+        temp = words[i - 1]
+        if i % nk == 0:
+            # RotWord, SubWord, then Rcon in the high byte
+            temp = sub_word32(((temp << 8) & 0xffffffff) | (temp >> 24)) ^ (AES.RCON[i // nk - 1][0] << 24)
+        elif nk > 6 and i % nk == 4:
+            temp = sub_word32(temp)
+        words.append(words[i - nk] ^ temp)
+    return words
+
+def inv_key_words(round_words):
+    """
+    Decryption key schedule of the FIPS-197 equivalent inverse cipher:
+    round keys in reverse order, with InvMixColumns applied to rounds 1..Nr-1.
+    """
+    sbox = AES.S_BOX
+    num_rounds = len(round_words) // 4 - 1
+    dec_words = list(round_words[4 * num_rounds:4 * num_rounds + 4])
+    for round in range(num_rounds - 1, 0, -1):
+        for w in round_words[4 * round:4 * round + 4]:
+            # TD tables include InvSubBytes, so undo it with the forward S-box
+            dec_words.append(TD0[sbox[w >> 24]] ^ TD1[sbox[(w >> 16) & 0xff]]
+                             ^ TD2[sbox[(w >> 8) & 0xff]] ^ TD3[sbox[w & 0xff]])
+    dec_words.extend(round_words[0:4])
+    return dec_words
+
+def build_key_schedule(key):
+    enc_words = expand_key_words(key)
+    return KeySchedule(key, enc_words, inv_key_words(enc_words))
+
+KEY_SCHEDULES = KeyScheduleCache(build_key_schedule)
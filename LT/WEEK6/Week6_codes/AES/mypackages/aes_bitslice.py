@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Bitsliced AES over NumPy uint64 lanes.
+
+Blocks are transposed into bit-planes: planes[i][j] holds bit (7 - i) of byte j
+of 64 blocks per uint64 word. SubBytes is the Boyar-Peralta S-box circuit
+(113 XOR/AND/NOT gates) evaluated on whole planes, and every other step is a
+fixed permutation or XOR of planes, so no memory access depends on the data.
+
+Input/output layout is the same (N,16) uint8 array used by aes_numpy.AESNumpy.
+"""
+import numpy as np
+from .aes_numpy import SHIFT_ROWS, INV_SHIFT_ROWS, as_blocks, counter_blocks
+
+LANE_BITS = 64
+# Blocks processed per batch (multiple of LANE_BITS)
+BATCH_BLOCKS = 1 << 14
+
+
+class AESBitslice:
+    # Bitslicing pays off even for a single lane, and the short runs then stay
+    # table-free too (see modes.modes for the calls that never reach this engine)
+    min_blocks = 1
+
+    def __init__(self, aes):
+        """
+        'aes' is an AES instance; its expanded round keys are reused.
+        """
+        self.aes = aes
+        self.num_rounds = aes.schedule.num_rounds
+        # Round key k as a 16-byte row in state order: [4*r + c] = word(4k + c)[r]
+        words = np.frombuffer(aes.schedule.enc_bytes, dtype=np.uint8).reshape(self.num_rounds + 1, 4, 4)
+        keys = words.transpose(0, 2, 1).reshape(self.num_rounds + 1, 16)
+        # Each key bit becomes an all-zero or all-one lane mask: shape (rounds+1, 8, 16, 1)
+        bits = np.unpackbits(keys[:, :, None], axis=2).transpose(0, 2, 1)
+        self.round_masks = (bits.astype(np.uint64) * np.uint64(0xFFFFFFFFFFFFFFFF))[..., None]
+
+    ############################################################################
+    # BIT-PLANE TRANSPOSITION
+    ############################################################################
+
+    @staticmethod
+    def to_planes(blocks):
+        """
+        (N,16) uint8 blocks -> (8,16,W) uint64 planes, N padded up to W*64 with zero blocks.
+        """
+        n = len(blocks)
+        padded = (n + LANE_BITS - 1) // LANE_BITS * LANE_BITS
+        if padded != n:
+            blocks = np.concatenate([blocks, np.zeros((padded - n, 16), dtype=np.uint8)])
+        bits = np.unpackbits(blocks[:, :, None], axis=2)  # (N,16,8), MSB first
+        packed = np.packbits(bits.transpose(2, 1, 0), axis=2, bitorder='little')
+        return np.ascontiguousarray(packed).view(np.uint64)
+
+    @staticmethod
+    def from_planes(planes, n):
+        """
+        (8,16,W) uint64 planes -> first n blocks as an (n,16) uint8 array.
+        """
+        bits = np.unpackbits(planes.view(np.uint8), axis=2, bitorder='little')  # (8,16,N)
+        blocks = np.packbits(bits.transpose(2, 1, 0), axis=2)  # (N,16,1)
+        return blocks.reshape(-1, 16)[:n]
+
+    ############################################################################
+    # ROUND FUNCTIONS ON PLANES
+    ############################################################################
+
+    @staticmethod
+    def sub_bytes(planes):
+        """
+        Boyar-Peralta S-box circuit; U0/S0 are the most significant bits.
+        """
+        U0, U1, U2, U3, U4, U5, U6, U7 = planes
+        # Top linear transform
+        T1 = U0 ^ U3; T2 = U0 ^ U5; T3 = U0 ^ U6; T4 = U3 ^ U5; T5 = U4 ^ U6
+        T6 = T1 ^ T5; T7 = U1 ^ U2; T8 = U7 ^ T6; T9 = U7 ^ T7; T10 = T6 ^ T7
+        T11 = U1 ^ U5; T12 = U2 ^ U5; T13 = T3 ^ T4; T14 = T6 ^ T11; T15 = T5 ^ T11
+        T16 = T5 ^ T12; T17 = T9 ^ T16; T18 = U3 ^ U7; T19 = T7 ^ T18; T20 = T1 ^ T19
+        T21 = U6 ^ U7; T22 = T7 ^ T21; T23 = T2 ^ T22; T24 = T2 ^ T10; T25 = T20 ^ T17
+        T26 = T3 ^ T16; T27 = T1 ^ T12
+        # Shared non-linear middle part (GF(2^4) inversion)
+        M1 = T13 & T6; M2 = T23 & T8; M3 = T14 ^ M1; M4 = T19 & U7; M5 = M4 ^ M1
+        M6 = T3 & T16; M7 = T22 & T9; M8 = T26 ^ M6; M9 = T20 & T17; M10 = M9 ^ M6
+        M11 = T1 & T15; M12 = T4 & T27; M13 = M12 ^ M11; M14 = T2 & T10; M15 = M14 ^ M11
+        M16 = M3 ^ M2; M17 = M5 ^ T24; M18 = M8 ^ M7; M19 = M10 ^ M15; M20 = M16 ^ M13
+        M21 = M17 ^ M15; M22 = M18 ^ M13; M23 = M19 ^ T25; M24 = M22 ^ M23; M25 = M22 & M20
+        M26 = M21 ^ M25; M27 = M20 ^ M21; M28 = M23 ^ M25; M29 = M28 & M27; M30 = M26 & M24
+        M31 = M20 & M23; M32 = M27 & M31; M33 = M27 ^ M25; M34 = M21 & M22; M35 = M24 & M34
+        M36 = M24 ^ M25; M37 = M21 ^ M29; M38 = M32 ^ M33; M39 = M23 ^ M30; M40 = M35 ^ M36
+        M41 = M38 ^ M40; M42 = M37 ^ M39; M43 = M37 ^ M38; M44 = M39 ^ M40; M45 = M42 ^ M41
+        M46 = M44 & T6; M47 = M40 & T8; M48 = M39 & U7; M49 = M43 & T16; M50 = M38 & T9
+        M51 = M37 & T17; M52 = M42 & T15; M53 = M45 & T27; M54 = M41 & T10; M55 = M44 & T13
+        M56 = M40 & T23; M57 = M39 & T19; M58 = M43 & T3; M59 = M38 & T22; M60 = M37 & T20
+        M61 = M42 & T1; M62 = M45 & T4; M63 = M41 & T2
+        # Bottom linear transform
+        L0 = M61 ^ M62; L1 = M50 ^ M56; L2 = M46 ^ M48; L3 = M47 ^ M55; L4 = M54 ^ M58
+        L5 = M49 ^ M61; L6 = M62 ^ L5; L7 = M46 ^ L3; L8 = M51 ^ M59; L9 = M52 ^ M53
+        L10 = M53 ^ L4; L11 = M60 ^ L2; L12 = M48 ^ M51; L13 = M50 ^ L0; L14 = M52 ^ M61
+        L15 = M55 ^ L1; L16 = M56 ^ L0; L17 = M57 ^ L1; L18 = M58 ^ L8; L19 = M63 ^ L4
+        L20 = L0 ^ L1; L21 = L1 ^ L7; L22 = L3 ^ L12; L23 = L18 ^ L2; L24 = L15 ^ L9
+        L25 = L6 ^ L10; L26 = L7 ^ L9; L27 = L8 ^ L10; L28 = L11 ^ L14; L29 = L11 ^ L17
+        return np.stack([
+            L6 ^ L24, ~(L16 ^ L26), ~(L19 ^ L28), L6 ^ L21,
+            L20 ^ L22, L25 ^ L29, ~(L13 ^ L27), ~(L6 ^ L23),
+        ])
+
+    @staticmethod
+    def inv_affine(planes):
+        """
+        Inverse of the S-box affine map: rotl(x,1) ^ rotl(x,3) ^ rotl(x,6) ^ 0x05.
+        """
+        bit = lambda b: planes[7 - (b % 8)]
+        out = [None] * 8
+        for b in range(8):
+            out[7 - b] = bit(b - 1) ^ bit(b - 3) ^ bit(b - 6)
+        # constant 0x05: invert bits 0 and 2
+        out[7] = ~out[7]
+        out[5] = ~out[5]
+        return np.stack(out)
+
+    @classmethod
+    def inv_sub_bytes(cls, planes):
+        """
+        InvSubBytes(x) = A'(SubBytes(A'(x))) where A' is inv_affine(); reuses the forward circuit.
+        """
+        return cls.inv_affine(cls.sub_bytes(cls.inv_affine(planes)))
+
+    @staticmethod
+    def xtime(p):
+        """Multiply every byte by x in GF(2^8): shift planes left, fold bit 7 back as 0x1b."""
+        out = np.roll(p, -1, axis=0)  # out[i] = p[i+1], out[7] = p[0]
+        out[3] ^= p[0]
+        out[4] ^= p[0]
+        out[6] ^= p[0]
+        return out
+
+    @classmethod
+    def mix_columns(cls, planes):
+        """MixColumns; state rows are planes[:, 0:4] ... planes[:, 12:16]."""
+        a0, a1, a2, a3 = planes[:, 0:4], planes[:, 4:8], planes[:, 8:12], planes[:, 12:16]
+        t = a0 ^ a1 ^ a2 ^ a3
+        return np.concatenate([
+            a0 ^ t ^ cls.xtime(a0 ^ a1),
+            a1 ^ t ^ cls.xtime(a1 ^ a2),
+            a2 ^ t ^ cls.xtime(a2 ^ a3),
+            a3 ^ t ^ cls.xtime(a3 ^ a0),
+        ], axis=1)
+
+    @classmethod
+    def inv_mix_columns(cls, planes):
+        """InvMixColumns as a {04}x^2 + {05} pre-multiplication followed by MixColumns."""
+        planes = planes.copy()
+        u = cls.xtime(cls.xtime(planes[:, 0:4] ^ planes[:, 8:12]))
+        v = cls.xtime(cls.xtime(planes[:, 4:8] ^ planes[:, 12:16]))
+        planes[:, 0:4] ^= u
+        planes[:, 4:8] ^= v
+        planes[:, 8:12] ^= u
+        planes[:, 12:16] ^= v
+        return cls.mix_columns(planes)
+
+    ############################################################################
+    # BLOCK API
+    ############################################################################
+
+    def _encrypt_planes(self, planes):
+        rk = self.round_masks
+        planes = planes ^ rk[0]
+        for round in range(1, self.num_rounds):
+            planes = self.sub_bytes(planes[:, SHIFT_ROWS])
+            planes = self.mix_columns(planes)
+            planes ^= rk[round]
+        planes = self.sub_bytes(planes[:, SHIFT_ROWS])
+        planes ^= rk[self.num_rounds]
+        return planes
+
+    def _decrypt_planes(self, planes):
+        rk = self.round_masks
+        planes = planes ^ rk[self.num_rounds]
+        for round in range(self.num_rounds - 1, 0, -1):
+            planes = self.inv_sub_bytes(planes[:, INV_SHIFT_ROWS])
+            planes ^= rk[round]
+            planes = self.inv_mix_columns(planes)
+        planes = self.inv_sub_bytes(planes[:, INV_SHIFT_ROWS])
+        planes ^= rk[0]
+        return planes
+
+    def encrypt_blocks(self, blocks):
+        """
+        Encrypt an (N,16) uint8 array of independent blocks. Returns a new (N,16) array.
+        """
+        blocks = as_blocks(blocks)
+        out = np.empty_like(blocks)
+        for i in range(0, len(blocks), BATCH_BLOCKS):
+            batch = blocks[i:i + BATCH_BLOCKS]
+            out[i:i + BATCH_BLOCKS] = self.from_planes(self._encrypt_planes(self.to_planes(batch)), len(batch))
+        return out
+
+    def decrypt_blocks(self, blocks):
+        """
+        Decrypt an (N,16) uint8 array of independent blocks. Returns a new (N,16) array.
+        """
+        blocks = as_blocks(blocks)
+        out = np.empty_like(blocks)
+        for i in range(0, len(blocks), BATCH_BLOCKS):
+            batch = blocks[i:i + BATCH_BLOCKS]
+            out[i:i + BATCH_BLOCKS] = self.from_planes(self._decrypt_planes(self.to_planes(batch)), len(batch))
+        return out
+
+    def ctr_keystream(self, iv, num_blocks):
+        """
+        Keystream for CTR mode: E(IV), E(IV+1), ... as an (N,16) array.
+        """
+        return self.encrypt_blocks(counter_blocks(iv, num_blocks))
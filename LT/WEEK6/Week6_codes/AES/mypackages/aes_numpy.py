@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized AES over many blocks at once (NumPy).
+
+Blocks are given as an (N,16) uint8 array in the same byte order as AES.encrypt():
+byte 4*r + c of a block is state[r][c]. Every round is applied to all N blocks
+with array operations instead of looping over blocks in Python.
+"""
+import numpy as np
+from ciphermodes.blocks import as_blocks, counter_blocks
+from .AES import AES, xtime
+
+# Lookup tables as uint8 arrays for fancy indexing
+SBOX = np.array(AES.S_BOX, dtype=np.uint8)
+INV_SBOX = np.array(AES.INV_S_BOX, dtype=np.uint8)
+XTIME = np.array([xtime(x) & 0xff for x in range(256)], dtype=np.uint8)
+
+# ShiftRows as a fixed permutation of the 16 state positions: row r rotates left by r
+SHIFT_ROWS = np.array([4 * r + (c + r) % 4 for r in range(4) for c in range(4)], dtype=np.intp)
+INV_SHIFT_ROWS = np.array([4 * r + (c - r) % 4 for r in range(4) for c in range(4)], dtype=np.intp)
+
+# Blocks processed per batch, bounds the temporary arrays to a few MB
+BATCH_BLOCKS = 1 << 16
+
+
+class AESNumpy:
+    # Below this many blocks the per-block T-table loop is faster than setting up arrays
+    min_blocks = 32
+
+    def __init__(self, aes):
+        """
+        'aes' is an AES instance; its expanded round keys are reused.
+        """
+        self.aes = aes
+        self.num_rounds = aes.schedule.num_rounds
+        # Round key k as a 16-byte row in state order: [4*r + c] = word(4k + c)[r]
+        words = np.frombuffer(aes.schedule.enc_bytes, dtype=np.uint8).reshape(self.num_rounds + 1, 4, 4)
+        self.round_keys = np.ascontiguousarray(words.transpose(0, 2, 1).reshape(self.num_rounds + 1, 16))
+
+    @staticmethod
+    def mix_columns(state):
+        """MixColumns on an (N,16) state; the four rows are state[:, 0:4] ... state[:, 12:16]."""
+        a0, a1, a2, a3 = state[:, 0:4], state[:, 4:8], state[:, 8:12], state[:, 12:16]
+        t = a0 ^ a1 ^ a2 ^ a3
+        out = np.empty_like(state)
+        out[:, 0:4] = a0 ^ t ^ XTIME[a0 ^ a1]
+        out[:, 4:8] = a1 ^ t ^ XTIME[a1 ^ a2]
+        out[:, 8:12] = a2 ^ t ^ XTIME[a2 ^ a3]
+        out[:, 12:16] = a3 ^ t ^ XTIME[a3 ^ a0]
+        return out
+
+    @classmethod
+    def inv_mix_columns(cls, state):
+        """InvMixColumns as a {04}x^2 + {05} pre-multiplication followed by MixColumns."""
+        state = state.copy()
+        u = XTIME[XTIME[state[:, 0:4] ^ state[:, 8:12]]]
+        v = XTIME[XTIME[state[:, 4:8] ^ state[:, 12:16]]]
+        state[:, 0:4] ^= u
+        state[:, 4:8] ^= v
+        state[:, 8:12] ^= u
+        state[:, 12:16] ^= v
+        return cls.mix_columns(state)
+
+    @classmethod
+    def encrypt_state(cls, state, rk, num_rounds):
+        """
+        Cipher rounds on an (N,16) state. rk[r] is either one (16,) round key
+        for all blocks or an (N,16) array with a round key per block.
+        """
+        state = state ^ rk[0]
+        for round in range(1, num_rounds):
+            state = SBOX[state[:, SHIFT_ROWS]]
+            state = cls.mix_columns(state)
+            state ^= rk[round]
+        state = SBOX[state[:, SHIFT_ROWS]]
+        state ^= rk[num_rounds]
+        return state
+
+    @classmethod
+    def decrypt_state(cls, state, rk, num_rounds):
+        """Inverse cipher rounds on an (N,16) state; 'rk' as for encrypt_state()."""
+        state = state ^ rk[num_rounds]
+        for round in range(num_rounds - 1, 0, -1):
+            state = INV_SBOX[state[:, INV_SHIFT_ROWS]]
+            state ^= rk[round]
+            state = cls.inv_mix_columns(state)
+        state = INV_SBOX[state[:, INV_SHIFT_ROWS]]
+        state ^= rk[0]
+        return state
+
+    def _encrypt_batch(self, state):
+        return self.encrypt_state(state, self.round_keys, self.num_rounds)
+
+    def _decrypt_batch(self, state):
+        return self.decrypt_state(state, self.round_keys, self.num_rounds)
+
+    def encrypt_blocks(self, blocks):
+        """
+        Encrypt an (N,16) uint8 array of independent blocks. Returns a new (N,16) array.
+        """
+        blocks = as_blocks(blocks)
+        out = np.empty_like(blocks)
+        for i in range(0, len(blocks), BATCH_BLOCKS):
+            out[i:i + BATCH_BLOCKS] = self._encrypt_batch(blocks[i:i + BATCH_BLOCKS])
+        return out
+
+    def decrypt_blocks(self, blocks):
+        """
+        Decrypt an (N,16) uint8 array of independent blocks. Returns a new (N,16) array.
+        """
+        blocks = as_blocks(blocks)
+        out = np.empty_like(blocks)
+        for i in range(0, len(blocks), BATCH_BLOCKS):
+            out[i:i + BATCH_BLOCKS] = self._decrypt_batch(blocks[i:i + BATCH_BLOCKS])
+        return out
+
+    def ctr_keystream(self, iv, num_blocks):
+        """
+        Keystream for CTR mode: E(IV), E(IV+1), ... as an (N,16) array.
+        The counter is the IV read as a 128-bit big-endian integer (wraps mod 2^128).
+        """
+        return self.encrypt_blocks(counter_blocks(iv, num_blocks))
+
+
+class AESKeyBatch:
+    """
+    Many keys of the same length at once: the key schedules of all K keys are
+    expanded together with array operations, and block i is encrypted under
+    key i in one vectorized pass (key wrapping, per-record keys).
+
+        batch = AESKeyBatch(keys)             # (K,16), (K,24) or (K,32) uint8
+        out = batch.encrypt_blocks(blocks)    # (K,16) -> (K,16), or (K,M,16) -> (K,M,16)
+    """
+
+    def __init__(self, keys):
+        keys = as_keys(keys)
+        self.num_keys = len(keys)
+        self.num_rounds = keys.shape[1] // 4 + 6
+        self.round_keys = expand_keys(keys)
+
+    def _per_block_keys(self, blocks):
+        """Blocks as (K*M,16) plus round keys repeated to match: (Nr+1, K*M, 16)."""
+        blocks = np.asarray(blocks, dtype=np.uint8)
+        if blocks.shape[0] != self.num_keys or blocks.shape[-1] != 16:
+            raise ValueError(f"Expected blocks of shape ({self.num_keys},16) or ({self.num_keys},M,16).")
+        per_key = 1 if blocks.ndim == 2 else blocks.shape[1]
+        rk = self.round_keys if per_key == 1 else np.repeat(self.round_keys, per_key, axis=1)
+        return blocks.reshape(-1, 16), rk
+
+    def encrypt_blocks(self, blocks):
+        """Encrypt block(s) i under key i; returns an array of the same shape."""
+        state, rk = self._per_block_keys(blocks)
+        return AESNumpy.encrypt_state(state, rk, self.num_rounds).reshape(np.shape(blocks))
+
+    def decrypt_blocks(self, blocks):
+        """Decrypt block(s) i under key i; returns an array of the same shape."""
+        state, rk = self._per_block_keys(blocks)
+        return AESNumpy.decrypt_state(state, rk, self.num_rounds).reshape(np.shape(blocks))
+
+
+def as_keys(keys):
+    """A sequence of equal-length keys (bytes) or an array as a (K, 16/24/32) uint8 array."""
+    if not isinstance(keys, np.ndarray):
+        keys = np.frombuffer(b''.join(bytes(k) for k in keys), dtype=np.uint8).reshape(len(keys), -1)
+    keys = keys.astype(np.uint8, copy=False)
+    if keys.ndim != 2 or keys.shape[1] not in (16, 24, 32):
+        raise ValueError("Keys must form a (K,16), (K,24) or (K,32) array.")
+    return keys
+
+
+def expand_keys(keys):
+    """
+    Vectorized key expansion of a (K, 16/24/32) key array.
+    Returns (Nr+1, K, 16) round keys in state order, like AESNumpy.round_keys per key.
+    """
+    keys = as_keys(keys)
+    num_keys, nk = len(keys), keys.shape[1] // 4
+    num_rounds = nk + 6
+    total = 4 * (num_rounds + 1)
+    words = np.empty((num_keys, total, 4), dtype=np.uint8)
+    words[:, :nk] = keys.reshape(num_keys, nk, 4)
+    for i in range(nk, total):
+        temp = words[:, i - 1]
+        if i % nk == 0:
+            temp = SBOX[temp[:, [1, 2, 3, 0]]]  # SubWord(RotWord(temp))
+            temp[:, 0] ^= AES.RCON[i // nk - 1][0]
+        elif nk > 6 and i % nk == 4:
+            temp = SBOX[temp]
+        words[:, i] = words[:, i - nk] ^ temp
+    # Round key k: [4*r + c] = word(4k + c)[r]
+    return np.ascontiguousarray(
+        words.reshape(num_keys, num_rounds + 1, 4, 4).transpose(1, 0, 3, 2).reshape(num_rounds + 1, num_keys, 16))
+
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Chunked encrypted container (.enc) with an index, for parallel processing
+and random access to archival blobs.
+
+Layout (all integers big-endian):
+    header   : magic "AESC", version, mode, key id (8 bytes of SHA-256(key)),
+               chunk size, number of chunks, plaintext length   (HEADER, 32 bytes)
+    IV table : one 16-byte IV/nonce per chunk
+    chunks   : chunk k is plaintext[k*chunk_size:(k+1)*chunk_size] encrypted on
+               its own with IV k (GCM: ciphertext || 16-byte tag, with the header
+               and chunk number as AAD)
+    index    : per chunk, (offset u64, length u32)                 (INDEX_ENTRY)
+    trailer  : index offset u64, magic "AESX"                      (TRAILER)
+
+Chunks are independent, so they are encrypted/decrypted by worker processes,
+and ContainerReader.read_chunk(k) reads only the trailer, index and chunk k.
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from ciphermodes.stream import ENCRYPTORS, DECRYPTORS
+from ciphermodes import parallel
+from .gcm import GCMEncryptor, GCMDecryptor, TAG_SIZE
+
+MAGIC = b"AESC"
+INDEX_MAGIC = b"AESX"
+VERSION = 1
+HEADER = struct.Struct(">4sBB2x8sIIQ")
+INDEX_ENTRY = struct.Struct(">QI")
+TRAILER = struct.Struct(">Q4s")
+IV_SIZE = 16
+# Plaintext bytes per chunk
+CHUNK_SIZE = 1 << 20
+
+MODE_CODES = {"ECB": 1, "CBC": 2, "CFB": 3, "OFB": 4, "CTR": 5, "GCM": 6}
+MODE_NAMES = {code: name for name, code in MODE_CODES.items()}
+
+
+def key_id(key):
+    """Short identifier of a key (not the key itself): first 8 bytes of SHA-256."""
+    return hashlib.sha256(bytes(key)).digest()[:8]
+
+
+def is_container(path):
+    """True if the file starts with the container magic."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+############################################################################
+# One chunk (runs in this process or in a worker)
+############################################################################
+
+def chunk_aad(header, index):
+    return header + index.to_bytes(4, 'big')
+
+
+def encrypt_chunk(modes_obj, mode, iv, data, aad):
+    """Encrypt one chunk with its own IV; the IV is kept in the header, not in the chunk."""
+    if mode == "GCM":
+        cipher = GCMEncryptor(modes_obj.aes, modes_obj.batch, iv[:12], aad)
+        out = cipher.update(data, final=True)
+        out += cipher.tag
+        return out
+    if mode == "ECB":
+        cipher = ENCRYPTORS[mode](modes_obj.aes, modes_obj.batch)
+    else:
+        cipher = ENCRYPTORS[mode](modes_obj.aes, modes_obj.batch, iv)
+        cipher.header = b''
+    return cipher.update(data, final=True)
+
+
+def decrypt_chunk(modes_obj, mode, iv, data, aad):
+    """Decrypt one chunk; raises ValueError on bad padding or a bad GCM tag."""
+    if mode == "GCM":
+        if len(data) < TAG_SIZE:
+            raise ValueError("Container chunk is too short for its GCM tag.")
+        data = memoryview(data)
+        cipher = GCMDecryptor(modes_obj.aes, modes_obj.batch, iv[:12], aad)
+        out = cipher.update(data[:-TAG_SIZE])
+        out += cipher.finalize(data[-TAG_SIZE:])
+        return out
+    cipher = DECRYPTORS[mode](modes_obj.aes, modes_obj.batch)
+    if mode != "ECB":
+        cipher.update(iv)  # decryptors read the IV from the stream
+    return cipher.update(data, final=True)
+
+
+def chunk_task(spec, encrypt, mode, iv, data, aad):
+    """Worker entry point."""
+    modes_obj = parallel.build_modes(spec)
+    crypt = encrypt_chunk if encrypt else decrypt_chunk
+    return bytes(crypt(modes_obj, mode, iv, data, aad))
+
+
+def map_chunks(modes_obj, encrypt, mode, jobs, workers, executor):
+    """
+    Yield the processed chunks for jobs = iterable of (iv, data, aad), in order.
+    Up to 2 * workers chunks are in flight at a time.
+    """
+    if workers == 1:
+        crypt = encrypt_chunk if encrypt else decrypt_chunk
+        for iv, data, aad in jobs:
+            yield crypt(modes_obj, mode, iv, data, aad)
+        return
+    spec = parallel.cipher_spec(modes_obj)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+    try:
+        window = 2 * (workers or os.cpu_count())
+        pending = []
+        for iv, data, aad in jobs:
+            pending.append(executor.submit(chunk_task, spec, encrypt, mode, iv, bytes(data), aad))
+            if len(pending) >= window:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+############################################################################
+# Writing
+############################################################################
+
+def chunk_jobs(data, chunk_size, ivs, header):
+    """
+    Yield (iv, view of chunk k, aad) per chunk. Each view is released when the
+    next job is requested or the generator is closed, so no slice of a mapped
+    source outlives its use.
+    """
+    for k, iv in enumerate(ivs):
+        view = data[k * chunk_size:(k + 1) * chunk_size]
+        try:
+            yield iv, view, chunk_aad(header, k)
+        finally:
+            view.release()
+
+
+def write_container(modes_obj, mode, source, output_path, chunk_size=CHUNK_SIZE, workers=None, executor=None):
+    """
+    Encrypt 'source' (a file path or a bytes-like object) into a container at
+    'output_path'. 'workers' defaults to the CPU count (1 = no worker processes).
+    Returns the number of chunks. If encryption fails the output file is removed.
+    """
+    if mode not in MODE_CODES:
+        raise ValueError(f"Unsupported mode: {mode}")
+    if chunk_size <= 0 or chunk_size % 16:
+        raise ValueError("Chunk size must be a positive multiple of 16.")
+    in_file = in_map = None
+    if isinstance(source, (str, os.PathLike)):
+        in_file = open(source, "rb")
+        size = os.fstat(in_file.fileno()).st_size
+        if size:
+            in_map = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(in_map) if in_map is not None else memoryview(b'')
+    else:
+        data = memoryview(source).cast('B')
+        size = len(data)
+    num_chunks = (size + chunk_size - 1) // chunk_size
+    header = HEADER.pack(MAGIC, VERSION, MODE_CODES[mode], key_id(modes_obj.aes.key),
+                         chunk_size, num_chunks, size)
+    ivs = [os.urandom(IV_SIZE) for _ in range(num_chunks)]
+    jobs = chunk_jobs(data, chunk_size, ivs, header)
+    try:
+        with open_output(output_path) as f_out:
+            f_out.write(header)
+            f_out.write(b''.join(ivs))
+            offset = HEADER.size + IV_SIZE * num_chunks
+            index = []
+            for chunk in map_chunks(modes_obj, True, mode, jobs, workers, executor):
+                f_out.write(chunk)
+                index.append(INDEX_ENTRY.pack(offset, len(chunk)))
+                offset += len(chunk)
+            f_out.write(b''.join(index))
+            f_out.write(TRAILER.pack(offset, INDEX_MAGIC))
+        return num_chunks
+    except BaseException as error:
+        # The cipher's frames still hold views of the job slices; drop them so
+        # the slices and the map can be released and the original error is reported.
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        jobs.close()
+        data.release()
+        if in_map is not None:
+            in_map.close()
+        if in_file is not None:
+            in_file.close()
+
+
+@contextlib.contextmanager
+def open_output(output_path):
+    """Open 'output_path' for writing; the file is removed again if the block fails."""
+    f_out = open(output_path, "wb")
+    try:
+        with f_out:
+            yield f_out
+    except BaseException:
+        os.remove(output_path)
+        raise
+
+
+############################################################################
+# Reading
+############################################################################
+
+class ContainerReader:
+    """
+    Random access to a container:
+        with ContainerReader(modes_obj, path) as reader:
+            reader.read_chunk(k)
+    Only the header, IV table, index and the requested chunks are read.
+    """
+
+    def __init__(self, modes_obj, path):
+        self.modes = modes_obj
+        self.f = open(path, "rb")
+        try:
+            self.header = self.f.read(HEADER.size)
+            if len(self.header) < HEADER.size:
+                raise ValueError("Not an AES container (file too short).")
+            magic, version, code, kid, self.chunk_size, self.num_chunks, self.size = HEADER.unpack(self.header)
+            if magic != MAGIC or code not in MODE_NAMES:
+                raise ValueError("Not an AES container.")
+            if version != VERSION:
+                raise ValueError(f"Unsupported container version: {version}")
+            if kid != key_id(modes_obj.aes.key):
+                raise ValueError("Container was written with a different key.")
+            self.mode = MODE_NAMES[code]
+            iv_table = self.f.read(IV_SIZE * self.num_chunks)
+            self.ivs = [iv_table[i:i + IV_SIZE] for i in range(0, len(iv_table), IV_SIZE)]
+            self.f.seek(-TRAILER.size, os.SEEK_END)
+            index_offset, magic = TRAILER.unpack(self.f.read(TRAILER.size))
+            if magic != INDEX_MAGIC or len(self.ivs) != self.num_chunks:
+                raise ValueError("Container index is missing or truncated.")
+            self.f.seek(index_offset)
+            index = self.f.read(INDEX_ENTRY.size * self.num_chunks)
+            self.index = [INDEX_ENTRY.unpack_from(index, i * INDEX_ENTRY.size) for i in range(self.num_chunks)]
+        except Exception:
+            self.f.close()
+            raise
+
+    def read_raw(self, k):
+        offset, length = self.index[k]
+        self.f.seek(offset)
+        return self.f.read(length)
+
+    def read_chunk(self, k):
+        """Decrypt chunk k (plaintext[k*chunk_size:(k+1)*chunk_size])."""
+        if not 0 <= k < self.num_chunks:
+            raise IndexError(f"Chunk {k} out of range (container has {self.num_chunks}).")
+        return decrypt_chunk(self.modes, self.mode, self.ivs[k], self.read_raw(k), chunk_aad(self.header, k))
+
+    def decrypt_to(self, output_path, workers=None, executor=None):
+        """
+        Decrypt every chunk (in worker processes) into 'output_path'. On a bad
+        chunk or a length mismatch the output file is removed.
+        """
+        jobs = ((self.ivs[k], self.read_raw(k), chunk_aad(self.header, k)) for k in range(self.num_chunks))
+        written = 0
+        with open_output(output_path) as f_out:
+            for chunk in map_chunks(self.modes, False, self.mode, jobs, workers, executor):
+                f_out.write(chunk)
+                written += len(chunk)
+            if written != self.size:
+                raise ValueError("Container plaintext length does not match its header.")
+        return written
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_container(modes_obj, path, output_path, workers=None, executor=None):
+    """Decrypt a whole container file into 'output_path'; returns the plaintext length."""
+    with ContainerReader(modes_obj, path) as reader:
+        return reader.decrypt_to(output_path, workers, executor)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+GCM (Galois/Counter Mode) on top of the AES class: CTR encryption plus a
+GHASH tag over the additional authenticated data (AAD) and the ciphertext,
+in a single pass over the data.
+
+GHASH uses Shoup's 8-bit tables: for hash key H and byte position j,
+TABLE[j][b] = (b placed at byte j) * H in GF(2^128), so multiplying a block by
+H is 16 table lookups XORed together. The tables are built once per H and
+shared through an LRU cache like the key schedules.
+
+Streaming use:
+    enc = GCMEncryptor(aes, batch, nonce, aad)
+    ct = enc.update(chunk1) + enc.update(chunk2) + enc.finalize();  tag = enc.tag
+    dec = GCMDecryptor(aes, batch, nonce, aad)
+    pt = dec.update(ct) + dec.finalize(tag)      # raises ValueError on a bad tag
+"""
+import hmac
+from .key_cache import KeyScheduleCache
+from ciphermodes.stream import StreamCipher, CTREncryptor
+
+BLOCK_SIZE = 16
+# GCM counters are whole 128-bit blocks
+COUNTER_MASK = (1 << 128) - 1
+NONCE_SIZE = 12
+TAG_SIZE = 16
+# Reduction constant for multiplication by x (GCM bit order: bit 0 is the MSB)
+R = 0xE1 << 120
+# GHASH tables are kept for this many hash keys
+TABLE_CACHE_SIZE = 16
+
+
+def build_ghash_tables(h):
+    """
+    16 tables of 256 ints: TABLE[j][b] = (b << 8*(15-j)) * H.
+    """
+    # V[p] = H * x^p, the product of H with the element whose only set bit is p
+    v = int.from_bytes(h, 'big')
+    powers = []
+    for _ in range(128):
+        powers.append(v)
+        v = (v >> 1) ^ R if v & 1 else v >> 1
+    tables = []
+    for j in range(16):
+        table = [0] * 256
+        for b in range(1, 256):
+            low = b & -b                  # lowest set bit of b ...
+            k = 8 - low.bit_length()      # ... is bit k of the byte, counted from the MSB
+            table[b] = table[b ^ low] ^ powers[8 * j + k]
+        tables.append(table)
+    return tables
+
+
+GHASH_TABLES = KeyScheduleCache(build_ghash_tables, TABLE_CACHE_SIZE)
+
+
+class GHash:
+    """Incremental GHASH over whole 16-byte blocks."""
+
+    def __init__(self, h):
+        self.tables = GHASH_TABLES.get(h)
+        self.y = 0
+
+    def update(self, data):
+        """Absorb len(data) bytes (a multiple of 16)."""
+        (t0, t1, t2, t3, t4, t5, t6, t7,
+         t8, t9, t10, t11, t12, t13, t14, t15) = self.tables
+        y = self.y
+        for i in range(0, len(data), BLOCK_SIZE):
+            b = (y ^ int.from_bytes(data[i:i + BLOCK_SIZE], 'big')).to_bytes(BLOCK_SIZE, 'big')
+            y = (t0[b[0]] ^ t1[b[1]] ^ t2[b[2]] ^ t3[b[3]] ^ t4[b[4]] ^ t5[b[5]] ^ t6[b[6]] ^ t7[b[7]] ^
+                 t8[b[8]] ^ t9[b[9]] ^ t10[b[10]] ^ t11[b[11]] ^ t12[b[12]] ^ t13[b[13]] ^ t14[b[14]] ^ t15[b[15]])
+        self.y = y
+
+    def update_padded(self, data):
+        """Absorb data, zero-padding the last partial block."""
+        full = len(data) // BLOCK_SIZE * BLOCK_SIZE
+        self.update(data[:full])
+        if full < len(data):
+            self.update(bytes(data[full:]) + bytes(BLOCK_SIZE - (len(data) - full)))
+
+
+def hash_key(aes):
+    """H = E_K(0^128)."""
+    return bytes(aes.encrypt(bytes(BLOCK_SIZE)))
+
+
+def initial_counter(aes, nonce):
+    """J0: nonce || 0^31 || 1 for 96-bit nonces, otherwise GHASH(nonce || pad || len)."""
+    if len(nonce) == NONCE_SIZE:
+        return int.from_bytes(nonce, 'big') << 32 | 1
+    if not nonce:
+        raise ValueError("GCM nonce must not be empty.")
+    ghash = GHash(hash_key(aes))
+    ghash.update_padded(nonce)
+    ghash.update((len(nonce) * 8).to_bytes(BLOCK_SIZE, 'big'))
+    return ghash.y
+
+
+def inc32(counter):
+    """Increment the low 32 bits of a counter block, leaving the upper 96 bits alone."""
+    return (counter & ~0xFFFFFFFF & COUNTER_MASK) | ((counter + 1) & 0xFFFFFFFF)
+
+
+class GCMEncryptor(StreamCipher):
+    """
+    Streaming GCM encryption. AAD is given to the constructor or through
+    update_aad() before the first update(); the tag is available as .tag
+    after finalize(). Output carries no nonce prefix or tag suffix.
+    """
+    decrypting = False
+
+    def __init__(self, aes, batch=None, nonce=None, aad=b'', tag_length=TAG_SIZE):
+        if nonce is None:
+            raise ValueError("GCM needs a nonce.")
+        if not 4 <= tag_length <= TAG_SIZE:
+            raise ValueError("GCM tag length must be between 4 and 16 bytes.")
+        super().__init__(aes, batch, nonce)
+        self.tag_length = tag_length
+        self.ghash = GHash(hash_key(aes))
+        j0 = initial_counter(aes, self.iv)
+        self.tag_mask = bytes(aes.encrypt(j0.to_bytes(BLOCK_SIZE, 'big')))
+        # The CTR keystream starts at inc32(J0)
+        self.first_counter = inc32(j0).to_bytes(BLOCK_SIZE, 'big')
+        self.ctr = CTREncryptor(aes, batch, self.first_counter)
+        self.aad = bytearray()
+        self.aad_length = 0
+        self.data_length = 0
+        self.tag = None
+        self.update_aad(aad)
+
+    def update_aad(self, aad):
+        """Add more authenticated-only data; must come before any update()."""
+        if self.data_length or self.finalized or self.aad is None:
+            raise ValueError("AAD must be supplied before the data.")
+        self.aad += aad
+        self.aad_length += len(aad)
+        full = len(self.aad) // BLOCK_SIZE * BLOCK_SIZE
+        self.ghash.update(self.aad[:full])
+        del self.aad[:full]
+
+    def close_aad(self):
+        if self.aad is not None:
+            self.ghash.update_padded(self.aad)
+            self.aad = None
+
+    def gctr_into(self, src, out, offset):
+        """CTR over src with the GCM counter, which wraps within its low 32 bits."""
+        ctr = self.ctr
+        room = ((1 << 32) - (ctr.counter & 0xFFFFFFFF)) * BLOCK_SIZE
+        if len(src) > room:
+            ctr.process_into(src[:room], out, offset)
+            ctr.counter = (ctr.counter - (1 << 32)) & COUNTER_MASK
+            src, offset = src[room:], offset + room
+        ctr.process_into(src, out, offset)
+
+    def process_into(self, src, out, offset):
+        self.close_aad()
+        n = len(src)
+        self.data_length += n
+        if self.decrypting:
+            self.ghash.update(src)
+            self.gctr_into(src, out, offset)
+        else:
+            self.gctr_into(src, out, offset)
+            self.ghash.update(memoryview(out)[offset:offset + n])
+
+    def finish(self):
+        self.close_aad()
+        tail = bytes(self.pending)
+        out = bytearray(len(tail))
+        self.data_length += len(tail)
+        self.gctr_into(tail, out, 0)
+        self.ghash.update_padded(tail if self.decrypting else out)
+        self.compute_tag()
+        return out
+
+    def compute_tag(self):
+        lengths = (self.aad_length * 8).to_bytes(8, 'big') + (self.data_length * 8).to_bytes(8, 'big')
+        self.ghash.update(lengths)
+        full_tag = (self.ghash.y ^ int.from_bytes(self.tag_mask, 'big')).to_bytes(BLOCK_SIZE, 'big')
+        self.tag = full_tag[:self.tag_length]
+        return self.tag
+
+    def authenticate(self, ciphertext):
+        """
+        Compute the tag for a complete ciphertext whose CTR part was done
+        elsewhere (e.g. by parallel.ctr_parallel starting at self.first_counter).
+        Replaces update()/finalize(); returns the tag.
+        """
+        if self.data_length or self.finalized:
+            raise ValueError("authenticate() cannot be mixed with update().")
+        self.finalized = True
+        self.close_aad()
+        self.ghash.update_padded(ciphertext)
+        self.data_length = len(ciphertext)
+        return self.compute_tag()
+
+
+class GCMDecryptor(GCMEncryptor):
+    """
+    Streaming GCM decryption. update() returns plaintext before the tag has been
+    checked; only trust the output once finalize(tag) has returned.
+    """
+    decrypting = True
+
+    def emit_into(self, segments, out, offset, final):
+        if final:
+            raise ValueError("GCM decryption must end with finalize(tag).")
+        return super().emit_into(segments, out, offset, final)
+
+    def finalize(self, tag):
+        """Return the last plaintext bytes; raises ValueError if 'tag' does not match."""
+        out = super().finalize()
+        self.verify(tag)
+        return out
+
+    def verify(self, tag):
+        """Raise ValueError unless 'tag' matches the computed tag."""
+        if len(tag) != self.tag_length or not hmac.compare_digest(self.tag, bytes(tag)):
+            raise ValueError("GCM tag verification failed.")
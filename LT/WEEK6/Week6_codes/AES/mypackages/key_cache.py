@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide cache of expanded AES key schedules.
+
+Schedules are keyed by the raw key bytes and shared by every AES instance,
+key_expansion object and modes object built from the same key, so the
+expansion runs once per key instead of once per instance.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+
+# Number of distinct keys kept before the least recently used one is dropped
+CACHE_SIZE = 64
+
+
+class KeySchedule:
+    """
+    Expanded key in flat form:
+      - enc       : array('I') of 4*(Nr+1) round key words (big-endian words)
+      - dec       : array('I') of round key words for the equivalent inverse cipher
+      - enc_bytes : the encryption round keys as bytes, 4 bytes per word
+    """
+    __slots__ = ("key", "num_rounds", "enc", "dec", "enc_bytes")
+
+    def __init__(self, key, enc_words, dec_words):
+        self.key = key
+        self.num_rounds = len(enc_words) // 4 - 1
+        self.enc = array('I', enc_words)
+        self.dec = array('I', dec_words)
+        self.enc_bytes = b''.join(w.to_bytes(4, 'big') for w in enc_words)
+
+    def round_keys(self):
+        """Round keys as a new list of 4-byte lists (the format of key_expansion_128/192/256)."""
+        b = self.enc_bytes
+        return [list(b[i:i+4]) for i in range(0, len(b), 4)]
+
+
+class KeyScheduleCache:
+    def __init__(self, build, maxsize=CACHE_SIZE):
+        """
+        'build' maps key bytes to a KeySchedule; 'maxsize' bounds the number of keys kept.
+        """
+        self.build = build
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the schedule for 'key', expanding and caching it on first use."""
+        key = bytes(key)
+        with self._lock:
+            schedule = self._schedules.get(key)
+            if schedule is not None:
+                self._schedules.move_to_end(key)
+                self.hits += 1
+                return schedule
+            self.misses += 1
+        # Expand outside the lock; a concurrent miss on the same key just builds it twice
+        schedule = self.build(key)
+        with self._lock:
+            self._schedules[key] = schedule
+            self._schedules.move_to_end(key)
+            while len(self._schedules) > self.maxsize:
+                self._schedules.popitem(last=False)
+        return schedule
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Snapshot of the cache counters."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._schedules), "maxsize": self.maxsize}
@@ -1,8 +1,19 @@
 
 #ref: https://nvlpubs.nist.gov/nistpubs/FIPS/NIST.FIPS.197-upd1.pdf
+from .AES import KEY_SCHEDULES
+
 class key_expansion:
     def __init__(self, key):
         self.key = key
+
+    def cached_round_keys(self, key_size):
+        """
+        Round keys from the process-wide schedule cache shared with AES/modes.
+        Returns None if the key is too short, so the step-by-step expansion runs instead.
+        """
+        if len(self.key) < key_size:
+            return None
+        return KEY_SCHEDULES.get(self.key[:key_size]).round_keys()
     # S-box constants
     S_BOX = [
         0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
@@ -50,6 +61,9 @@ class key_expansion:
     """
     ################# Gen 10 round keys for AES-128: (44 words x 32 bits)/128 =11 keys)
     def key_expansion_128(self):
+        cached = self.cached_round_keys(16)
+        if cached is not None:
+            return cached
         key_size = 16  # Note:len(self.key)
         key_words = 4 #Note: key_size // 4     
         ### The first w[0], w[1], ... w[3] come from original key
@@ -65,6 +79,9 @@ class key_expansion:
     
 ################# Gen 12 round keys for AES-192: (52 words x 32 bits)/128 =13 keys)
     def key_expansion_192(self):
+        cached = self.cached_round_keys(24)
+        if cached is not None:
+            return cached
         round_keys = [list(self.key[i:i+4]) for i in range(0, 24, 4)]
 
         for i in range(6, 52):  # 52 words for AES-192
@@ -76,6 +93,9 @@ class key_expansion:
         return round_keys
 ################# Gen 14 round keys for AES-256: (60 words x 32 bits)/128 =15 keys)
     def key_expansion_256(self):
+        cached = self.cached_round_keys(32)
+        if cached is not None:
+            return cached
         round_keys = [list(self.key[i:i+4]) for i in range(0, 32, 4)]
 
         for i in range(8, 60):  # 60 words for AES-256
@@ -1,15 +1,53 @@
 import os
 from .AES import AES
-
-class modes:
-    def __init__(self, key):
+from ciphermodes.blockmodes import BlockModes
+from ciphermodes.stream import CTREncryptor
+from ciphermodes import parallel, instrument
+from .gcm import GCMEncryptor, GCMDecryptor, NONCE_SIZE, TAG_SIZE
+try:
+    import numpy as np
+    from .aes_numpy import AESNumpy
+    from .aes_bitslice import AESBitslice
+    # Multi-block engines for modes whose blocks are independent (ECB, CTR, CBC decrypt)
+    BATCH_ENGINES = {"numpy": AESNumpy, "bitslice": AESBitslice}
+    DEFAULT_BATCH_ENGINE = "numpy"
+except ImportError:  # NumPy is optional; fall back to the per-block loops
+    np = None
+    BATCH_ENGINES = {}
+    DEFAULT_BATCH_ENGINE = None
+
+class modes(BlockModes):
+    def __init__(self, key, engine="ttable", batch_engine=DEFAULT_BATCH_ENGINE):
+        """
+        'engine' is the single-block AES engine ("ttable" or "reference").
+        'batch_engine' is the multi-block engine: "numpy", "bitslice" or None to
+        always use the single-block loops. Both need NumPy.
+        "bitslice" does no table lookups, but only for the blocks handed to it:
+        ECB, CBC and CFB decryption, whole CTR blocks (also inside GCM) and the
+        XTS data blocks. CBC and CFB encryption, OFB, a trailing partial CTR
+        block, next_keystream_block(), GCM's hash key, tag mask and GHASH, the
+        XTS tweak of a single sector and the key schedule still use table
+        lookups, so the modes as a whole are not constant-time.
+        """
         key_length = len(key) * 8  # Convert key length to bits
         if key_length not in [128, 192, 256]:
             raise ValueError("Invalid key length. Supported lengths are 128, 192, and 256 bits.")
-        self.aes = AES(key, key_length)  # an AES class that takes a key and key_length
-        self.iv = os.urandom(16)
-        # This can be set externally (e.g. from your main script):
-        self.mode = None
+        self.aes = AES(key, key_length, engine)  # an AES class that takes a key and key_length
+        self.batch_engine = batch_engine
+        if batch_engine is None:
+            batch = None
+        elif batch_engine in BATCH_ENGINES:
+            batch = BATCH_ENGINES[batch_engine](self.aes)
+        elif np is None:
+            raise ValueError(f"Batch engine '{batch_engine}' requires NumPy.")
+        else:
+            raise ValueError(f"Unknown batch engine: {batch_engine}")
+        # ECB/CBC/CFB/OFB/CTR, streaming and parallel paths come from BlockModes
+        super().__init__(self.aes, batch)
+
+    def spec(self):
+        """Rebuild from the key in worker processes, so they use their own schedule cache."""
+        return modes, (bytes(self.aes.key), self.aes.engine, self.batch_engine)
 
     ############################################################################
     # HELPER METHODS
@@ -47,82 +85,53 @@ class modes:
         return '0b' + binary_str[:last_one_index]
 
     ############################################################################
-    # PKCS7 PADDING
+    # INPUT CONVERSION
     ############################################################################
 
-    def pkcs7_padding(self, data):
+    def to_bytes(self, data):
         """
-        Apply PKCS7 padding.
+        Convert input for the padded modes to bytes.
         'data' can be:
           - A string (will be encoded to UTF-8),
           - A binary string starting with '0b' (will be converted to bytes),
-          - Already bytes (no conversion needed).
+          - Already bytes-like (bytes, bytearray, memoryview; no conversion needed).
         """
         if isinstance(data, str):
             # If it's a '0b...' string
             if data.startswith('0b'):
                 # treat it as a binary string
-                data = self.binary_to_bytes(data[2:])
-            else:
-                # treat it as normal text -> encode to UTF-8
-                data = data.encode('utf-8')
-        elif not isinstance(data, bytes):
+                return self.binary_to_bytes(data[2:])
+            # treat it as normal text -> encode to UTF-8
+            return data.encode('utf-8')
+        if not isinstance(data, (bytes, bytearray, memoryview)):
             # If it's neither str nor bytes, raise an error
             raise TypeError("pkcs7_padding requires data to be str or bytes.")
-
-        padding_length = 16 - (len(data) % 16)
-        padded_data = data + bytes([padding_length] * padding_length)
-        return padded_data
-
-    def pkcs7_unpadding(self, data):
-        """
-        Remove PKCS7 padding. Returns raw bytes (no UTF-8 decoding here).
-        """
-        if not data:
-            return data
-        padding_length = data[-1]
-        if padding_length < 1 or padding_length > 16:
-            # Invalid padding
-            raise ValueError("Invalid PKCS7 padding.")
-        return data[:-padding_length]
+        return data
 
     ############################################################################
     # ECB MODE
     ############################################################################
 
-    def ecb_encrypt(self, plaintext):
+    def ecb_encrypt(self, plaintext, dedup=False):
         """
         Encrypt data in ECB mode.
         'plaintext' can be str or bytes (or '0b...' string).
-        Returns raw encrypted bytes.
+        'dedup' encrypts each distinct block only once (for redundant data such as raw pixels).
+        Returns the encrypted data as a bytearray.
         """
-        padded_data = self.pkcs7_padding(plaintext)
-
-        encrypted_blocks = []
-        for i in range(0, len(padded_data), 16):
-            block = padded_data[i:i+16]
-            encrypted_block = self.aes.encrypt(block)
-            encrypted_blocks.append(encrypted_block)
-        return b''.join(encrypted_blocks)
+        return self.run(self.encryptor("ECB", dedup=dedup), self.to_bytes(plaintext), "ECB", "encrypt")
 
-    def ecb_decrypt(self, ciphertext):
+    def ecb_decrypt(self, ciphertext, dedup=False):
         """
         Decrypt data in ECB mode. 
         'ciphertext' must be bytes. 
-        Returns raw bytes (with PKCS7 unpadding removed).
+        'dedup' decrypts each distinct block only once.
+        Returns the raw plaintext as a bytearray (PKCS7 padding removed).
         """
         if len(ciphertext) % 16 != 0:
             raise ValueError("Ciphertext length must be multiple of 16 bytes for ECB mode.")
-
-        decrypted_blocks = []
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            decrypted_block = self.aes.decrypt(block)
-            decrypted_blocks.append(decrypted_block)
-
-        decrypted_data = self.pkcs7_unpadding(b''.join(decrypted_blocks))
         # Return raw bytes. If you know it's text, decode externally.
-        return decrypted_data
+        return self.run(self.decryptor("ECB", dedup=dedup), ciphertext, "ECB", "decrypt")
 
     ############################################################################
     # CBC MODE
@@ -132,49 +141,20 @@ class modes:
         """
         Encrypt data in CBC mode.
         'plaintext' can be str/bytes.
-        Returns IV + encrypted bytes.
+        Returns IV + encrypted bytes as a bytearray.
         """
-        padded_data = self.pkcs7_padding(plaintext)
-        encrypted_blocks = []
-        previous_block = self.iv
-        print("The Initial Vector (IV):", previous_block.hex())
-
-        for i in range(0, len(padded_data), 16):
-            block = padded_data[i:i+16]
-            # XOR with previous ciphertext block or IV for the first
-            xor_block = bytes([block[j] ^ previous_block[j] for j in range(16)])
-            encrypted_block = self.aes.encrypt(xor_block)
-            encrypted_blocks.append(encrypted_block)
-            previous_block = encrypted_block
-
-        return self.iv + b''.join(encrypted_blocks)
+        return self.run(self.encryptor("CBC"), self.to_bytes(plaintext), "CBC", "encrypt", self.iv)
 
     def cbc_decrypt(self, ciphertext):
         """
         Decrypt data in CBC mode.
         Expects: IV (16 bytes) + ciphertext.
-        Returns raw bytes after unpadding.
+        Returns the raw plaintext as a bytearray after unpadding.
         """
         if len(ciphertext) < 16 or (len(ciphertext) % 16) != 0:
             raise ValueError("Ciphertext (including IV) must be multiple of 16 bytes for CBC.")
 
-        iv = ciphertext[:16]
-        ciphertext = ciphertext[16:]
-        previous_block = iv
-
-        print("The Initial Vector (IV):", iv.hex())
-
-        decrypted_blocks = []
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            decrypted_block = self.aes.decrypt(block)
-            # XOR with previous ciphertext block
-            xor_block = bytes([decrypted_block[j] ^ previous_block[j] for j in range(16)])
-            decrypted_blocks.append(xor_block)
-            previous_block = block
-
-        decrypted_data = self.pkcs7_unpadding(b''.join(decrypted_blocks))
-        return decrypted_data
+        return self.run(self.decryptor("CBC"), ciphertext, "CBC", "decrypt", bytes(ciphertext[:16]))
 
     ############################################################################
     # CFB MODE (64-bit or 128-bit)
@@ -185,65 +165,21 @@ class modes:
         Encrypt data in CFB mode.
         For text data, 'plaintext' can be str. For arbitrary data, pass bytes.
         segment_size can be 64 or 128 bits.
+        Returns IV + encrypted bytes as a bytearray.
         """
-        if segment_size not in [64, 128]:
-            raise ValueError("Segment size must be either 64 or 128 bits for CFB.")
-
         if isinstance(plaintext, str):
             plaintext = plaintext.encode('utf-8')
-
-        segment_bytes = segment_size // 8
-        encrypted_blocks = []
-        previous_block = self.iv
-
-        print("The Initial Vector (IV):", previous_block.hex())
-
-        for i in range(0, len(plaintext), segment_bytes):
-            segment = plaintext[i:i+segment_bytes]
-            encrypted_iv = self.aes.encrypt(previous_block)
-            encrypted_segment = bytes([segment[j] ^ encrypted_iv[j] for j in range(len(segment))])
-            encrypted_blocks.append(encrypted_segment)
-
-            # Shift register
-            if segment_size == 64:
-                # Move left by segment_bytes in a 16-byte shift register
-                previous_block = previous_block[segment_bytes:] + encrypted_segment
-            else:
-                # 128-bit shift
-                previous_block = encrypted_segment
-
-        return self.iv + b''.join(encrypted_blocks)
+        cipher = self.encryptor("CFB", segment_size)
+        return self.run(cipher, plaintext, "CFB", "encrypt", self.iv)
 
     def cfb_decrypt(self, ciphertext, segment_size=128):
         """
         Decrypt data in CFB mode.
         Expects: IV + ciphertext blocks.
-        Returns raw bytes. If you know it is text, decode externally.
+        Returns the raw plaintext as a bytearray. If you know it is text, decode externally.
         """
-        if segment_size not in [64, 128]:
-            raise ValueError("Segment size must be either 64 or 128 bits for CFB.")
-
-        iv = ciphertext[:16]
-        ciphertext = ciphertext[16:]
-        previous_block = iv
-        segment_bytes = segment_size // 8
-
-        print("The Initial Vector (IV):", iv.hex())
-
-        decrypted_blocks = []
-        for i in range(0, len(ciphertext), segment_bytes):
-            segment = ciphertext[i:i+segment_bytes]
-            encrypted_iv = self.aes.encrypt(previous_block)
-            decrypted_segment = bytes([segment[j] ^ encrypted_iv[j] for j in range(len(segment))])
-            decrypted_blocks.append(decrypted_segment)
-
-            # Shift register
-            if segment_size == 64:
-                previous_block = previous_block[segment_bytes:] + segment
-            else:
-                previous_block = segment
-
-        return b''.join(decrypted_blocks)
+        cipher = self.decryptor("CFB", segment_size)
+        return self.run(cipher, ciphertext, "CFB", "decrypt", bytes(ciphertext[:16]))
 
     ############################################################################
     # OFB MODE
@@ -252,48 +188,20 @@ class modes:
     def ofb_encrypt(self, plaintext):
         """
         Encrypt data using OFB mode.
-        Returns IV + ciphertext bytes.
+        Returns IV + ciphertext bytes as a bytearray.
         """
-        padded_data = self.pkcs7_padding(plaintext)
-        encrypted_blocks = []
-        previous_block = self.iv
-
-        print("The Initial Vector (IV):", previous_block.hex())
-
-        for i in range(0, len(padded_data), 16):
-            block = padded_data[i:i+16]
-            encrypted_iv = self.aes.encrypt(previous_block)
-            encrypted_block = bytes([block[j] ^ encrypted_iv[j] for j in range(len(block))])
-            encrypted_blocks.append(encrypted_block)
-            previous_block = encrypted_iv
-
-        return self.iv + b''.join(encrypted_blocks)
+        return self.run(self.encryptor("OFB"), self.to_bytes(plaintext), "OFB", "encrypt", self.iv)
 
     def ofb_decrypt(self, ciphertext):
         """
         Decrypt data using OFB mode.
         Expects: IV (16 bytes) + ciphertext.
-        Returns raw unpadded bytes.
+        Returns the raw unpadded plaintext as a bytearray.
         """
         if len(ciphertext) < 16 or (len(ciphertext) % 16) != 0:
             raise ValueError("Ciphertext (including IV) must be multiple of 16 bytes for OFB.")
 
-        iv = ciphertext[:16]
-        ciphertext = ciphertext[16:]
-        previous_block = iv
-
-        print("The Initial Vector (IV):", iv.hex())
-
-        decrypted_blocks = []
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            encrypted_iv = self.aes.encrypt(previous_block)
-            decrypted_block = bytes([block[j] ^ encrypted_iv[j] for j in range(len(block))])
-            decrypted_blocks.append(decrypted_block)
-            previous_block = encrypted_iv
-
-        decrypted_data = self.pkcs7_unpadding(b''.join(decrypted_blocks))
-        return decrypted_data
+        return self.run(self.decryptor("OFB"), ciphertext, "OFB", "decrypt", bytes(ciphertext[:16]))
 
     ############################################################################
     # CTR MODE
@@ -302,44 +210,156 @@ class modes:
     def ctr_encrypt(self, plaintext):
         """
         Encrypt data in CTR mode.
-        No padding is required. Returns IV + encrypted bytes.
+        No padding is required. Returns IV + encrypted bytes as a bytearray.
         """
         if isinstance(plaintext, str):
             plaintext = plaintext.encode('utf-8')
-
-        encrypted_blocks = []
-        counter = int.from_bytes(self.iv, byteorder='big')  # convert IV to a big-endian integer
-        print("The Initial Vector (IV):", self.iv.hex())
-
-        for i in range(0, len(plaintext), 16):
-            block = plaintext[i:i+16]
-            encrypted_counter = self.aes.encrypt(counter.to_bytes(16, byteorder='big'))
-            encrypted_block = bytes([block[j] ^ encrypted_counter[j] for j in range(len(block))])
-            encrypted_blocks.append(encrypted_block)
-            counter += 1
-
-        return self.iv + b''.join(encrypted_blocks)
+        return self.run(self.encryptor("CTR"), plaintext, "CTR", "encrypt", self.iv)
 
     def ctr_decrypt(self, ciphertext):
         """
         Decrypt data in CTR mode.
         Expects IV (16 bytes) + ciphertext blocks.
-        Returns raw bytes (no padding).
+        Returns the raw plaintext as a bytearray (no padding).
         """
         if len(ciphertext) < 16:
             raise ValueError("Ciphertext is too short for CTR mode (missing IV).")
 
-        iv = ciphertext[:16]
-        ciphertext = ciphertext[16:]
-        counter = int.from_bytes(iv, byteorder='big')
-        print("The Initial Vector (IV):", iv.hex())
+        return self.run(self.decryptor("CTR"), ciphertext, "CTR", "decrypt", bytes(ciphertext[:16]))
+
+    def ctr_decrypt_range(self, ciphertext_or_file, offset, length):
+        """
+        Decrypt only plaintext bytes [offset, offset + length) of a CTR ciphertext.
+        'ciphertext_or_file' is IV (16 bytes) + ciphertext as bytes, an open binary
+        file, or a file path (e.g. a file written by AES_run.py). For files only the
+        IV and the blocks covering the range are read.
+        The keystream starts at counter IV + offset // 16; the range is clipped at
+        the end of the ciphertext. Returns the plaintext range as a bytearray.
+        """
+        if offset < 0 or length < 0:
+            raise ValueError("Offset and length must be non-negative.")
+        if isinstance(ciphertext_or_file, (str, os.PathLike)):
+            with open(ciphertext_or_file, 'rb') as f:
+                return self.ctr_decrypt_range(f, offset, length)
+
+        first_block = offset // 16
+        skip = offset - first_block * 16  # bytes of the first block before 'offset'
+        if hasattr(ciphertext_or_file, 'read'):
+            f = ciphertext_or_file
+            f.seek(0)
+            iv = f.read(16)
+            if len(iv) < 16:
+                raise ValueError("Ciphertext is too short for CTR mode (missing IV).")
+            f.seek(16 + first_block * 16)
+            data = f.read(skip + length)
+        else:
+            if len(ciphertext_or_file) < 16:
+                raise ValueError("Ciphertext is too short for CTR mode (missing IV).")
+            view = memoryview(ciphertext_or_file)
+            iv = view[:16]
+            data = view[16 + first_block * 16:16 + offset + length]
+
+        counter = (int.from_bytes(iv, 'big') + first_block) & ((1 << (8 * self.block_size)) - 1)
+        cipher = CTREncryptor(self.aes, self.batch, counter.to_bytes(16, 'big'))
+        out = bytearray(len(data))
+        cipher.process_into(data, out, 0)
+        del out[:skip]
+        return out
+
+    def ctr_encrypt_parallel(self, plaintext, workers=None, executor=None):
+        """
+        CTR encryption with the counter range split across worker processes.
+        Same output as ctr_encrypt(); 'workers' defaults to the CPU count and
+        'executor' may be a ProcessPoolExecutor reused between calls.
+        """
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        return self.encrypt_parallel(plaintext, workers, executor)
 
-        decrypted_blocks = []
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            encrypted_counter = self.aes.encrypt(counter.to_bytes(16, byteorder='big'))
-            decrypted_block = bytes([block[j] ^ encrypted_counter[j] for j in range(len(block))])
-            decrypted_blocks.append(decrypted_block)
-            counter += 1
+    def ctr_decrypt_parallel(self, ciphertext, workers=None, executor=None):
+        """
+        CTR decryption with the counter range split across worker processes.
+        Expects IV (16 bytes) + ciphertext, like ctr_decrypt().
+        """
+        return self.decrypt_parallel("CTR", ciphertext, workers, executor)
 
-        return b''.join(decrypted_blocks)
+    def cbc_decrypt_parallel(self, ciphertext, workers=None, executor=None):
+        """
+        CBC decryption with the ciphertext split into chunks across worker processes.
+        Same output as cbc_decrypt(); each chunk starts from the ciphertext block
+        before it, and the padding is stripped once at the end.
+        """
+        if len(ciphertext) < 16 or (len(ciphertext) % 16) != 0:
+            raise ValueError("Ciphertext (including IV) must be multiple of 16 bytes for CBC.")
+        return self.decrypt_parallel("CBC", ciphertext, workers, executor)
+
+    def cfb_decrypt_parallel(self, ciphertext, workers=None, executor=None):
+        """
+        CFB-128 decryption with the ciphertext split into chunks across worker processes.
+        Same output as cfb_decrypt(ciphertext, 128).
+        """
+        return self.decrypt_parallel("CFB", ciphertext, workers, executor)
+
+    ############################################################################
+    # GCM MODE (authenticated)
+    ############################################################################
+
+    def gcm_encryptor(self, nonce, aad=b''):
+        """Streaming GCM encryptor; the tag is in .tag after finalize()."""
+        return GCMEncryptor(self.aes, self.batch, nonce, aad)
+
+    def gcm_decryptor(self, nonce, aad=b''):
+        """Streaming GCM decryptor; finalize(tag) verifies the tag."""
+        return GCMDecryptor(self.aes, self.batch, nonce, aad)
+
+    def gcm_encrypt(self, plaintext, aad=b'', nonce=None, workers=None):
+        """
+        Encrypt and authenticate 'plaintext' (and 'aad') in GCM mode.
+        A fresh 12-byte nonce is drawn unless one is given; it must never be
+        reused with the same key. Other nonce lengths are only supported by
+        gcm_encryptor(), since gcm_decrypt() reads a 12-byte nonce back.
+        'workers' > 1 runs the CTR part through the parallel CTR path.
+        Returns nonce (12 bytes) + ciphertext + tag (16 bytes) as a bytearray.
+        """
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        nonce = os.urandom(NONCE_SIZE) if nonce is None else bytes(nonce)
+        if len(nonce) != NONCE_SIZE:
+            raise ValueError(f"GCM nonce must be {NONCE_SIZE} bytes (use gcm_encryptor() for other lengths).")
+        started = instrument.start()
+        cipher = self.gcm_encryptor(nonce, aad)
+        out = bytearray(nonce)
+        if workers and workers > 1:
+            # 96-bit nonce: counters start at J0 + 1 and cannot leave the low 32 bits
+            ciphertext = parallel.ctr_parallel(self, cipher.first_counter, plaintext, workers)
+            out += ciphertext
+            cipher.authenticate(ciphertext)
+        else:
+            out += cipher.update(plaintext)
+            out += cipher.finalize()
+        out += cipher.tag
+        instrument.record(started, self.aes, "GCM", "encrypt", len(plaintext), nonce)
+        return out
+
+    def gcm_decrypt(self, data, aad=b'', workers=None):
+        """
+        Verify and decrypt nonce (12 bytes) + ciphertext + tag (16 bytes).
+        Returns the plaintext as a bytearray. Raises ValueError if the tag does
+        not match; no plaintext is returned then.
+        """
+        if len(data) < NONCE_SIZE + TAG_SIZE:
+            raise ValueError("GCM data is too short (missing nonce or tag).")
+        started = instrument.start()
+        view = memoryview(data)
+        nonce, ciphertext, tag = bytes(view[:NONCE_SIZE]), view[NONCE_SIZE:-TAG_SIZE], view[-TAG_SIZE:]
+        cipher = self.gcm_decryptor(nonce, aad)
+        if workers and workers > 1:
+            # Check the tag first, then decrypt across processes
+            cipher.authenticate(ciphertext)
+            cipher.verify(tag)
+            out = parallel.ctr_parallel(self, cipher.first_counter, ciphertext, workers)
+        else:
+            out = cipher.update(ciphertext)
+            out += cipher.finalize(tag)
+        instrument.record(started, self.aes, "GCM", "decrypt", len(ciphertext), nonce)
+        return out
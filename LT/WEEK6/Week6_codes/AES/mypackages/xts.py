@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+XTS mode (IEEE P1619) for sector-addressable encrypted volumes.
+
+Every sector is encrypted on its own under a tweak derived from its sector
+number, so any sector can be read or rewritten without touching the others:
+    T_0 = E_K2(sector number, 128-bit little-endian)
+    T_j = T_{j-1} * alpha           (GF(2^128), little-endian, x^128 = x^7+x^2+x+1)
+    C_j = E_K1(P_j ^ T_j) ^ T_j
+A sector whose length is not a multiple of 16 uses ciphertext stealing for
+its last two blocks.
+
+    xts = XTS.from_key(key64)                  # K1 || K2
+    c = xts.encrypt_sectors(first_sector, data)
+    p = xts.decrypt_sector(sector, c[:4096])
+"""
+from .modes import modes, DEFAULT_BATCH_ENGINE
+from ciphermodes.stream import xor_bulk_into
+from ciphermodes import parallel
+try:
+    import numpy as np
+    from ciphermodes.blocks import as_blocks
+    from .aes_numpy import BATCH_BLOCKS
+except ImportError:  # NumPy is optional; sectors are then processed one by one
+    np = None
+
+BLOCK_SIZE = 16
+SECTOR_SIZE = 4096
+# Reduction constant for multiplication by alpha
+GF_128_FDBK = 0x87
+MASK_128 = (1 << 128) - 1
+
+
+def mul_alpha(t):
+    """Multiply a tweak (int read little-endian) by alpha."""
+    t <<= 1
+    return (t & MASK_128) ^ GF_128_FDBK if t >> 128 else t
+
+
+def xts_kernel(modes_obj, src, start, end, out, out_start, arg):
+    """
+    Shard kernel for parallel.run_sharded: XTS over whole sectors src[start:end].
+    arg = (spec of the tweak modes object, sector size, first sector, encrypt).
+    """
+    tweak_spec, sector_size, first_sector, encrypt = arg
+    tweak_cipher = parallel.build_modes(tweak_spec)
+    XTS(modes_obj, tweak_cipher, sector_size).sectors_into(first_sector, src[start:end], out, out_start, encrypt)
+
+
+class XTS:
+    """
+    XTS over two BlockModes objects with 16-byte blocks (e.g. modes.modes):
+    'data_cipher' (K1) encrypts the data, 'tweak_cipher' (K2) encrypts the
+    sector numbers.
+    """
+
+    def __init__(self, data_cipher, tweak_cipher, sector_size=SECTOR_SIZE):
+        if sector_size < BLOCK_SIZE:
+            raise ValueError("XTS sector size must be at least 16 bytes.")
+        if data_cipher.cipher.block_size != BLOCK_SIZE or tweak_cipher.cipher.block_size != BLOCK_SIZE:
+            raise ValueError("XTS needs a cipher with 16-byte blocks.")
+        if bytes(data_cipher.cipher.key) == bytes(tweak_cipher.cipher.key):
+            raise ValueError("XTS data and tweak keys must differ.")
+        self.data = data_cipher
+        self.tweak = tweak_cipher
+        self.sector_size = sector_size
+
+    @classmethod
+    def from_key(cls, key, sector_size=SECTOR_SIZE, engine="ttable", batch_engine=DEFAULT_BATCH_ENGINE):
+        """'key' is K1 || K2: 32, 48 or 64 bytes."""
+        if len(key) not in [32, 48, 64]:
+            raise ValueError("Invalid XTS key length. Supported lengths are 256, 384 and 512 bits.")
+        half = len(key) // 2
+        return cls(modes(key[:half], engine, batch_engine), modes(key[half:], engine, batch_engine), sector_size)
+
+    ############################################################################
+    # SINGLE SECTOR (any length >= 16, ciphertext stealing)
+    ############################################################################
+
+    def initial_tweak(self, sector):
+        """T_0 for a sector, as an int read little-endian."""
+        return int.from_bytes(self.tweak.cipher.encrypt(sector.to_bytes(BLOCK_SIZE, 'little')), 'little')
+
+    def crypt_blocks_into(self, src, out, offset, tweaks, encrypt):
+        """out[offset:] = E/D(src ^ tweaks) ^ tweaks for whole blocks."""
+        n = len(src)
+        xor_bulk_into(out, offset, src, tweaks)
+        cipher = self.data
+        if cipher.batch is not None and n >= cipher.batch.min_blocks * BLOCK_SIZE:
+            blocks = np.frombuffer(out, np.uint8, n, offset).reshape(-1, BLOCK_SIZE)
+            blocks[:] = cipher.batch.encrypt_blocks(blocks) if encrypt else cipher.batch.decrypt_blocks(blocks)
+        else:
+            crypt_into = cipher.cipher.encrypt_into if encrypt else cipher.cipher.decrypt_into
+            for i in range(offset, offset + n, BLOCK_SIZE):
+                crypt_into(out, out, i)
+        xor_bulk_into(out, offset, memoryview(out)[offset:offset + n], tweaks)
+
+    def sector_into(self, sector, src, out, offset, encrypt):
+        """Encrypt or decrypt one sector of len(src) >= 16 bytes into out[offset:]."""
+        n = len(src)
+        if n < BLOCK_SIZE:
+            raise ValueError("XTS needs at least one full block per sector.")
+        num_blocks, tail = divmod(n, BLOCK_SIZE)
+        t = self.initial_tweak(sector)
+        tweaks = bytearray()
+        for _ in range(num_blocks + (1 if tail else 0)):
+            tweaks += t.to_bytes(BLOCK_SIZE, 'little')
+            t = mul_alpha(t)
+        src = memoryview(src)
+        if not tail:
+            self.crypt_blocks_into(src, out, offset, tweaks, encrypt)
+            return
+
+        # Ciphertext stealing: all but the last full block as usual ...
+        head = (num_blocks - 1) * BLOCK_SIZE
+        if head:
+            self.crypt_blocks_into(src[:head], out, offset, tweaks[:head], encrypt)
+        last = tweaks[head:head + BLOCK_SIZE]        # T_{m-1}
+        extra = tweaks[head + BLOCK_SIZE:]           # T_m
+        # ... the last full block with T_{m-1} when encrypting, T_m when decrypting
+        block = bytearray(BLOCK_SIZE)
+        self.crypt_blocks_into(src[head:head + BLOCK_SIZE], block, 0, last if encrypt else extra, encrypt)
+        # The partial block is padded with the stolen end of that result
+        stolen = bytes(src[head + BLOCK_SIZE:]) + block[tail:]
+        out[offset + head + BLOCK_SIZE:offset + n] = block[:tail]
+        self.crypt_blocks_into(stolen, out, offset + head, extra if encrypt else last, encrypt)
+
+    def encrypt_sector(self, sector, data):
+        """Encrypt one sector (len(data) >= 16); returns a bytearray."""
+        out = bytearray(len(data))
+        self.sector_into(sector, data, out, 0, True)
+        return out
+
+    def decrypt_sector(self, sector, data):
+        """Decrypt one sector (len(data) >= 16); returns a bytearray."""
+        out = bytearray(len(data))
+        self.sector_into(sector, data, out, 0, False)
+        return out
+
+    ############################################################################
+    # MANY SECTORS (batched)
+    ############################################################################
+
+    def sectors_into(self, first_sector, src, out, offset, encrypt):
+        """
+        Process consecutive sectors starting at 'first_sector'; len(src) must be a
+        multiple of the sector size. With a batch engine and 16-byte-aligned sectors
+        the tweaks of all sectors are computed with array operations and all blocks
+        go through the cipher together.
+        """
+        size = self.sector_size
+        if len(src) % size:
+            raise ValueError(f"Data length must be a multiple of the sector size ({size} bytes).")
+        count = len(src) // size
+        src = memoryview(src)
+        if (self.data.batch is None or self.tweak.batch is None or size % BLOCK_SIZE
+                or first_sector + count > 1 << 64 or count * size < self.data.batch.min_blocks * BLOCK_SIZE):
+            for k in range(count):
+                self.sector_into(first_sector + k, src[k * size:(k + 1) * size], out, offset + k * size, encrypt)
+            return
+        blocks_per_sector = size // BLOCK_SIZE
+        group = max(1, BATCH_BLOCKS // blocks_per_sector)
+        for k in range(0, count, group):
+            n = min(group, count - k)
+            tweaks = self.batch_tweaks(first_sector + k, n, blocks_per_sector)
+            blocks = as_blocks(src[k * size:(k + n) * size]) ^ tweaks
+            blocks = self.data.batch.encrypt_blocks(blocks) if encrypt else self.data.batch.decrypt_blocks(blocks)
+            dst = np.frombuffer(out, np.uint8, n * size, offset + k * size).reshape(-1, BLOCK_SIZE)
+            np.bitwise_xor(blocks, tweaks, out=dst)
+
+    def batch_tweaks(self, first_sector, count, blocks_per_sector):
+        """(count * blocks_per_sector, 16) array of the tweaks T_j of 'count' sectors."""
+        sectors = np.zeros((count, BLOCK_SIZE), dtype=np.uint8)
+        sectors[:, :8] = np.arange(first_sector, first_sector + count, dtype='<u8').view(np.uint8).reshape(count, 8)
+        t = self.tweak.batch.encrypt_blocks(sectors).view('<u8')  # (count, 2): low, high 64 bits
+        lo, hi = t[:, 0].copy(), t[:, 1].copy()
+        tweaks = np.empty((count, blocks_per_sector, 2), dtype='<u8')
+        for j in range(blocks_per_sector):
+            tweaks[:, j, 0] = lo
+            tweaks[:, j, 1] = hi
+            carry = hi >> np.uint64(63)
+            hi = (hi << np.uint64(1)) | (lo >> np.uint64(63))
+            lo = (lo << np.uint64(1)) ^ (carry * np.uint64(GF_128_FDBK))
+        return tweaks.view(np.uint8).reshape(-1, BLOCK_SIZE)
+
+    def encrypt_sectors(self, first_sector, data):
+        """Encrypt consecutive sectors starting at 'first_sector'; returns a bytearray."""
+        out = bytearray(len(data))
+        self.sectors_into(first_sector, data, out, 0, True)
+        return out
+
+    def decrypt_sectors(self, first_sector, data):
+        """Decrypt consecutive sectors starting at 'first_sector'; returns a bytearray."""
+        out = bytearray(len(data))
+        self.sectors_into(first_sector, data, out, 0, False)
+        return out
+
+    def encrypt_image(self, data, first_sector=0, workers=None, executor=None):
+        """Encrypt a whole image, with the sectors split across worker processes."""
+        return self.image_parallel(data, first_sector, True, workers, executor)
+
+    def decrypt_image(self, data, first_sector=0, workers=None, executor=None):
+        """Decrypt a whole image, with the sectors split across worker processes."""
+        return self.image_parallel(data, first_sector, False, workers, executor)
+
+    def image_parallel(self, data, first_sector, encrypt, workers, executor):
+        size = self.sector_size
+        if len(data) % size:
+            raise ValueError(f"Data length must be a multiple of the sector size ({size} bytes).")
+        tweak_spec = self.tweak.spec()
+        return parallel.run_sharded(
+            self.data, xts_kernel, data, 0, len(data),
+            lambda start: (tweak_spec, size, first_sector + start // size, encrypt),
+            workers, executor, max(1, parallel.SHARD_BYTES // size) * size, unit=size)
+
+    ############################################################################
+    # RANDOM SECTOR ACCESS ON FILES
+    ############################################################################
+
+    def read_sectors(self, f, first_sector, count=1):
+        """Read and decrypt 'count' sectors of an encrypted image opened in binary mode."""
+        f.seek(first_sector * self.sector_size)
+        data = f.read(count * self.sector_size)
+        return self.decrypt_sectors(first_sector, data)
+
+    def write_sectors(self, f, first_sector, plaintext):
+        """Encrypt whole sectors and write them in place; the rest of the image is untouched."""
+        ciphertext = self.encrypt_sectors(first_sector, plaintext)
+        f.seek(first_sector * self.sector_size)
+        f.write(ciphertext)
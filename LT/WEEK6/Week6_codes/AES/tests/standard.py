@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+The AES class in this repo reads and writes its 16-byte state column by
+column (transposed against FIPS-197). This adapter swaps the byte order on
+the way in and out so the published test vectors can be used as they are;
+BulkBlockCipher derives the rest of the block cipher interface.
+"""
+from ciphermodes.blockmodes import BulkBlockCipher
+from mypackages.AES import AES
+
+
+def transpose(block):
+    return bytes(block[4 * (i % 4) + i // 4] for i in range(16))
+
+
+class StandardAES(BulkBlockCipher):
+    block_size = 16
+    name = "AES"
+
+    def __init__(self, key, engine="ttable"):
+        self.key = bytes(key)
+        self.aes = AES(key, len(key) * 8, engine)
+
+    def crypt(self, crypt_block, data):
+        data = bytes(data)
+        return b''.join(transpose(crypt_block(transpose(data[i:i + 16]))) for i in range(0, len(data), 16))
+
+    def encrypt_blocks(self, data):
+        return self.crypt(self.aes.encrypt, data)
+
+    def decrypt_blocks(self, data):
+        return self.crypt(self.aes.decrypt, data)
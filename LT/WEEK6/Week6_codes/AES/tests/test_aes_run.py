@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+import AES_run
+from mypackages import modes
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+
+
+def mode_obj(mode, key=bytes(range(16))):
+    m = modes.modes(key)
+    m.mode = mode
+    return m
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("length", [0, 5, 16, 100003])
+def test_file_round_trip(tmp_path, mode, use_mmap, length):
+    data = os.urandom(length)
+    plain, enc, dec = tmp_path / "p.bin", tmp_path / "p.enc", tmp_path / "p.dec"
+    plain.write_bytes(data)
+    m = mode_obj(mode)
+    AES_run.process_file(str(plain), str(enc), m, "encrypt", use_mmap)
+    assert enc.read_bytes() == bytes(m.encrypt(mode, data))
+    AES_run.process_file(str(enc), str(dec), m, "decrypt", use_mmap)
+    assert dec.read_bytes() == data
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("mode", ["ECB", "CBC"])
+@pytest.mark.parametrize("damage", ["padding", "length"])
+def test_bad_ciphertext_raises_value_error(tmp_path, mode, damage, use_mmap):
+    ciphertext = bytearray(mode_obj(mode).encrypt(mode, os.urandom(80)))
+    if damage == "padding" and mode == "CBC":
+        # Flips the top bit of the last plaintext byte: pad value > block size
+        ciphertext[-17] ^= 0x80
+    elif damage == "padding":
+        ciphertext[-16:] = mode_obj(mode).encrypt(mode, bytes(15) + b"\x80")[:16]
+    else:
+        ciphertext += bytes(2)
+    enc, out = tmp_path / "bad.enc", tmp_path / "bad.dec"
+    enc.write_bytes(bytes(ciphertext))
+    with pytest.raises(ValueError):
+        AES_run.process_file(str(enc), str(out), mode_obj(mode), "decrypt", use_mmap)
+    # No partial or pre-sized garbage output is left behind
+    assert not out.exists()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from mypackages.AES import AES
+
+
+def xor(a, b):
+    return bytes(x ^ y for x, y in zip(a, b))
+
+
+@pytest.fixture(params=[16, 24, 32], ids=["AES-128", "AES-192", "AES-256"])
+def aes(request):
+    return AES(os.urandom(request.param), request.param * 8)
+
+
+def test_offsets_and_buffer_types(aes):
+    src = os.urandom(64)
+    expected = [aes.encrypt(src[i:i + 16]) for i in range(0, 64, 16)]
+    for make in (bytes, bytearray, memoryview):
+        out = bytearray(80)
+        for i in range(0, 64, 16):
+            aes.encrypt_into(make(src), out, i, i + 16)
+        assert out[:16] == bytes(16)
+        assert [bytes(out[i:i + 16]) for i in range(16, 80, 16)] == expected
+
+
+def test_in_place(aes):
+    data = bytearray(os.urandom(48))
+    original = bytes(data)
+    for i in range(0, 48, 16):
+        aes.encrypt_into(data, data, i)
+    assert bytes(data[16:32]) == aes.encrypt(original[16:32])
+    for i in range(0, 48, 16):
+        aes.decrypt_into(data, data, i)
+    assert data == original
+
+
+def test_chaining_xor(aes):
+    block, previous = os.urandom(16), os.urandom(32)
+    out = bytearray(16)
+    aes.encrypt_into(block, out, 0, 0, xor_src=previous, xor_offset=16)
+    assert out == aes.encrypt(xor(block, previous[16:]))
+    back = bytearray(16)
+    aes.decrypt_into(out, back, 0, 0, xor_src=previous, xor_offset=16)
+    assert back == block
+
+
+def test_reference_engine_agrees(aes):
+    reference = AES(aes.key, len(aes.key) * 8, "reference")
+    block = os.urandom(16)
+    out = bytearray(16)
+    aes.encrypt_into(block, out)
+    assert bytes(out) == reference.encrypt(block)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+import AES_run
+from mypackages import container, modes
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR", "GCM"]
+CHUNK = 1024
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+@pytest.fixture
+def m():
+    return modes.modes(os.urandom(16))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("length", [0, 1, CHUNK, 5 * CHUNK + 7])
+def test_round_trip(tmp_path, executor, m, mode, length, workers):
+    data = os.urandom(length)
+    path, out = tmp_path / "c.enc", tmp_path / "c.dec"
+    num_chunks = container.write_container(m, mode, data, str(path), CHUNK, workers, executor)
+    assert num_chunks == -(-length // CHUNK)
+    assert container.is_container(str(path))
+    assert container.read_container(m, str(path), str(out), workers, executor) == length
+    assert out.read_bytes() == data
+
+
+@pytest.mark.parametrize("mode", ["CBC", "CTR"])
+def test_chunks_are_the_mode_with_their_own_iv(tmp_path, m, mode):
+    data = os.urandom(3 * CHUNK + 100)
+    source = tmp_path / "plain"
+    source.write_bytes(data)
+    path = tmp_path / "c.enc"
+    container.write_container(m, mode, str(source), str(path), CHUNK, workers=1)
+    with container.ContainerReader(m, str(path)) as reader:
+        assert reader.mode == mode and reader.num_chunks == 4
+        for k in (3, 0, 2):
+            chunk = data[k * CHUNK:(k + 1) * CHUNK]
+            assert reader.read_chunk(k) == chunk
+            m.iv = reader.ivs[k]
+            assert reader.read_raw(k) == m.encrypt(mode, chunk)[16:]
+        with pytest.raises(IndexError):
+            reader.read_chunk(4)
+
+
+def test_wrong_key_and_damaged_files(tmp_path, m):
+    path = tmp_path / "c.enc"
+    container.write_container(m, "GCM", os.urandom(3 * CHUNK), str(path), CHUNK, workers=1)
+    blob = path.read_bytes()
+    with pytest.raises(ValueError, match="different key"):
+        container.ContainerReader(modes.modes(os.urandom(16)), str(path))
+
+    damaged = tmp_path / "d.enc"
+    damaged.write_bytes(b"XXXX" + blob[4:])
+    with pytest.raises(ValueError):
+        container.ContainerReader(m, str(damaged))
+    damaged.write_bytes(blob[:-3])
+    with pytest.raises(ValueError):
+        container.ContainerReader(m, str(damaged))
+    damaged.write_bytes(blob[:10])
+    with pytest.raises(ValueError):
+        container.ContainerReader(m, str(damaged))
+
+    # Flip one ciphertext byte of chunk 1: its GCM tag no longer matches
+    with container.ContainerReader(m, str(path)) as reader:
+        offset = reader.index[1][0]
+    tampered = bytearray(blob)
+    tampered[offset + 5] ^= 1
+    damaged.write_bytes(bytes(tampered))
+    with container.ContainerReader(m, str(damaged)) as reader:
+        assert len(reader.read_chunk(0)) == CHUNK
+        with pytest.raises(ValueError):
+            reader.read_chunk(1)
+
+
+def test_invalid_arguments(tmp_path, m):
+    with pytest.raises(ValueError):
+        container.write_container(m, "XTS", b"data", str(tmp_path / "c.enc"))
+    with pytest.raises(ValueError):
+        container.write_container(m, "CTR", b"data", str(tmp_path / "c.enc"), chunk_size=100)
+
+
+def test_process_file_detects_containers(tmp_path):
+    m = modes.modes(os.urandom(32))
+    m.mode = "CBC"
+    data = os.urandom(3000)
+    plain, enc, dec = tmp_path / "p", tmp_path / "p.enc", tmp_path / "p.dec"
+    plain.write_bytes(data)
+    AES_run.process_file(str(plain), str(enc), m, "encrypt", use_container=True)
+    assert container.is_container(str(enc))
+    AES_run.process_file(str(enc), str(dec), m, "decrypt")
+    assert dec.read_bytes() == data
+
+
+def test_write_failure_reports_error_and_removes_output(tmp_path, m, monkeypatch):
+    np = pytest.importorskip("numpy")
+
+    def failing_chunk(modes_obj, mode, iv, data, aad):
+        held = np.frombuffer(data, np.uint8)  # an export of the job slice, alive in this frame
+        raise RuntimeError(f"cipher failed after {len(held)} bytes")
+
+    source, path = tmp_path / "plain", tmp_path / "c.enc"
+    source.write_bytes(os.urandom(3 * CHUNK))
+    monkeypatch.setattr(container, "encrypt_chunk", failing_chunk)
+    with pytest.raises(RuntimeError, match="cipher failed") as info:
+        container.write_container(m, "CTR", str(source), str(path), CHUNK, workers=1)
+    assert info.value.__context__ is None
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("mode,damage", [("GCM", "tag"), ("CTR", "length")])
+def test_decrypt_to_failure_removes_output(tmp_path, m, mode, damage):
+    path, out = tmp_path / "c.enc", tmp_path / "c.dec"
+    container.write_container(m, mode, os.urandom(3 * CHUNK), str(path), CHUNK, workers=1)
+    blob = bytearray(path.read_bytes())
+    if damage == "tag":
+        with container.ContainerReader(m, str(path)) as reader:
+            blob[reader.index[2][0]] ^= 1
+    else:
+        # Claim one more plaintext byte than the chunks hold
+        blob[container.HEADER.size - 1] += 1
+    path.write_bytes(bytes(blob))
+    with container.ContainerReader(m, str(path)) as reader:
+        with pytest.raises(ValueError, match="tag" if damage == "tag" else "length"):
+            reader.decrypt_to(str(out), workers=1)
+    assert not out.exists()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import random
+import pytest
+from mypackages import modes
+
+
+@pytest.fixture
+def setup():
+    m = modes.modes(os.urandom(16))
+    data = os.urandom(5000)
+    return m, data, bytes(m.ctr_encrypt(data))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_ranges_match_plaintext(setup, tmp_path, seed):
+    m, data, ciphertext = setup
+    path = tmp_path / "c.bin"
+    path.write_bytes(ciphertext)
+    rng = random.Random(seed)
+    for _ in range(20):
+        offset = rng.randrange(0, len(data) + 20)
+        length = rng.randrange(0, 600)
+        expected = data[offset:offset + length]  # clipped at the end
+        assert m.ctr_decrypt_range(ciphertext, offset, length) == expected
+        assert m.ctr_decrypt_range(io.BytesIO(ciphertext), offset, length) == expected
+        assert m.ctr_decrypt_range(str(path), offset, length) == expected
+
+
+def test_counter_wraps():
+    m = modes.modes(os.urandom(16))
+    m.iv = b"\xff" * 15 + b"\xfe"
+    data = os.urandom(100)
+    ciphertext = m.ctr_encrypt(data)
+    assert m.ctr_decrypt_range(ciphertext, 40, 30) == data[40:70]
+
+
+def test_invalid_arguments(setup):
+    m, data, ciphertext = setup
+    with pytest.raises(ValueError):
+        m.ctr_decrypt_range(ciphertext, -1, 10)
+    with pytest.raises(ValueError):
+        m.ctr_decrypt_range(ciphertext, 0, -1)
+    with pytest.raises(ValueError):
+        m.ctr_decrypt_range(ciphertext[:10], 0, 4)
+    with pytest.raises(ValueError):
+        m.ctr_decrypt_range(io.BytesIO(ciphertext[:10]), 0, 4)
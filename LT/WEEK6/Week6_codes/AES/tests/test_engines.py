@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+from mypackages import modes
+from mypackages.AES import AES
+from mypackages.aes_numpy import AESNumpy
+from mypackages.aes_bitslice import AESBitslice, BATCH_BLOCKS
+from standard import StandardAES
+
+h = bytes.fromhex
+PLAIN = "00112233445566778899aabbccddeeff"
+# FIPS-197 appendix C
+FIPS_VECTORS = [
+    ("000102030405060708090a0b0c0d0e0f", "69c4e0d86a7b0430d8cdb78070b4c55a"),
+    ("000102030405060708090a0b0c0d0e0f1011121314151617", "dda97ca4864cdfe06eaf70a0ec0d7191"),
+    ("000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f",
+     "8ea2b7ca516745bfeafc49904b496089"),
+]
+KEY_SIZES = pytest.mark.parametrize("key_size", [16, 24, 32], ids=["AES-128", "AES-192", "AES-256"])
+
+
+@pytest.mark.parametrize("engine", ["ttable", "reference"])
+@pytest.mark.parametrize("key, cipher", FIPS_VECTORS)
+def test_single_block_known_answers(engine, key, cipher):
+    aes = StandardAES(h(key), engine)
+    assert aes.encrypt(h(PLAIN)) == h(cipher)
+    assert aes.decrypt(h(cipher)) == h(PLAIN)
+
+
+@KEY_SIZES
+def test_ttable_matches_reference(key_size):
+    key = os.urandom(key_size)
+    fast, reference = AES(key, key_size * 8), AES(key, key_size * 8, "reference")
+    for _ in range(50):
+        block = os.urandom(16)
+        assert fast.encrypt(block) == reference.encrypt(block)
+        assert fast.decrypt(block) == reference.decrypt(block)
+
+
+@pytest.mark.parametrize("engine", [AESNumpy, AESBitslice], ids=["numpy", "bitslice"])
+@pytest.mark.parametrize("num_blocks", [1, 63, 64, 65, 200])
+@KEY_SIZES
+def test_batch_engines_match_reference(engine, num_blocks, key_size):
+    key = os.urandom(key_size)
+    reference = AES(key, key_size * 8, "reference")
+    batch = engine(AES(key, key_size * 8))
+    data = os.urandom(16 * num_blocks)
+    expected_enc = b''.join(reference.encrypt(data[i:i + 16]) for i in range(0, len(data), 16))
+    expected_dec = b''.join(reference.decrypt(data[i:i + 16]) for i in range(0, len(data), 16))
+    blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+    assert batch.encrypt_blocks(blocks).tobytes() == expected_enc
+    assert batch.decrypt_blocks(blocks).tobytes() == expected_dec
+
+
+def test_bitslice_across_batches():
+    # More blocks than one bit-plane batch; the T-table engine is checked above
+    aes = AES(os.urandom(32), 256)
+    data = os.urandom(16 * (BATCH_BLOCKS + 3))
+    blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+    encrypted = AESBitslice(aes).encrypt_blocks(blocks)
+    for i in (0, BATCH_BLOCKS - 1, BATCH_BLOCKS, BATCH_BLOCKS + 2):
+        assert encrypted[i].tobytes() == aes.encrypt(blocks[i].tobytes())
+    assert AESBitslice(aes).decrypt_blocks(encrypted).tobytes() == data
+
+
+@pytest.mark.parametrize("engine", [AESNumpy, AESBitslice], ids=["numpy", "bitslice"])
+def test_ctr_keystream_wraps_counter(engine):
+    aes = AES(os.urandom(16), 128)
+    iv = (2 ** 128 - 2).to_bytes(16, 'big')
+    keystream = engine(aes).ctr_keystream(iv, 4).tobytes()
+    counters = [(2 ** 128 - 2 + i) % 2 ** 128 for i in range(4)]
+    assert keystream == b''.join(aes.encrypt(c.to_bytes(16, 'big')) for c in counters)
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC", "CFB", "OFB", "CTR"])
+@KEY_SIZES
+def test_modes_agree_across_batch_engines(mode, key_size):
+    key, iv, data = os.urandom(key_size), os.urandom(16), os.urandom(16 * 70 + 5)
+    outputs = []
+    for batch_engine in (None, "numpy", "bitslice"):
+        m = modes.modes(key, batch_engine=batch_engine)
+        m.iv = iv
+        outputs.append(bytes(m.encrypt(mode, data)))
+        assert m.decrypt(mode, outputs[-1]) == data
+    assert outputs[0] == outputs[1] == outputs[2]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import pytest
+from mypackages import modes
+from mypackages.gcm import GCMEncryptor, GCMDecryptor, NONCE_SIZE, TAG_SIZE
+from standard import StandardAES
+
+h = bytes.fromhex
+# Test cases 1, 2, 4 and 6 of the GCM specification (McGrew & Viega)
+KEY = "feffe9928665731c6d6a8f9467308308"
+PLAIN = ("d9313225f88406e5a55909c5aff5269a86a7a9531534f7da2e4c303d8a318a72"
+         "1c3c0c95956809532fcf0e2449a6b525b16aedf5aa0de657ba637b39")
+AAD = "feedfacedeadbeeffeedfacedeadbeefabaddad2"
+VECTORS = [
+    ("00" * 16, "", "", "00" * 12, "", "58e2fccefa7e3061367f1d57a4e7455a"),
+    ("00" * 16, "00" * 16, "", "00" * 12, "0388dace60b6a392f328c2b971b2fe78",
+     "ab6e47d42cec13bdf53a67b21257bddf"),
+    (KEY, PLAIN, AAD, "cafebabefacedbaddecaf888",
+     "42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e"
+     "21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091",
+     "5bc94fbc3221a5db94fae95ae7121a47"),
+    (KEY, PLAIN, AAD,
+     "9313225df88406e555909c5aff5269aa6a7a9538534f7da1e4c303d2a318a728"
+     "c3c0c95156809539fcf0e2429a6b525416aedbf5a0de6a57a637b39b",
+     "8ce24998625615b603a033aca13fb894be9112a5c3a211a8ba262a3cca7e2ca7"
+     "01e4a9a4fba43c90ccdcb281d48c7c6fd62875d2aca417034c34aee5",
+     "619cc5aefffe0bfa462af43c1699d050"),
+]
+
+
+@pytest.mark.parametrize("key, plain, aad, nonce, cipher, tag", VECTORS)
+def test_known_answers(key, plain, aad, nonce, cipher, tag):
+    enc = GCMEncryptor(StandardAES(h(key)), None, h(nonce), h(aad))
+    assert enc.update(h(plain)) + enc.finalize() == h(cipher)
+    assert enc.tag == h(tag)
+    # Same vector, decrypted with the AAD and ciphertext split across calls
+    dec = GCMDecryptor(StandardAES(h(key)), None, h(nonce))
+    dec.update_aad(h(aad)[:7])
+    dec.update_aad(h(aad)[7:])
+    ct = h(cipher)
+    out = dec.update(ct[:5]) + dec.update(ct[5:37]) + dec.update(ct[37:])
+    assert out + dec.finalize(h(tag)) == h(plain)
+
+
+@pytest.fixture(params=[16, 24, 32], ids=["AES-128", "AES-192", "AES-256"])
+def gcm_modes(request):
+    return modes.modes(os.urandom(request.param))
+
+
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 1000, 70001])
+def test_round_trip(gcm_modes, length):
+    data, aad = os.urandom(length), os.urandom(length % 40)
+    sealed = gcm_modes.gcm_encrypt(data, aad)
+    assert len(sealed) == NONCE_SIZE + length + TAG_SIZE
+    assert gcm_modes.gcm_decrypt(sealed, aad) == data
+    assert gcm_modes.gcm_decrypt(sealed, aad, workers=2) == data
+    assert gcm_modes.gcm_encrypt(data, aad, nonce=sealed[:NONCE_SIZE], workers=2) == sealed
+
+
+def test_streaming_random_chunks(gcm_modes):
+    rng = random.Random(7)
+    data, nonce = os.urandom(5000), os.urandom(NONCE_SIZE)
+    enc = gcm_modes.gcm_encryptor(nonce, b"header")
+    out, pos = bytearray(), 0
+    while pos < len(data):
+        step = rng.randrange(1, 300)
+        out += enc.update(data[pos:pos + step])
+        pos += step
+    out += enc.finalize()
+    assert nonce + out + enc.tag == gcm_modes.gcm_encrypt(data, b"header", nonce=nonce)
+
+
+@pytest.mark.parametrize("damage", ["tag", "ciphertext", "nonce", "aad"])
+def test_tampering_is_rejected(gcm_modes, damage):
+    aad = b"associated"
+    sealed = bytearray(gcm_modes.gcm_encrypt(os.urandom(100), aad))
+    index = {"tag": -1, "ciphertext": NONCE_SIZE + 3, "nonce": 0}.get(damage)
+    if index is None:
+        aad += b"!"
+    else:
+        sealed[index] ^= 1
+    for workers in (None, 2):
+        with pytest.raises(ValueError):
+            gcm_modes.gcm_decrypt(bytes(sealed), aad, workers=workers)
+
+
+def test_too_short_is_rejected(gcm_modes):
+    with pytest.raises(ValueError):
+        gcm_modes.gcm_decrypt(bytes(NONCE_SIZE + TAG_SIZE - 1))
+
+
+@pytest.mark.parametrize("length", [1, 8, 11, 13, 16, 64])
+def test_one_shot_rejects_other_nonce_lengths(gcm_modes, length):
+    with pytest.raises(ValueError):
+        gcm_modes.gcm_encrypt(b"data", nonce=os.urandom(length))
+
+
+@pytest.mark.parametrize("length", [1, 8, 16, 64])
+def test_streaming_accepts_other_nonce_lengths(gcm_modes, length):
+    data, nonce = os.urandom(300), os.urandom(length)
+    enc = gcm_modes.gcm_encryptor(nonce)
+    sealed = enc.update(data) + enc.finalize()
+    dec = gcm_modes.gcm_decryptor(nonce)
+    assert dec.update(sealed) + dec.finalize(enc.tag) == data
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+from mypackages.AES import AES
+from mypackages.aes_numpy import AESKeyBatch, AESNumpy, expand_keys
+
+
+@pytest.mark.parametrize("key_size", [16, 24, 32])
+def test_expanded_keys_match_single_key_engine(key_size):
+    keys = [os.urandom(key_size) for _ in range(20)]
+    expanded = expand_keys(keys)
+    assert expanded.shape == (key_size // 4 + 7, 20, 16)
+    for i, key in enumerate(keys):
+        assert (expanded[:, i] == AESNumpy(AES(key, key_size * 8)).round_keys).all()
+
+
+@pytest.mark.parametrize("key_size", [16, 24, 32])
+@pytest.mark.parametrize("per_key", [None, 3], ids=["one-block", "three-blocks"])
+def test_blocks_match_single_keys(key_size, per_key):
+    keys = np.frombuffer(os.urandom(40 * key_size), np.uint8).reshape(40, key_size)
+    shape = (40, 16) if per_key is None else (40, per_key, 16)
+    blocks = np.frombuffer(os.urandom(int(np.prod(shape))), np.uint8).reshape(shape)
+    batch = AESKeyBatch(keys)
+    encrypted = batch.encrypt_blocks(blocks)
+    assert encrypted.shape == blocks.shape
+    for i in range(0, 40, 7):
+        aes = AES(keys[i].tobytes(), key_size * 8)
+        rows = blocks[i].reshape(-1, 16)
+        assert encrypted[i].tobytes() == b''.join(aes.encrypt(row.tobytes()) for row in rows)
+    assert (batch.decrypt_blocks(encrypted) == blocks).all()
+
+
+def test_invalid_shapes():
+    with pytest.raises(ValueError):
+        AESKeyBatch([bytes(16), bytes(24)])
+    with pytest.raises(ValueError):
+        AESKeyBatch(np.zeros((3, 20), np.uint8))
+    batch = AESKeyBatch([bytes(16)] * 3)
+    with pytest.raises(ValueError):
+        batch.encrypt_blocks(np.zeros((2, 16), np.uint8))
+    with pytest.raises(ValueError):
+        batch.encrypt_blocks(np.zeros((3, 8), np.uint8))
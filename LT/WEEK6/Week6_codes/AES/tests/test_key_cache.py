@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from mypackages import modes
+from mypackages.AES import AES, KEY_SCHEDULES, build_key_schedule
+from mypackages.key_cache import KeyScheduleCache
+from mypackages.key_expansion import key_expansion
+
+h = bytes.fromhex
+# FIPS-197 appendix A: the key and the last word of its expansion
+VECTORS = [
+    ("2b7e151628aed2a6abf7158809cf4f3c", "b6630ca6"),
+    ("8e73b0f7da0e6452c810f32b809079e562f8ead2522c6b7b", "01002202"),
+    ("603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4", "706c631e"),
+]
+
+
+@pytest.mark.parametrize("key, last_word", VECTORS)
+def test_schedule_known_answers(key, last_word, monkeypatch):
+    key = h(key)
+    expand = getattr(key_expansion(key), f"key_expansion_{len(key) * 8}")
+    cached = expand()
+    assert bytes(cached[-1]) == h(last_word)
+    assert len(cached) == 4 * (len(key) // 4 + 7)
+    # The step-by-step expansion gives the same words
+    monkeypatch.setattr(key_expansion, "cached_round_keys", lambda self, key_size: None)
+    assert expand() == cached
+
+
+def test_instances_share_one_schedule():
+    key = os.urandom(32)
+    before = KEY_SCHEDULES.info()
+    first, second = AES(key, 256), modes.modes(key)
+    assert first.schedule is second.aes.schedule
+    after = KEY_SCHEDULES.info()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] >= before["hits"] + 1
+
+
+def test_cached_round_keys_are_copies():
+    key = os.urandom(16)
+    round_keys = key_expansion(key).key_expansion_128()
+    round_keys[0][0] ^= 0xFF
+    assert key_expansion(key).key_expansion_128()[0][0] == key[0]
+
+
+def test_lru_eviction_and_clear():
+    cache = KeyScheduleCache(build_key_schedule, maxsize=2)
+    a, b, c = (os.urandom(16) for _ in range(3))
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # b is now the least recently used
+    cache.get(c)
+    assert cache.info() == {"hits": 1, "misses": 3, "size": 2, "maxsize": 2}
+    cache.get(a)
+    cache.get(b)
+    assert cache.info()["misses"] == 4
+    cache.clear()
+    assert cache.info() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
+
+
+def test_concurrent_use():
+    cache = KeyScheduleCache(build_key_schedule, maxsize=4)
+    keys = [os.urandom(16) for _ in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        schedules = list(pool.map(cache.get, keys * 20))
+    assert all(s.key == k for s, k in zip(schedules, keys * 20))
+    assert cache.info()["size"] == 4
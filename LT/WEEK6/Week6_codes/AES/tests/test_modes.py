@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import pytest
+from ciphermodes.blockmodes import BlockModes
+from mypackages import modes
+from standard import StandardAES
+
+h = bytes.fromhex
+# NIST SP 800-38A, appendix F: AES-128, first two blocks
+KEY = "2b7e151628aed2a6abf7158809cf4f3c"
+PLAIN = "6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+IV = "000102030405060708090a0b0c0d0e0f"
+VECTORS = [
+    ("ECB", IV, "3ad77bb40d7a3660a89ecaf32466ef97f5d3d58503b9699de785895a96fdbaaf"),
+    ("CBC", IV, "7649abac8119b246cee98e9b12e9197d5086cb9b507219ee95db113a917678b2"),
+    ("CFB", IV, "3b3fd92eb72dad20333449f8e83cfb4ac8a64537a0b3a93fcde3cdad9f1ce58b"),
+    ("OFB", IV, "3b3fd92eb72dad20333449f8e83cfb4a7789508d16918f03f53c52dac54ed825"),
+    ("CTR", "f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff",
+     "874d6191b620e3261bef6864990db6ce9806f66b7970fdff8617187bb9fffdff"),
+]
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+
+
+@pytest.mark.parametrize("mode, iv, cipher", VECTORS)
+def test_sp800_38a_vectors(mode, iv, cipher):
+    m = BlockModes(StandardAES(h(KEY)))
+    m.iv = h(iv)
+    out = bytes(m.encrypt(mode, h(PLAIN)))
+    body = out if mode == "ECB" else out[16:]
+    # ECB, CBC and OFB add a padding block after the vector's two blocks
+    assert body[:32] == h(cipher)
+    assert m.decrypt(mode, out) == h(PLAIN)
+
+
+@pytest.fixture(params=[16, 24, 32], ids=["AES-128", "AES-192", "AES-256"])
+def m(request):
+    return modes.modes(os.urandom(request.param))
+
+
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 1000])
+def test_named_methods_round_trip(m, length):
+    data = os.urandom(length)
+    assert m.ecb_decrypt(m.ecb_encrypt(data)) == data
+    assert m.cbc_decrypt(m.cbc_encrypt(data)) == data
+    assert m.cfb_decrypt(m.cfb_encrypt(data)) == data
+    assert m.cfb_decrypt(m.cfb_encrypt(data, 64), 64) == data
+    assert m.ofb_decrypt(m.ofb_encrypt(data)) == data
+    assert m.ctr_decrypt(m.ctr_encrypt(data)) == data
+    for mode in MODES:
+        assert m.encrypt(mode, data) == getattr(m, mode.lower() + "_encrypt")(data)
+
+
+def test_text_and_binary_string_input(m):
+    assert m.ecb_decrypt(m.ecb_encrypt("héllo")).decode('utf-8') == "héllo"
+    # Bit strings are padded with a 1 bit and zeros up to a whole byte
+    assert m.bytes_to_binary(m.cbc_decrypt(m.cbc_encrypt("0b1100000101"))) == "0b1100000101"
+    with pytest.raises(TypeError):
+        m.cbc_encrypt(12345)
+
+
+@pytest.mark.parametrize("method, data", [
+    ("ecb_decrypt", bytes(17)),
+    ("cbc_decrypt", bytes(15)),
+    ("cbc_decrypt", bytes(33)),
+    ("ofb_decrypt", bytes(40)),
+    ("ctr_decrypt", bytes(10)),
+])
+def test_bad_lengths_are_rejected(m, method, data):
+    with pytest.raises(ValueError):
+        getattr(m, method)(data)
+
+
+def test_invalid_key_and_engine():
+    with pytest.raises(ValueError):
+        modes.modes(bytes(20))
+    with pytest.raises(ValueError):
+        modes.modes(bytes(16), batch_engine="gpu")
+
+
+@pytest.mark.parametrize("mode", ["CBC", "CFB", "CTR"])
+def test_parallel_methods(m, mode):
+    data = os.urandom(random.randrange(1, 5000))
+    ciphertext = m.encrypt(mode, data)
+    method = getattr(m, mode.lower() + "_decrypt_parallel")
+    assert method(ciphertext, workers=2) == data
+    if mode == "CTR":
+        assert m.ctr_encrypt_parallel(data, workers=2) == ciphertext
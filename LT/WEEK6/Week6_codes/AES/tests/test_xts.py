@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import pytest
+from ciphermodes.blockmodes import BlockModes
+from mypackages import modes
+from mypackages.xts import XTS
+from standard import StandardAES
+
+h = bytes.fromhex
+K1 = "fffefdfcfbfaf9f8f7f6f5f4f3f2f1f0"
+# IEEE P1619 vectors 2, 3, 4 (first block only) and 15 (ciphertext stealing)
+VECTORS = [
+    ("11" * 16, "22" * 16, 0x3333333333, b"\x44" * 32,
+     "c454185e6a16936e39334038acef838bfb186fff7480adc4289382ecd6d394f0"),
+    (K1, "22" * 16, 0x3333333333, b"\x44" * 32,
+     "af85336b597afc1a900b2eb21ec949d292df4c047e0b21532186a5971a227a89"),
+    ("27182818284590452353602874713526", "31415926535897932384626433832795", 0, bytes(range(256)) * 2,
+     "27a7479befa1d476489f308cd4cfa6e2a96e4bbe3208ff25287dd3819616e89c"),
+    (K1, "bfbebdbcbbbab9b8b7b6b5b4b3b2b1b0", 0x123456789a, bytes(range(17)),
+     "6c1625db4671522d3d7599601de7ca09ed"),
+]
+
+
+@pytest.mark.parametrize("key1, key2, sector, plain, cipher", VECTORS)
+def test_known_answers(key1, key2, sector, plain, cipher):
+    # Plain BlockModes over a standard-layout AES, without batch engines
+    xts = XTS(BlockModes(StandardAES(h(key1))), BlockModes(StandardAES(h(key2))), len(plain))
+    encrypted = xts.encrypt_sectors(sector, plain)
+    assert encrypted[:len(h(cipher))] == h(cipher)
+    assert xts.decrypt_sectors(sector, encrypted) == plain
+
+
+@pytest.fixture(params=[32, 48, 64], ids=["XTS-AES-128", "XTS-AES-192", "XTS-AES-256"])
+def key(request):
+    return os.urandom(request.param)
+
+
+@pytest.mark.parametrize("sector_size", [16, 512, 4096])
+def test_batched_sectors_match_single_sectors(key, sector_size):
+    xts = XTS.from_key(key, sector_size)
+    plain = XTS.from_key(key, sector_size, batch_engine=None)
+    data = os.urandom(sector_size * 9)
+    encrypted = xts.encrypt_sectors(77, data)
+    assert encrypted == plain.encrypt_sectors(77, data)
+    for k in range(9):
+        sector = data[k * sector_size:(k + 1) * sector_size]
+        assert xts.encrypt_sector(77 + k, sector) == encrypted[k * sector_size:(k + 1) * sector_size]
+    assert xts.decrypt_sectors(77, encrypted) == data
+
+
+@pytest.mark.parametrize("length", [16, 17, 31, 33, 4095])
+def test_ciphertext_stealing_round_trip(key, length):
+    xts = XTS.from_key(key)
+    data = os.urandom(length)
+    encrypted = xts.encrypt_sector(5, data)
+    assert len(encrypted) == length
+    assert xts.decrypt_sector(5, encrypted) == data
+
+
+def test_tweak_without_batch_engine(key):
+    half = len(key) // 2
+    xts = XTS(modes.modes(key[:half]), modes.modes(key[half:], batch_engine=None), 512)
+    data = os.urandom(512 * 40)
+    assert xts.encrypt_sectors(3, data) == XTS.from_key(key, 512).encrypt_sectors(3, data)
+
+
+def test_parallel_image_matches_serial(key):
+    xts = XTS.from_key(key, 512)
+    data = os.urandom(512 * 300)
+    encrypted = xts.encrypt_image(data, first_sector=10, workers=2)
+    assert encrypted == xts.encrypt_sectors(10, data)
+    assert xts.decrypt_image(encrypted, first_sector=10, workers=2) == data
+
+
+def test_random_sector_access(key):
+    xts = XTS.from_key(key, 512)
+    data = bytearray(os.urandom(512 * 8))
+    f = io.BytesIO(xts.encrypt_sectors(0, data))
+    new = os.urandom(512 * 2)
+    xts.write_sectors(f, 3, new)
+    data[3 * 512:5 * 512] = new
+    assert xts.read_sectors(f, 0, 8) == data
+    assert xts.read_sectors(f, 4) == new[512:]
+
+
+def test_invalid_arguments(key):
+    with pytest.raises(ValueError):
+        XTS.from_key(key[:20])
+    with pytest.raises(ValueError):
+        XTS.from_key(key[:16] * 2)
+    with pytest.raises(ValueError):
+        XTS.from_key(key, sector_size=8)
+    xts = XTS.from_key(key, 512)
+    with pytest.raises(ValueError):
+        xts.encrypt_sectors(0, bytes(700))
+    with pytest.raises(ValueError):
+        xts.encrypt_sector(0, bytes(15))
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Block-cipher modes of operation shared by the AES package (LT/WEEK6) and the
+DES package (LT/WEEK4): ECB, CBC, CFB, OFB and CTR as streaming objects, plus
+dedup ECB, keystream prefetch, asyncio streaming, multi-process sharding,
+memory-mapped files and opt-in instrumentation. Nothing here depends on a
+particular cipher; see blockmodes.py for the interface a cipher provides.
+
+Install once (editable, so the course folders keep using the sources here):
+    python -m pip install -e LT/ciphermodes
+"""
+from .blockmodes import BlockModes, BulkBlockCipher, BulkBatch
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio streaming on top of the incremental cipher objects.
+
+    async for out in modes_obj.aencrypt_stream(reader, "CTR"):
+        ...
+    await awrite_stream(modes_obj.adecrypt_stream(reader, "CBC"), writer)
+
+Chunks are read from an asyncio.StreamReader by a background task while the
+cipher works on the previous chunk in an executor, so the event loop never runs
+block operations itself. At most 'max_in_flight' chunks are buffered ahead
+of the cipher; when the buffer is full the reader task stops reading, which
+pushes back on the sender. The output side applies backpressure through
+StreamWriter.drain().
+
+The cipher objects keep their chaining state in this process and their
+update() calls run one after another, so 'executor' must be a thread pool
+(None means the loop's default executor).
+"""
+import asyncio
+
+# Bytes requested from the reader per step
+CHUNK_SIZE = 1 << 16
+# Chunks read ahead of the cipher
+MAX_IN_FLIGHT = 4
+
+
+async def acrypt_stream(cipher, reader, chunk_size=CHUNK_SIZE, executor=None, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Async generator: feed everything from 'reader' through the streaming
+    'cipher' (from modes.encryptor()/decryptor()) and yield the output chunks,
+    ending with the finalize() output.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(max_in_flight)
+
+    async def read_chunks():
+        try:
+            while True:
+                chunk = await reader.read(chunk_size)
+                await queue.put(chunk)
+                if not chunk:  # EOF
+                    return
+        except Exception as error:
+            await queue.put(error)
+
+    read_task = asyncio.create_task(read_chunks())
+    try:
+        while True:
+            chunk = await queue.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                out = await loop.run_in_executor(executor, cipher.finalize)
+                if out:
+                    yield out
+                return
+            out = await loop.run_in_executor(executor, cipher.update, chunk)
+            if out:
+                yield out
+    finally:
+        read_task.cancel()
+
+
+async def awrite_stream(chunks, writer):
+    """
+    Write every chunk of the async iterable 'chunks' to an asyncio.StreamWriter,
+    waiting on drain() after each one. Returns the number of bytes written.
+    """
+    written = 0
+    async for out in chunks:
+        writer.write(out)
+        await writer.drain()
+        written += len(out)
+    return written
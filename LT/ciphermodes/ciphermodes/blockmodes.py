@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Block-cipher-independent mode layer: ECB, CBC, CFB, OFB and CTR with the
+streaming objects (stream.py), dedup ECB, keystream prefetch, asyncio
+streaming, multi-process CTR / CBC / CFB and the bulk-XOR paths, for any
+block cipher object that provides
+    block_size                       bytes per block (16 for AES, 8 for DES)
+    key                              the key bytes (only its length is used, for stats)
+    encrypt(block), decrypt(block)   one block -> bytes
+    encrypt_into(src, dst, offset=0, dst_offset=None, xor_src=None, xor_offset=0)
+    decrypt_into(src, dst, offset=0, dst_offset=None)
+and optionally a batch engine for the same key (min_blocks, and
+encrypt_blocks / decrypt_blocks / ctr_keystream on (N, block_size) uint8 arrays).
+
+AES provides all of this directly (the AES package's modes.modes is a
+BlockModes). A cipher that only has bulk functions over whole blocks of bytes
+can derive the rest from BulkBlockCipher, and BulkBatch turns those functions
+into a batch engine:
+
+    class DESCipher(BulkBlockCipher):
+        block_size = 8
+        def encrypt_blocks(self, data): ...
+        def decrypt_blocks(self, data): ...
+
+    cipher = DESCipher(key)
+    m = BlockModes(cipher, BulkBatch(cipher))
+    ct = m.encrypt("CBC", data)              # IV || ciphertext
+
+The one-shot calls (encrypt / decrypt and their parallel variants) return a
+bytearray: the buffer the cipher object wrote into, so the output is never
+copied a second time. It compares equal to bytes and supports the same
+methods (decode, hex, ...); call bytes() on it where an immutable value is
+needed, e.g. as a dict key.
+"""
+import os
+from abc import ABC, abstractmethod
+from .stream import ENCRYPTORS, DECRYPTORS
+from .dedup import DedupECBEncryptor, DedupECBDecryptor
+from .prefetch import KeystreamSession
+from . import parallel, aio, instrument
+try:
+    import numpy as np
+    from .blocks import as_blocks, counter_blocks
+except ImportError:  # NumPy is optional; BulkBatch is then unavailable
+    np = None
+
+
+class BulkBlockCipher(ABC):
+    """
+    Mixin deriving the single-block methods of the cipher interface from
+    encrypt_blocks(data) / decrypt_blocks(data), which map a bytes-like object
+    of whole blocks to bytes of the same length. Subclasses set block_size,
+    key and name.
+    """
+    block_size = None
+    name = None
+
+    @abstractmethod
+    def encrypt_blocks(self, data):
+        """Encrypt whole blocks of a bytes-like object; returns bytes of the same length."""
+
+    @abstractmethod
+    def decrypt_blocks(self, data):
+        """Decrypt whole blocks of a bytes-like object; returns bytes of the same length."""
+
+    def encrypt(self, block):
+        return bytes(self.encrypt_blocks(block))
+
+    def decrypt(self, block):
+        return bytes(self.decrypt_blocks(block))
+
+    def encrypt_into(self, src, dst, offset=0, dst_offset=None, xor_src=None, xor_offset=0):
+        """Encrypt src[offset:offset+block_size] (XORed with xor_src[xor_offset:] if given) into dst[dst_offset:]."""
+        size = self.block_size
+        if dst_offset is None:
+            dst_offset = offset
+        block = src[offset:offset + size]
+        if xor_src is not None:
+            block = (int.from_bytes(block, 'big')
+                     ^ int.from_bytes(xor_src[xor_offset:xor_offset + size], 'big')).to_bytes(size, 'big')
+        dst[dst_offset:dst_offset + size] = self.encrypt_blocks(block)
+
+    def decrypt_into(self, src, dst, offset=0, dst_offset=None):
+        """Decrypt src[offset:offset+block_size] into dst[dst_offset:]."""
+        size = self.block_size
+        if dst_offset is None:
+            dst_offset = offset
+        dst[dst_offset:dst_offset + size] = self.decrypt_blocks(src[offset:offset + size])
+
+
+class BulkBatch:
+    """
+    Batch engine over a BulkBlockCipher: every batch goes through one
+    encrypt_blocks / decrypt_blocks call on the raw bytes (needs NumPy).
+    """
+    # Two blocks already save a call per block
+    min_blocks = 2
+
+    def __init__(self, cipher):
+        if np is None:
+            raise ValueError("BulkBatch requires NumPy.")
+        self.cipher = cipher
+        self.block_size = cipher.block_size
+
+    def encrypt_blocks(self, blocks):
+        """Encrypt an (N, block_size) uint8 array. Returns a new array."""
+        data = self.cipher.encrypt_blocks(as_blocks(blocks, self.block_size).tobytes())
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, self.block_size).copy()
+
+    def decrypt_blocks(self, blocks):
+        """Decrypt an (N, block_size) uint8 array. Returns a new array."""
+        data = self.cipher.decrypt_blocks(as_blocks(blocks, self.block_size).tobytes())
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, self.block_size).copy()
+
+    def ctr_keystream(self, iv, num_blocks):
+        """Keystream E(IV), E(IV+1), ... as an (N, block_size) array."""
+        return self.encrypt_blocks(counter_blocks(iv, num_blocks, self.block_size))
+
+
+class BlockModes:
+    def __init__(self, cipher, batch=None):
+        """
+        'cipher' is a block cipher object as described at the top of this module,
+        'batch' an optional multi-block engine for the same key.
+        """
+        self.cipher = cipher
+        self.batch = batch
+        self.block_size = cipher.block_size
+        self.iv = os.urandom(self.block_size)
+        # This can be set externally (e.g. from your main script):
+        self.mode = None
+
+    def spec(self):
+        """
+        Picklable (factory, args) that rebuilds this object in a worker process
+        (parallel.build_modes calls factory(*args)).
+        """
+        return BlockModes, (self.cipher, self.batch)
+
+    ############################################################################
+    # STREAMING CIPHER OBJECTS
+    ############################################################################
+
+    def encryptor(self, mode=None, segment_size=None, dedup=False):
+        """
+        Incremental encryptor for 'mode' (defaults to self.mode) using self.iv.
+        Call update(chunk) for each chunk and finalize() once at the end.
+        'segment_size' (CFB, in bits) defaults to one block.
+        'dedup' (ECB only) encrypts each distinct block once (see dedup.py).
+        """
+        mode = mode or self.mode
+        if mode not in ENCRYPTORS:
+            raise ValueError(f"Unsupported mode: {mode}")
+        if mode == "ECB":
+            if dedup:
+                return DedupECBEncryptor(self.cipher, self.batch)
+            return ENCRYPTORS[mode](self.cipher, self.batch)
+        if mode == "CFB":
+            return ENCRYPTORS[mode](self.cipher, self.batch, self.iv, segment_size)
+        return ENCRYPTORS[mode](self.cipher, self.batch, self.iv)
+
+    def decryptor(self, mode=None, segment_size=None, dedup=False):
+        """
+        Incremental decryptor for 'mode' (defaults to self.mode).
+        Except for ECB, the IV is read from the first block of the stream.
+        'dedup' (ECB only) decrypts each distinct block once (see dedup.py).
+        """
+        mode = mode or self.mode
+        if mode not in DECRYPTORS:
+            raise ValueError(f"Unsupported mode: {mode}")
+        if mode == "ECB" and dedup:
+            return DedupECBDecryptor(self.cipher, self.batch)
+        if mode == "CFB":
+            return DECRYPTORS[mode](self.cipher, self.batch, segment_size)
+        return DECRYPTORS[mode](self.cipher, self.batch)
+
+    def keystream_session(self, mode="CTR", buffer_size=None):
+        """
+        CTR/OFB session with keystream for self.iv pre-generated in the background
+        (see prefetch.KeystreamSession). Call close() when done.
+        """
+        if buffer_size is None:
+            return KeystreamSession(self, mode)
+        return KeystreamSession(self, mode, buffer_size=buffer_size)
+
+    def aencrypt_stream(self, reader, mode=None, segment_size=None, chunk_size=aio.CHUNK_SIZE,
+                        executor=None, max_in_flight=aio.MAX_IN_FLIGHT):
+        """
+        Async generator of the encryption of everything read from an
+        asyncio.StreamReader (IV first, as in the one-shot methods).
+        The block work runs in 'executor' (a thread pool; None = loop default).
+        """
+        return aio.acrypt_stream(self.encryptor(mode, segment_size), reader, chunk_size, executor, max_in_flight)
+
+    def adecrypt_stream(self, reader, mode=None, segment_size=None, chunk_size=aio.CHUNK_SIZE,
+                        executor=None, max_in_flight=aio.MAX_IN_FLIGHT):
+        """Async generator of the decryption of everything read from an asyncio.StreamReader."""
+        return aio.acrypt_stream(self.decryptor(mode, segment_size), reader, chunk_size, executor, max_in_flight)
+
+    def run(self, cipher, data, mode=None, direction=None, iv=None):
+        """
+        Feed all of 'data' through a streaming cipher object and finalize it (one output buffer).
+        With instrumentation enabled the call is reported as (mode, direction), see instrument.py.
+        """
+        started = instrument.start()
+        out = cipher.update(data, final=True)
+        instrument.record(started, self.cipher, mode, direction, len(data), iv)
+        return out
+
+    ############################################################################
+    # ONE-SHOT ENCRYPTION / DECRYPTION
+    ############################################################################
+
+    def to_bytes(self, data):
+        """Input as a bytes-like object: str is encoded to UTF-8, buffers are used as they are."""
+        if isinstance(data, str):
+            return data.encode('utf-8')
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            raise TypeError("Data must be str or bytes.")
+        return data
+
+    def encrypt(self, mode, data, segment_size=None, dedup=False):
+        """
+        Encrypt 'data' (str or bytes-like) in 'mode'. Returns IV || ciphertext
+        as a bytearray (ECB: no IV). ECB, CBC and OFB are PKCS7-padded.
+        """
+        data = self.to_bytes(data)
+        iv = None if mode == "ECB" else self.iv
+        return self.run(self.encryptor(mode, segment_size, dedup), data, mode, "encrypt", iv)
+
+    def decrypt(self, mode, data, segment_size=None, dedup=False):
+        """Decrypt IV || ciphertext (ECB: ciphertext) from encrypt(); returns a bytearray."""
+        iv = None if mode == "ECB" else bytes(data[:self.block_size])
+        return self.run(self.decryptor(mode, segment_size, dedup), data, mode, "decrypt", iv)
+
+    def encrypt_parallel(self, data, workers=None, executor=None):
+        """
+        CTR encryption with the counter range split across worker processes.
+        Same output as encrypt("CTR", data); returns a bytearray.
+        """
+        data = self.to_bytes(data)
+        started = instrument.start()
+        out = bytearray(self.iv)
+        out += parallel.ctr_parallel(self, self.iv, data, workers, executor)
+        instrument.record(started, self.cipher, "CTR", "encrypt-parallel", len(data), self.iv)
+        return out
+
+    def decrypt_parallel(self, mode, data, workers=None, executor=None):
+        """
+        CTR, CBC or full-block CFB decryption of IV || ciphertext across worker
+        processes. Same output as decrypt(mode, data); returns a bytearray.
+        """
+        size = self.block_size
+        if len(data) < size:
+            raise ValueError(f"Ciphertext is too short for {mode} mode (missing IV).")
+        started = instrument.start()
+        iv = bytes(data[:size])
+        if mode == "CTR":
+            out = parallel.ctr_parallel(self, iv, memoryview(data)[size:], workers, executor)
+        elif mode in ("CBC", "CFB"):
+            if mode == "CBC" and len(data) % size:
+                raise ValueError(f"Ciphertext (including IV) must be multiple of {size} bytes for CBC.")
+            out = parallel.chained_decrypt_parallel(self, mode, data, workers, executor)
+        else:
+            raise ValueError(f"Parallel decryption supports CTR, CBC and CFB, not {mode}")
+        instrument.record(started, self.cipher, mode, "decrypt-parallel", len(data), iv)
+        return out
+
+    ############################################################################
+    # PKCS7 PADDING
+    ############################################################################
+
+    def pkcs7_padding(self, data):
+        """
+        Apply PKCS7 padding (to the block size) to str/bytes input (see to_bytes).
+        Returns a new bytearray, copied once. The modes themselves never call
+        this: their cipher objects read full blocks from a view of the input
+        and only pad the final partial block.
+        """
+        data = self.to_bytes(data)
+        padding_length = self.block_size - (len(data) % self.block_size)
+        padded_data = bytearray(len(data) + padding_length)
+        padded_data[:len(data)] = data
+        padded_data[len(data):] = bytes([padding_length]) * padding_length
+        return padded_data
+
+    def pkcs7_unpadding(self, data):
+        """
+        Remove PKCS7 padding. Returns raw bytes (no UTF-8 decoding here) of
+        the same type as 'data': a bytearray is trimmed in place and returned
+        without copying, bytes come back as a new bytes object.
+        """
+        if not data:
+            return data
+        padding_length = data[-1]
+        if padding_length < 1 or padding_length > self.block_size:
+            # Invalid padding
+            raise ValueError("Invalid PKCS7 padding.")
+        if isinstance(data, bytearray):
+            del data[-padding_length:]
+            return data
+        return data[:-padding_length]
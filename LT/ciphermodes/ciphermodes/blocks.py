@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy views of data as blocks, for the batch engines of any block size.
+"""
+import numpy as np
+
+
+def as_blocks(data, block_size=16):
+    """
+    View bytes-like data (length multiple of block_size) or an array as an
+    (N, block_size) uint8 array.
+    """
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1, block_size).astype(np.uint8, copy=False)
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, block_size)
+
+
+def counter_blocks(iv, num_blocks, block_size=16):
+    """
+    Build (N, block_size) counter blocks IV, IV+1, ... with big-endian arithmetic
+    modulo 2^(8*block_size). block_size is 16 (AES) or 8 (64-bit block ciphers).
+    """
+    if block_size == 8:
+        start = np.uint64(int.from_bytes(iv[:8], 'big'))
+        counters = (start + np.arange(num_blocks, dtype=np.uint64)).astype('>u8')  # wraps mod 2^64
+        return counters.view(np.uint8).reshape(num_blocks, 8)
+    hi0 = np.uint64(int.from_bytes(iv[:8], 'big'))
+    lo0 = np.uint64(int.from_bytes(iv[8:16], 'big'))
+    counters = np.empty((num_blocks, 2), dtype='>u8')
+    lo = lo0 + np.arange(num_blocks, dtype=np.uint64)  # wraps mod 2^64
+    counters[:, 1] = lo
+    counters[:, 0] = hi0 + (lo < lo0).astype(np.uint64)  # carry into the high half
+    return counters.view(np.uint8).reshape(num_blocks, 16)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in ECB for highly redundant data (e.g. raw pixels with flat regions).
+
+ECB maps equal plaintext blocks to equal ciphertext blocks, so each distinct
+block only has to go through the cipher once:
+  - within a chunk, np.unique(..., return_inverse=True) on the blocks viewed
+    as fixed-size records finds the distinct blocks; only those are encrypted and
+    the results are scattered back with the inverse index;
+  - across chunks (streaming), an LRU BlockCache remembers recent blocks.
+The output is identical to plain ECB; the speedup is the redundancy ratio.
+Data with little redundancy (ciphertext, compressed files) would only pay for
+the sort and the cache, so each chunk is first judged on an evenly spaced
+sample of its blocks and goes through plain ECB when most of them are
+distinct. The cache is no longer consulted once it has missed a cache-full of
+blocks without a single hit.
+"""
+from collections import OrderedDict
+from .stream import ECBEncryptor, ECBDecryptor
+try:
+    import numpy as np
+    from .blocks import as_blocks
+except ImportError:  # NumPy is optional; only the LRU cache is used then
+    np = None
+
+# Distinct blocks remembered between chunks
+CACHE_BLOCKS = 1 << 14
+# Blocks sampled per chunk to estimate the redundancy; smaller chunks are
+# always deduplicated, since they are cheap and rely on the cache
+SAMPLE_BLOCKS = 1 << 12
+MIN_SAMPLE_BLOCKS = 64
+# Chunks whose sample is more distinct than this go through plain ECB
+MAX_UNIQUE_RATIO = 0.5
+
+
+class BlockCache:
+    """LRU map of input block -> output block for a single-block function."""
+
+    def __init__(self, crypt_block, maxsize=CACHE_BLOCKS):
+        self.crypt_block = crypt_block
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+
+    def lookup(self, block):
+        """Cached output for 'block' (bytes), or None."""
+        result = self._blocks.get(block)
+        if result is not None:
+            self._blocks.move_to_end(block)
+            self.hits += 1
+        return result
+
+    def store(self, block, result):
+        self._blocks[block] = result
+        if len(self._blocks) > self.maxsize:
+            self._blocks.popitem(last=False)
+
+    def get(self, block):
+        """Output for one block, computing and caching it on a miss."""
+        block = bytes(block)
+        result = self.lookup(block)
+        if result is None:
+            self.misses += 1
+            result = bytes(self.crypt_block(block))
+            self.store(block, result)
+        return result
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._blocks), "maxsize": self.maxsize}
+
+
+def unique_blocks(blocks):
+    """Distinct rows of an (N, block size) uint8 array and the inverse index (blocks == unique[inverse])."""
+    block_size = blocks.shape[1]
+    records = np.ascontiguousarray(blocks).view(f'V{block_size}').ravel()
+    unique, inverse = np.unique(records, return_inverse=True)
+    return np.frombuffer(unique.tobytes(), dtype=np.uint8).reshape(-1, block_size), inverse.ravel()
+
+
+def redundant(blocks):
+    """True if an evenly spaced sample of the rows has repeats worth deduplicating."""
+    if len(blocks) < MIN_SAMPLE_BLOCKS:
+        return True
+    step = max(1, len(blocks) // SAMPLE_BLOCKS)
+    sample = blocks[::step]
+    return len(unique_blocks(sample)[0]) <= MAX_UNIQUE_RATIO * len(sample)
+
+
+class DedupECB:
+    """
+    Mixin for the ECB cipher objects: every distinct block is processed once.
+    Subclasses set crypt_block (single block) and crypt_blocks (batch engine).
+    """
+
+    def setup_cache(self, cache_size):
+        self.cache = BlockCache(self.crypt_block, cache_size)
+        # Blocks that went through plain ECB because their chunk was not redundant
+        self.skipped = 0
+
+    def process_into(self, src, out, offset):
+        size = self.block_size
+        if np is None:
+            get = self.cache.get
+            for i in range(0, len(src), size):
+                out[offset + i:offset + i + size] = get(src[i:i + size])
+            return
+        blocks = as_blocks(src, size)
+        if not redundant(blocks):
+            self.skipped += len(blocks)
+            super().process_into(src, out, offset)
+            return
+        unique, inverse = unique_blocks(blocks)
+        results = self.crypt_unique(unique)
+        np.frombuffer(out, np.uint8, len(src), offset).reshape(-1, size)[:] = results[inverse]
+
+    def crypt_unique(self, unique):
+        """Outputs for distinct blocks: cached ones from the LRU, the rest in one batch."""
+        cache = self.cache
+        if cache.hits == 0 and cache.misses >= cache.maxsize:
+            # No reuse across chunks so far: skip the per-block lookups
+            return self.crypt_missing(unique)
+        results = np.empty_like(unique)
+        missing = []
+        for i, row in enumerate(unique):
+            cached = cache.lookup(row.tobytes())
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = np.frombuffer(cached, dtype=np.uint8)
+        if missing:
+            cache.misses += len(missing)
+            todo = unique[missing]
+            done = self.crypt_missing(todo)
+            results[missing] = done
+            for row, result in zip(todo, done):
+                cache.store(row.tobytes(), result.tobytes())
+        return results
+
+    def crypt_missing(self, todo):
+        """Outputs for blocks that are not cached, batched when possible."""
+        if self.use_batch(len(todo) * self.block_size):
+            return self.crypt_blocks(todo)
+        return np.array([np.frombuffer(bytes(self.crypt_block(row.tobytes())), dtype=np.uint8)
+                         for row in todo]).reshape(-1, self.block_size)
+
+
+class DedupECBEncryptor(DedupECB, ECBEncryptor):
+    def __init__(self, cipher, batch=None, cache_size=CACHE_BLOCKS):
+        super().__init__(cipher, batch)
+        self.crypt_block = cipher.encrypt
+        self.crypt_blocks = batch.encrypt_blocks if batch is not None else None
+        self.setup_cache(cache_size)
+
+
+class DedupECBDecryptor(DedupECB, ECBDecryptor):
+    def __init__(self, cipher, batch=None, cache_size=CACHE_BLOCKS):
+        super().__init__(cipher, batch)
+        self.crypt_block = cipher.decrypt
+        self.crypt_blocks = batch.decrypt_blocks if batch is not None else None
+        self.setup_cache(cache_size)
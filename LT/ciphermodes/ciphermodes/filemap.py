@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped file encryption.
+
+The input file is mapped read-only and the output file is pre-sized with
+ftruncate (room for the IV and padding) and mapped writable; a streaming
+cipher object then writes straight from one map into the other, chunk by
+chunk. Pages that have been processed are released with madvise, so the
+resident set stays around two chunks whatever the file size. The output is
+truncated to the bytes actually written at the end (e.g. after unpadding).
+If the cipher fails part-way (bad padding, bad length) the output file is
+removed, so no pre-sized half-written file is left behind.
+"""
+import contextlib
+import mmap
+import os
+import traceback
+
+# Bytes handed to the cipher per step
+CHUNK_SIZE = 1 << 20
+
+
+def release(mapped, start, end):
+    """Drop the pages of mapped[start:end] from this process (data stays in the page cache)."""
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    start -= start % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if end > start:
+        mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def crypt_mapped(cipher, src, out_map, out_offset, chunk_size=CHUNK_SIZE, in_map=None, in_offset=0):
+    """
+    Feed the buffer 'src' through 'cipher' into out_map[out_offset:], finalize
+    the cipher and return the number of bytes written. If 'src' is a view of
+    in_map starting at 'in_offset', consumed input pages are released as well.
+    """
+    src = memoryview(src)
+    chunk = None
+    written = 0
+    try:
+        for start in range(0, len(src), chunk_size):
+            end = min(start + chunk_size, len(src))
+            chunk = src[start:end]
+            written += cipher.update_into(chunk, out_map, out_offset + written)
+            chunk.release()
+            if in_map is not None:
+                release(in_map, in_offset, in_offset + end)
+            release(out_map, 0, out_offset + written)
+        written += cipher.update_into(b'', out_map, out_offset + written, final=True)
+    except BaseException as error:
+        # The cipher's frames still hold views of the maps; drop them so the
+        # maps can be closed and the original error is the one reported.
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        if chunk is not None:
+            chunk.release()
+        src.release()
+    return written
+
+
+def crypt_file(cipher, source, output_path, header=b'', skip=0, chunk_size=CHUNK_SIZE):
+    """
+    Encrypt or decrypt into 'output_path' through memory maps.
+    - cipher : a streaming object from modes.encryptor() / modes.decryptor()
+    - source : input file path (mapped read-only; the first 'skip' bytes are
+               ignored) or a bytes-like object already in memory
+    - header : bytes written in front of the cipher output
+    The source is opened before the output is touched, so a missing input
+    leaves an existing output file alone. Returns the size of the output file.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return write_file(cipher, source, output_path, header, chunk_size)
+    with map_source(source, skip) as (body, in_map):
+        if body is None:
+            return write_file(cipher, b'', output_path, header, chunk_size)
+        return write_file(cipher, body, output_path, header, chunk_size, in_map, skip)
+
+
+def crypt_to_memory(cipher, source, skip=0):
+    """
+    Run the file 'source' (past its first 'skip' bytes) through 'cipher' in one
+    finalized update() read from a read-only map; returns the output bytes.
+    """
+    with map_source(source, skip) as (body, in_map):
+        try:
+            return cipher.update(b'' if body is None else body, final=True)
+        except BaseException as error:
+            # Same as crypt_mapped(): the frames hold views of the map
+            traceback.clear_frames(error.__traceback__)
+            raise
+
+
+@contextlib.contextmanager
+def map_source(path, skip=0):
+    """
+    Map the file 'path' read-only and yield (view of the bytes past 'skip', map),
+    or (None, None) if there are no such bytes. The view is released on exit.
+    """
+    with open(path, "rb") as f_in:
+        if os.fstat(f_in.fileno()).st_size <= skip:
+            yield None, None
+            return
+        with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as in_map:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                in_map.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(in_map)
+            body = view[skip:]
+            try:
+                yield body, in_map
+            finally:
+                body.release()
+                view.release()
+
+
+def write_file(cipher, src, output_path, header, chunk_size, in_map=None, in_offset=0):
+    """Create output_path and write into it; if that fails, the file created here is removed."""
+    f_out = open(output_path, "wb+")
+    try:
+        with f_out:
+            return write_mapped(cipher, src, f_out, header, chunk_size, in_map, in_offset)
+    except BaseException:
+        os.remove(output_path)
+        raise
+
+
+def write_mapped(cipher, src, f_out, header, chunk_size, in_map=None, in_offset=0):
+    """Pre-size f_out, map it, run the cipher into it and truncate to the real size."""
+    # Upper bound: header + IV + data + one padding block
+    bound = len(header) + len(src) + 2 * cipher.block_size
+    os.ftruncate(f_out.fileno(), bound)
+    with mmap.mmap(f_out.fileno(), bound) as out_map:
+        out_map[:len(header)] = header
+        size = len(header) + crypt_mapped(cipher, src, out_map, len(header), chunk_size, in_map, in_offset)
+    os.ftruncate(f_out.fileno(), size)
+    return size
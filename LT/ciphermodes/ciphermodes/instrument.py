@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in throughput instrumentation for the one-shot mode methods.
+
+Off by default: an instrumented call then costs one global lookup (start()
+returns None and record() returns at once). When enabled, every call of
+BlockModes.encrypt()/decrypt()/..._parallel() (and the AES package's
+modes.ecb_encrypt(), cbc_decrypt(), ...) produces an Event that is handed to
+the registered sinks. The built-in Recorder keeps, per (algorithm, mode,
+direction, key bits): calls, bytes, blocks, total time and a latency
+histogram with power-of-two buckets in microseconds.
+
+    with instrument.collect() as recorder:
+        m.cbc_encrypt(data)
+    recorder.stats()[("AES", "CBC", "encrypt", 128)]["bytes_per_second"]
+
+    instrument.enable()                  # process-wide, into instrument.RECORDER
+    instrument.add_sink(instrument.print_iv)
+"""
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+
+# Checked by start(); flipped by enable()/disable()/collect()
+ENABLED = False
+
+Event = namedtuple("Event", "algorithm mode direction key_bits block_size nbytes seconds iv")
+
+
+def latency_bucket(seconds):
+    """Upper bound in microseconds of the histogram bucket for a latency: 1, 2, 4, 8, ..."""
+    return 1 << int(seconds * 1e6).bit_length()
+
+
+class Recorder:
+    """Sink aggregating events per (algorithm, mode, direction, key bits)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def __call__(self, event):
+        key = (event.algorithm, event.mode, event.direction, event.key_bits)
+        bucket = latency_bucket(event.seconds)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {"calls": 0, "bytes": 0, "blocks": 0,
+                                              "seconds": 0.0, "histogram": {}}
+            entry["calls"] += 1
+            entry["bytes"] += event.nbytes
+            entry["blocks"] += (event.nbytes + event.block_size - 1) // event.block_size
+            entry["seconds"] += event.seconds
+            histogram = entry["histogram"]
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        """Snapshot: {(algorithm, mode, direction, key_bits): counters, throughput and histogram (bucket us -> calls)}."""
+        with self._lock:
+            snapshot = {}
+            for key, entry in self._entries.items():
+                entry = dict(entry, histogram=dict(sorted(entry["histogram"].items())))
+                seconds = entry["seconds"]
+                entry["bytes_per_second"] = entry["bytes"] / seconds if seconds else 0.0
+                snapshot[key] = entry
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide recorder, always subscribed
+RECORDER = Recorder()
+_sinks = [RECORDER]
+_sinks_lock = threading.Lock()
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def add_sink(sink):
+    """Subscribe a callable taking an Event (called in the thread that ran the cipher)."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + [sink]
+
+
+def remove_sink(sink):
+    global _sinks
+    with _sinks_lock:
+        _sinks = [s for s in _sinks if s is not sink]
+
+
+def print_iv(event):
+    """Sink reproducing the old per-call IV output."""
+    if event.iv is not None:
+        print("The Initial Vector (IV):", bytes(event.iv).hex())
+
+
+def start():
+    """Start time of an instrumented call, or None when instrumentation is off."""
+    return perf_counter() if ENABLED else None
+
+
+def record(started, cipher, mode, direction, nbytes, iv=None):
+    """
+    Report one call that began at 'started' (from start()) on the block cipher
+    object 'cipher'; no-op if 'started' was None.
+    """
+    if started is None:
+        return
+    event = Event(getattr(cipher, "name", type(cipher).__name__), mode, direction, 8 * len(cipher.key),
+                  cipher.block_size, nbytes, perf_counter() - started, iv)
+    for sink in _sinks:
+        sink(event)
+
+
+def stats():
+    """Snapshot of the process-wide recorder."""
+    return RECORDER.stats()
+
+
+def reset():
+    RECORDER.reset()
+
+
+@contextmanager
+def collect():
+    """Enable instrumentation for the block and yield a Recorder of just the calls made in it."""
+    recorder = Recorder()
+    was_enabled = ENABLED
+    add_sink(recorder)
+    enable()
+    try:
+        yield recorder
+    finally:
+        remove_sink(recorder)
+        if not was_enabled:
+            disable()
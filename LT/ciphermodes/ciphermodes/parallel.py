@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-core CTR mode and CBC / full-block CFB decryption.
+
+The input is split into shards on block boundaries and each shard is handled
+by a worker process:
+  - CTR: shard k starts at counter IV + offset_k // block size, so every
+    worker can compute its keystream independently.
+  - CBC / full-block CFB decryption: plaintext block i only needs C_i and
+    C_{i-1}, so a shard just needs the ciphertext block in front of its
+    boundary (the IV for the first shard).
+Other modes plug in their own kernel function (e.g. XTS in the AES package,
+whose shards hold whole sectors). Input and output live in shared memory:
+workers read their shard and write the result in place, and the output is
+already in order when all shards finish.
+Results are byte-identical to the serial methods. Any BlockModes object
+works (AES, DES, 3DES); workers rebuild it from its spec().
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from .stream import CTREncryptor, CBCDecryptor, CFBDecryptor, pkcs7_unpad
+
+# Bytes per worker task (multiple of the block size)
+SHARD_BYTES = 4 << 20
+
+
+def cipher_spec(modes_obj):
+    """Picklable description of a modes object: (factory, args), see BlockModes.spec()."""
+    return modes_obj.spec()
+
+
+def build_modes(spec):
+    """Rebuild a modes object in a worker from cipher_spec()."""
+    factory, args = spec
+    return factory(*args)
+
+
+############################################################################
+# Shard kernels: kernel(modes_obj, src, start, end, out, out_start, arg)
+############################################################################
+
+def ctr_kernel(modes_obj, src, start, end, out, out_start, counter):
+    """out[out_start:] = src[start:end] XOR CTR keystream starting at 'counter' (an int)."""
+    cipher = CTREncryptor(modes_obj.cipher, modes_obj.batch, counter.to_bytes(modes_obj.block_size, 'big'))
+    cipher.process_into(src[start:end], out, out_start)
+
+
+def cbc_kernel(modes_obj, src, start, end, out, out_start, arg=None):
+    """CBC-decrypt src[start:end]; the block before 'start' is the previous ciphertext block (or IV)."""
+    cipher = CBCDecryptor(modes_obj.cipher, modes_obj.batch)
+    cipher.start(src[start - modes_obj.block_size:start])
+    cipher.process_into(src[start:end], out, out_start)
+
+
+def cfb_kernel(modes_obj, src, start, end, out, out_start, arg=None):
+    """Full-block CFB-decrypt src[start:end]; the block before 'start' is the previous ciphertext block (or IV)."""
+    cipher = CFBDecryptor(modes_obj.cipher, modes_obj.batch)
+    cipher.start(src[start - modes_obj.block_size:start])
+    cipher.process_into(src[start:end], out, out_start)
+
+
+KERNELS = {"CTR": ctr_kernel, "CBC": cbc_kernel, "CFB": cfb_kernel}
+
+
+def resolve_kernel(kind):
+    """A name in KERNELS, or a kernel function itself (module level, so workers can unpickle it)."""
+    return KERNELS[kind] if isinstance(kind, str) else kind
+
+
+def shard_task(kind, spec, in_name, out_name, start, end, out_start, arg):
+    """Worker task: run one kernel over bytes [start, end) of the shared input buffer."""
+    modes_obj = build_modes(spec)
+    inp, outp = SharedMemory(name=in_name), SharedMemory(name=out_name)
+    try:
+        src, out = inp.buf, outp.buf
+        resolve_kernel(kind)(modes_obj, src, start, end, out, out_start, arg)
+        del src, out  # release the exported buffers before close()
+    finally:
+        inp.close()
+        outp.close()
+
+
+def run_sharded(modes_obj, kind, data, first, out_len, arg_for, workers, executor, shard_bytes,
+                unit=None):
+    """
+    Apply the kernel 'kind' (see resolve_kernel) to data[first:] in shards of 'shard_bytes' (rounded down
+    to a multiple of 'unit', by default the block size), writing data[i] to
+    out[i - first]. 'arg_for(start)' gives the per-shard argument.
+    Runs serially in this process when there is a single shard or workers == 1.
+    """
+    n = len(data)
+    unit = unit or modes_obj.block_size
+    shard_bytes = max(unit, shard_bytes // unit * unit)
+    kernel = resolve_kernel(kind)
+    if out_len <= shard_bytes or workers == 1:
+        out = bytearray(out_len)
+        if out_len:
+            kernel(modes_obj, memoryview(data), first, n, out, 0, arg_for(first))
+        return out
+
+    spec = cipher_spec(modes_obj)
+    segments = []  # whichever shared memory segments exist, for the cleanup below
+    own_executor = executor is None
+    try:
+        for size in (n, out_len):
+            segments.append(SharedMemory(create=True, size=size))
+        inp, outp = segments
+        inp.buf[:n] = data
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        futures = [
+            executor.submit(shard_task, kind, spec, inp.name, outp.name,
+                            start, min(start + shard_bytes, n), start - first, arg_for(start))
+            for start in range(first, n, shard_bytes)
+        ]
+        for future in futures:
+            future.result()
+        return bytearray(outp.buf[:out_len])
+    finally:
+        if own_executor and executor is not None:
+            executor.shutdown()
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def ctr_parallel(modes_obj, iv, data, workers=None, executor=None, shard_bytes=SHARD_BYTES):
+    """
+    XOR 'data' with the CTR keystream starting at 'iv', sharded across processes.
+    'executor' may be an existing ProcessPoolExecutor; otherwise one with
+    'workers' processes (default: CPU count) is created for this call.
+    Returns a bytearray.
+    """
+    size = modes_obj.block_size
+    counter0, mask = int.from_bytes(iv, 'big'), (1 << (8 * size)) - 1
+    return run_sharded(modes_obj, "CTR", data, 0, len(data),
+                       lambda start: (counter0 + start // size) & mask,
+                       workers, executor, shard_bytes)
+
+
+def chained_decrypt_parallel(modes_obj, mode, ciphertext, workers=None, executor=None,
+                             shard_bytes=SHARD_BYTES):
+    """
+    CBC or full-block CFB decryption of IV (one block) + ciphertext, sharded across
+    processes. Each shard is decrypted starting from the ciphertext block before
+    it; PKCS7 padding (CBC) is removed once at the end. Returns a bytearray.
+    """
+    size = modes_obj.block_size
+    plaintext = run_sharded(modes_obj, mode, ciphertext, size, len(ciphertext) - size,
+                            lambda start: None, workers, executor, shard_bytes)
+    if mode == "CBC":
+        pkcs7_unpad(plaintext, size)
+    return plaintext
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Keystream prefetching for CTR / OFB sessions.
+
+The keystream of CTR and OFB depends only on the key and the IV, so it can be
+computed before the payload arrives. A KeystreamSession keeps a ring buffer
+filled from a background thread; encrypting a message is then just an XOR
+with bytes that are already there:
+
+    session = modes_obj.keystream_session("CTR")
+    c1 = session.encrypt(msg1)      # msg1 ^ keystream[0:len(msg1)]
+    c2 = session.encrypt(msg2)      # continues where msg1 stopped
+    session.stats()                 # hit/miss counters for sizing the buffer
+    session.close()
+
+Messages consume the keystream back to back and are not padded, so the first
+message equals ctr_encrypt(msg1) without the IV prefix, and a peer running a
+session with the same key and IV decrypts the messages in the same order.
+"""
+import threading
+from .stream import CTREncryptor, OFBEncryptor, xor_bulk_into
+
+# Default ring buffer size and the amount generated per background step
+BUFFER_BYTES = 1 << 16
+REFILL_BYTES = 1 << 12
+
+SOURCES = {"CTR": CTREncryptor, "OFB": OFBEncryptor}
+
+
+class KeystreamSession:
+    """
+    Ring buffer of pre-generated keystream for one key and IV.
+      - buffer_size  : bytes kept ready (at least refill_bytes)
+      - refill_bytes : bytes generated per background step (multiple of the block size)
+    A message larger than what is buffered takes what is there and generates
+    the rest inline; it is counted as a miss.
+    """
+
+    def __init__(self, modes_obj, mode="CTR", iv=None, buffer_size=BUFFER_BYTES, refill_bytes=REFILL_BYTES):
+        if mode not in SOURCES:
+            raise ValueError(f"Keystream prefetch supports CTR and OFB, not {mode}")
+        block_size = modes_obj.block_size
+        if refill_bytes <= 0 or refill_bytes % block_size:
+            raise ValueError(f"refill_bytes must be a positive multiple of {block_size}.")
+        self.block_size = block_size
+        self.mode = mode
+        self.iv = bytes(iv if iv is not None else modes_obj.iv)
+        # Encrypting zeros with the mode's encryptor yields the raw keystream
+        self.source = SOURCES[mode](modes_obj.cipher, modes_obj.batch, self.iv)
+        self.refill_bytes = refill_bytes
+        self.capacity = max(buffer_size, refill_bytes)
+        self.ring = bytearray(self.capacity)
+        self.zeros = bytes(refill_bytes)
+        self.read_pos = 0      # next unread byte in the ring
+        self.available = 0     # buffered bytes not yet consumed
+        self.position = 0      # keystream bytes handed out so far
+        self.hits = 0
+        self.misses = 0
+        self.prefetched_bytes = 0
+        self.inline_bytes = 0
+        self.closed = False
+        # 'generate_lock' serializes use of self.source; 'ring_lock' guards the ring
+        self.generate_lock = threading.Lock()
+        self.ring_lock = threading.Lock()
+        self.space_free = threading.Condition(self.ring_lock)
+        self.thread = threading.Thread(target=self.fill_loop, name=f"{mode}-keystream-prefetch", daemon=True)
+        self.thread.start()
+
+    def generate(self, n):
+        """Next n bytes of keystream (n a multiple of the block size except possibly for the last call)."""
+        out = bytearray(n)
+        self.source.process_into(bytes(n) if n != len(self.zeros) else self.zeros, out, 0)
+        return out
+
+    def fill_loop(self):
+        """Background thread: top the ring up one refill step at a time."""
+        refill = self.refill_bytes
+        while True:
+            with self.space_free:
+                while not self.closed and self.capacity - self.available < refill:
+                    self.space_free.wait()
+                if self.closed:
+                    return
+            with self.generate_lock:
+                # A miss may have refilled the ring after the check above. While
+                # generate_lock is held 'available' can only shrink, so check again
+                # here, before the chunk is taken from the source.
+                with self.ring_lock:
+                    if self.closed:
+                        return
+                    if self.capacity - self.available < refill:
+                        continue
+                chunk = self.generate(refill)
+                with self.ring_lock:
+                    if self.closed:
+                        return
+                    write_pos = (self.read_pos + self.available) % self.capacity
+                    first = min(refill, self.capacity - write_pos)
+                    self.ring[write_pos:write_pos + first] = chunk[:first]
+                    self.ring[:refill - first] = chunk[first:]
+                    self.available += refill
+                    self.prefetched_bytes += refill
+
+    def take(self, n):
+        """Remove up to n buffered bytes from the ring."""
+        take = min(n, self.available)
+        start = self.read_pos
+        end = start + take
+        if end <= self.capacity:
+            out = bytearray(self.ring[start:end])
+        else:
+            out = self.ring[start:] + self.ring[:end - self.capacity]
+        self.read_pos = end % self.capacity
+        self.available -= take
+        return out
+
+    def keystream(self, n):
+        """The next n keystream bytes, from the buffer when possible."""
+        if self.closed:
+            raise ValueError("Keystream session is closed.")
+        with self.ring_lock:
+            if self.available >= n:
+                out = self.take(n)
+                self.hits += 1
+                self.position += n
+                self.space_free.notify()
+                return out
+        # Miss: stop the producer, drain the ring, generate the rest here
+        with self.generate_lock:
+            with self.ring_lock:
+                out = self.take(n)
+                self.misses += 1
+                self.position += n
+                self.space_free.notify()
+            missing = n - len(out)
+            if missing:
+                # Stay block-aligned for the producer: keep the unused tail in the ring
+                extra = -missing % self.block_size
+                generated = self.generate(missing + extra)
+                out += generated[:missing]
+                self.inline_bytes += missing
+                if extra:
+                    with self.ring_lock:
+                        self.ring[:extra] = generated[missing:]
+                        self.read_pos = 0
+                        self.available = extra
+        return out
+
+    def encrypt(self, data):
+        """XOR 'data' with the next len(data) keystream bytes; returns a bytearray."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        n = len(data)
+        keystream = self.keystream(n)
+        out = bytearray(n)
+        xor_bulk_into(out, 0, memoryview(data), keystream)
+        return out
+
+    # The keystream XOR is its own inverse
+    decrypt = encrypt
+
+    def stats(self):
+        """Counters for sizing the buffer."""
+        with self.ring_lock:
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "buffered": self.available,
+                "capacity": self.capacity,
+                "position": self.position,
+                "prefetched_bytes": self.prefetched_bytes,
+                "inline_bytes": self.inline_bytes,
+            }
+
+    def close(self):
+        """Stop the background thread."""
+        with self.ring_lock:
+            self.closed = True
+            self.space_free.notify_all()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental (streaming) cipher objects for ECB, CBC, CFB, OFB and CTR.
+
+Each object carries the chaining state between calls:
+    enc = modes_obj.encryptor("CBC")
+    out = enc.update(chunk1) + enc.update(chunk2) + enc.finalize()
+The concatenated output is byte-identical to the one-shot modes_obj.encrypt("CBC", ...),
+including the IV prefix. PKCS7 padding is only applied/removed in finalize(),
+so a file can be processed in fixed-size chunks with constant memory.
+
+The block size is taken from the cipher object (see blockmodes.py for what a
+cipher has to provide), so the same objects run AES with 16-byte blocks and
+DES / 3DES with 8-byte blocks.
+"""
+from abc import ABC, abstractmethod
+try:
+    import numpy as np
+    from .blocks import as_blocks
+except ImportError:  # NumPy is optional; batch engines are then never used
+    np = None
+
+# Below this size xor_bulk_into() XORs Python ints instead of NumPy arrays
+NUMPY_XOR_BYTES = 256
+
+
+def xor_into(dst, offset, data, keystream):
+    """
+    dst[offset:offset+len(data)] = data XOR keystream[:len(data)]
+    'data' is at most one block; the XOR is done on ints instead of per byte.
+    """
+    n = len(data)
+    dst[offset:offset + n] = (
+        int.from_bytes(data, 'big') ^ (int.from_bytes(keystream, 'big') >> (8 * (len(keystream) - n)))
+    ).to_bytes(n, 'big')
+
+
+def xor_bulk_into(dst, offset, data, keystream):
+    """
+    dst[offset:offset+len(data)] = data XOR keystream[:len(data)] for a whole chunk
+    in one operation (NumPy bitwise_xor, or one big-int XOR without NumPy).
+    'data' may alias the destination range (in-place XOR).
+    """
+    n = len(data)
+    if np is not None and n >= NUMPY_XOR_BYTES:
+        np.bitwise_xor(np.frombuffer(data, np.uint8, n), np.frombuffer(keystream, np.uint8, n),
+                       out=np.frombuffer(dst, np.uint8, n, offset))
+    else:
+        dst[offset:offset + n] = (
+            int.from_bytes(data, 'big') ^ int.from_bytes(memoryview(keystream)[:n], 'big')
+        ).to_bytes(n, 'big')
+
+
+class StreamCipher(ABC):
+    """
+    Base class: splits the incoming byte stream into whole units for process_into().
+      - cipher     : block cipher object (block_size, encrypt/decrypt, encrypt_into/decrypt_into)
+      - batch      : optional multi-block engine for the same key
+      - unit       : bytes per processing step (block or CFB segment; None = one block)
+      - hold_back  : bytes always kept pending until finalize() (the last block, for unpadding)
+      - header     : bytes emitted before the first output (the IV for encryptors)
+      - iv_needed  : for decryptors, the stream starts with a one-block IV that is consumed first
+    """
+    unit = None
+    hold_back = 0
+    iv_needed = False
+
+    def __init__(self, cipher, batch=None, iv=None):
+        self.cipher = cipher
+        self.batch = batch
+        self.block_size = cipher.block_size
+        if self.unit is None:
+            self.unit = self.block_size
+        self.iv = bytes(iv) if iv is not None else None
+        self.header = b''
+        self.pending = bytearray()
+        self.iv_buffer = bytearray()
+        self.finalized = False
+
+    def use_batch(self, num_bytes):
+        return self.batch is not None and num_bytes >= self.batch.min_blocks * self.block_size
+
+    def update(self, data, final=False):
+        """
+        Feed the next chunk; returns the output bytes that are ready (a bytearray).
+        With final=True this is the last chunk: finalize() is folded in and its
+        output goes into the same buffer, so a one-shot call allocates the
+        output once. Full blocks are read straight from a view of 'data'.
+        """
+        segments = self.accept(data)
+        # The final part (padding block or unpadded tail) is at most pending + one block
+        size = len(self.header) + sum(len(segment) for segment in segments)
+        if final:
+            size += len(self.pending) + self.block_size
+        out = bytearray(size)
+        written = self.emit_into(segments, out, 0, final)
+        del out[written:]  # trims the unused reserve in place
+        return out
+
+    def update_into(self, data, out, offset=0, final=False):
+        """
+        Like update(), but writes the output into out[offset:] (any writable
+        buffer, e.g. a mapped file) and returns the number of bytes written.
+        'out' needs room for len(data) + 3 blocks (IV header, padding).
+        """
+        return self.emit_into(self.accept(data), out, offset, final)
+
+    def accept(self, data):
+        """Take in a chunk: consume the IV if needed and return the segments to process now."""
+        if self.finalized:
+            raise ValueError("Cipher object already finalized.")
+        mv = memoryview(data).cast('B')
+        if self.iv_needed and self.iv is None:
+            take = self.block_size - len(self.iv_buffer)
+            self.iv_buffer += mv[:take]
+            mv = mv[take:]
+            if len(self.iv_buffer) < self.block_size:
+                return []
+            self.iv = bytes(self.iv_buffer)
+            self.start(self.iv)
+        return self.take_units(mv)[0]
+
+    def emit_into(self, segments, out, offset, final):
+        """Write header + processed segments (+ the final part) into out[offset:]; returns the length."""
+        pos = offset
+        out[pos:pos + len(self.header)] = self.header
+        pos += len(self.header)
+        self.header = b''
+        for segment in segments:
+            self.process_into(segment, out, pos)
+            pos += len(segment)
+        if final:
+            self.finalized = True
+            tail = self.finish()
+            out[pos:pos + len(tail)] = tail
+            pos += len(tail)
+        return pos - offset
+
+    def take_units(self, mv):
+        """
+        Split pending + mv into segments of whole units to process now, keeping the rest pending.
+        Only the small pending part is copied; the bulk of mv is passed through as a view.
+        """
+        unit = self.unit
+        pending = self.pending
+        total = len(pending) + len(mv)
+        usable = (total - self.hold_back) // unit * unit if total > self.hold_back else 0
+        if usable <= len(pending):
+            first = bytes(pending[:usable])
+            self.pending = pending[usable:] + mv
+            return ([first] if usable else []), usable
+        segments = []
+        fill = (-len(pending)) % unit  # bytes of mv that complete the pending units
+        if pending or fill:
+            segments.append(bytes(pending + mv[:fill]))
+        body_end = usable - len(pending)
+        if body_end > fill:
+            segments.append(mv[fill:body_end])
+        self.pending = bytearray(mv[body_end:])
+        return segments, usable
+
+    def finalize(self):
+        """
+        Process what is left (padding/unpadding) and return the final output bytes.
+        """
+        if self.finalized:
+            raise ValueError("Cipher object already finalized.")
+        self.finalized = True
+        out = bytearray(self.header)
+        self.header = b''
+        out += self.finish()
+        return out
+
+    def start(self, iv):
+        """Set up the chaining state once the IV is known."""
+
+    @abstractmethod
+    def process_into(self, src, out, offset):
+        """Process len(src) bytes (a multiple of 'unit') into out[offset:]."""
+
+    def finish(self):
+        """Handle the pending bytes at the end of the stream."""
+        return b''
+
+
+class PaddedEncryptor(StreamCipher):
+    """Encryptor that adds PKCS7 padding in finalize()."""
+
+    def finish(self):
+        padding_length = self.block_size - len(self.pending)
+        last = bytes(self.pending) + bytes([padding_length] * padding_length)
+        out = bytearray(self.block_size)
+        self.process_into(last, out, 0)
+        return out
+
+
+class PaddedDecryptor(StreamCipher):
+    """Decryptor that keeps the last block back and strips PKCS7 padding in finalize()."""
+    length_error = "Ciphertext length must be multiple of {} bytes."
+
+    @property
+    def hold_back(self):
+        return self.block_size
+
+    def finish(self):
+        if self.iv_needed and self.iv is None:
+            raise ValueError(self.length_error.format(self.block_size))
+        if not self.pending:
+            return b''
+        if len(self.pending) != self.block_size:
+            raise ValueError(self.length_error.format(self.block_size))
+        out = bytearray(self.block_size)
+        self.process_into(bytes(self.pending), out, 0)
+        return pkcs7_unpad(out, self.block_size)
+
+
+def pkcs7_unpad(data, block_size):
+    """Remove PKCS7 padding from the last block (trims a bytearray in place)."""
+    if not data:
+        return data
+    padding_length = data[-1]
+    if padding_length < 1 or padding_length > block_size:
+        # Invalid padding
+        raise ValueError("Invalid PKCS7 padding.")
+    del data[-padding_length:]
+    return data
+
+
+############################################################################
+# ECB
+############################################################################
+
+class ECBEncryptor(PaddedEncryptor):
+    def process_into(self, src, out, offset):
+        if self.use_batch(len(src)):
+            np.frombuffer(out, dtype=np.uint8)[offset:offset + len(src)] = \
+                self.batch.encrypt_blocks(as_blocks(src, self.block_size)).reshape(-1)
+            return
+        encrypt_into = self.cipher.encrypt_into
+        for i in range(0, len(src), self.block_size):
+            encrypt_into(src, out, i, offset + i)
+
+
+class ECBDecryptor(PaddedDecryptor):
+    length_error = "Ciphertext length must be multiple of {} bytes for ECB mode."
+
+    def process_into(self, src, out, offset):
+        if self.use_batch(len(src)):
+            np.frombuffer(out, dtype=np.uint8)[offset:offset + len(src)] = \
+                self.batch.decrypt_blocks(as_blocks(src, self.block_size)).reshape(-1)
+            return
+        decrypt_into = self.cipher.decrypt_into
+        for i in range(0, len(src), self.block_size):
+            decrypt_into(src, out, i, offset + i)
+
+
+############################################################################
+# CBC
+############################################################################
+
+class CBCEncryptor(PaddedEncryptor):
+    def __init__(self, cipher, batch=None, iv=None):
+        super().__init__(cipher, batch, iv)
+        self.header = self.iv
+        self.previous = bytearray(self.iv)  # previous ciphertext block
+
+    def process_into(self, src, out, offset):
+        encrypt_into, size = self.cipher.encrypt_into, self.block_size
+        encrypt_into(src, out, 0, offset, xor_src=self.previous)
+        for i in range(size, len(src), size):
+            # XOR with the ciphertext block just written before this one
+            encrypt_into(src, out, i, offset + i, xor_src=out, xor_offset=offset + i - size)
+        end = offset + len(src)
+        self.previous[:] = out[end - size:end]
+
+
+class CBCDecryptor(PaddedDecryptor):
+    iv_needed = True
+    length_error = "Ciphertext (including IV) must be multiple of {} bytes for CBC."
+
+    def start(self, iv):
+        self.previous = bytearray(iv)
+
+    def process_into(self, src, out, offset):
+        size = self.block_size
+        if self.use_batch(len(src)):
+            # P_i = D(C_i) ^ C_{i-1}: every block is independent given the ciphertext
+            blocks = as_blocks(src, size)
+            decrypted = np.frombuffer(out, dtype=np.uint8)[offset:offset + len(src)].reshape(-1, size)
+            decrypted[:] = self.batch.decrypt_blocks(blocks)
+            decrypted[0] ^= np.frombuffer(self.previous, dtype=np.uint8)
+            decrypted[1:] ^= blocks[:-1]
+        else:
+            # Decrypt every block, then apply the chaining XOR to the whole chunk at once
+            n = len(src)
+            decrypt_into = self.cipher.decrypt_into
+            for i in range(0, n, size):
+                decrypt_into(src, out, i, offset + i)
+            decrypted = memoryview(out)[offset:offset + n]
+            xor_bulk_into(out, offset, decrypted[:size], self.previous)
+            xor_bulk_into(out, offset + size, decrypted[size:], memoryview(src)[:n - size])
+            del decrypted
+        self.previous[:] = src[len(src) - size:]
+
+
+############################################################################
+# CFB (64-bit or 128-bit segments, at most one block)
+############################################################################
+
+class CFBEncryptor(StreamCipher):
+    decrypting = False
+
+    def __init__(self, cipher, batch=None, iv=None, segment_size=None):
+        """'segment_size' is in bits; None means one full block."""
+        if segment_size is None:
+            segment_size = 8 * cipher.block_size
+        if segment_size not in [64, 128]:
+            raise ValueError("Segment size must be either 64 or 128 bits for CFB.")
+        if segment_size > 8 * cipher.block_size:
+            raise ValueError(f"CFB segment size cannot exceed the {8 * cipher.block_size}-bit block.")
+        super().__init__(cipher, batch, iv)
+        self.unit = segment_size // 8
+        self.keystream = bytearray(self.block_size)
+        if self.iv is not None:
+            self.header = self.iv
+            self.start(self.iv)
+
+    def start(self, iv):
+        self.register = bytearray(iv)  # shift register: last block of IV || ciphertext
+
+    def process_into(self, src, out, offset):
+        if self.decrypting:
+            self.decrypt_into(src, out, offset)
+            return
+        # Encryption feeds each ciphertext segment back into the register, so the
+        # keystream can only be produced one segment at a time.
+        encrypt_into, keystream, register = self.cipher.encrypt_into, self.keystream, self.register
+        unit, size = self.unit, self.block_size
+        for i in range(0, len(src), unit):
+            encrypt_into(register, keystream)
+            segment = src[i:i + unit]
+            xor_into(out, offset + i, segment, keystream)
+            cipher_segment = out[offset + i:offset + i + len(segment)]
+            if len(segment) == size:
+                register[:] = cipher_segment
+            else:
+                register[:size - len(segment)] = register[len(segment):]
+                register[size - len(segment):] = cipher_segment
+
+    def decrypt_into(self, src, out, offset):
+        """
+        When decrypting, every register value is known up front: the register for
+        segment i is the one-block window of IV || ciphertext ending where segment i
+        starts. Only the windows of the first block overlap the register; the rest
+        are read straight from 'src'. Encrypt all windows (batched when possible),
+        then XOR once.
+        """
+        n = len(src)
+        unit, size = self.unit, self.block_size
+        num_segments = (n + unit - 1) // unit
+        head = min(size // unit, num_segments)  # windows starting inside the register
+        encrypt_into, block, register = self.cipher.encrypt_into, self.keystream, self.register
+        keystream = bytearray(num_segments * unit)
+        for i in range(head):
+            encrypt_into(bytes(register[i * unit:]) + bytes(src[:i * unit]), block)
+            keystream[i * unit:(i + 1) * unit] = block[:unit]
+        if self.use_batch((num_segments - head) * size):
+            windows = np.lib.stride_tricks.sliding_window_view(
+                np.frombuffer(src, dtype=np.uint8), size)[::unit][:num_segments - head]
+            np.frombuffer(keystream, dtype=np.uint8)[head * unit:].reshape(-1, unit)[:] = \
+                self.batch.encrypt_blocks(np.ascontiguousarray(windows))[:, :unit]
+        else:
+            for i in range(head, num_segments):
+                encrypt_into(src, block, i * unit - size, 0)
+                keystream[i * unit:(i + 1) * unit] = block[:unit]
+        xor_bulk_into(out, offset, src, keystream)
+        if n >= size:
+            register[:] = src[n - size:]
+        else:
+            register[:] = register[n:] + bytes(src)
+
+    def finish(self):
+        # Only the last segment may be partial; CFB needs no padding
+        out = bytearray(len(self.pending))
+        if self.pending:
+            self.process_into(bytes(self.pending), out, 0)
+        return out
+
+
+class CFBDecryptor(CFBEncryptor):
+    iv_needed = True
+    decrypting = True
+
+    def __init__(self, cipher, batch=None, segment_size=None):
+        super().__init__(cipher, batch, None, segment_size)
+
+
+############################################################################
+# OFB
+############################################################################
+
+class OFBKeystream:
+    """OFB chaining shared by the encryptor and decryptor: O_i = E(O_{i-1}), out = in ^ O_i."""
+
+    def start(self, iv):
+        self.feedback = bytearray(iv)  # O_{i-1}
+
+    def process_into(self, src, out, offset):
+        # 1) Keystream for the whole chunk: each block is E(previous keystream block)
+        n, size = len(src), self.block_size
+        encrypt_into = self.cipher.encrypt_into
+        keystream = bytearray(n)
+        encrypt_into(self.feedback, keystream)
+        for i in range(size, n, size):
+            encrypt_into(keystream, keystream, i - size, i)
+        self.feedback[:] = keystream[n - size:]
+        # 2) One XOR over the chunk
+        xor_bulk_into(out, offset, src, keystream)
+
+
+class OFBEncryptor(OFBKeystream, PaddedEncryptor):
+    def __init__(self, cipher, batch=None, iv=None):
+        super().__init__(cipher, batch, iv)
+        self.header = self.iv
+        self.start(self.iv)
+
+
+class OFBDecryptor(OFBKeystream, PaddedDecryptor):
+    iv_needed = True
+    length_error = "Ciphertext (including IV) must be multiple of {} bytes for OFB."
+
+
+############################################################################
+# CTR
+############################################################################
+
+class CTREncryptor(StreamCipher):
+    """
+    CTR needs no buffering: partial blocks are XORed with the unused tail of the
+    current keystream block, which is kept for the next update().
+    The counter is the whole IV block read big-endian (wraps at the block size).
+    """
+    unit = 1
+
+    def __init__(self, cipher, batch=None, iv=None):
+        super().__init__(cipher, batch, iv)
+        self.counter_mask = (1 << (8 * self.block_size)) - 1
+        if self.iv is not None:
+            self.header = self.iv
+            self.start(self.iv)
+
+    def start(self, iv):
+        self.counter = int.from_bytes(iv, 'big')
+        self.counter_block = bytearray(self.block_size)
+        self.keystream = bytearray(self.block_size)
+        self.keystream_used = self.block_size  # bytes of self.keystream already consumed
+
+    def next_keystream_block(self):
+        self.counter_block[:] = self.counter.to_bytes(self.block_size, 'big')
+        self.cipher.encrypt_into(self.counter_block, self.keystream)
+        self.counter = (self.counter + 1) & self.counter_mask
+        self.keystream_used = 0
+
+    def process_into(self, src, out, offset):
+        n = len(src)
+        size = self.block_size
+        pos = 0
+        # 1) Leftover keystream from the previous call
+        left = size - self.keystream_used
+        if left and n:
+            take = min(left, n)
+            xor_into(out, offset, src[:take], memoryview(self.keystream)[self.keystream_used:self.keystream_used + take])
+            self.keystream_used += take
+            pos = take
+        # 2) Whole blocks
+        full = (n - pos) // size * size
+        if full:
+            self.xor_blocks_into(src[pos:pos + full], out, offset + pos)
+            pos += full
+        # 3) Trailing partial block: generate one more keystream block and keep its tail
+        if pos < n:
+            self.next_keystream_block()
+            take = n - pos
+            xor_into(out, offset + pos, src[pos:], memoryview(self.keystream)[:take])
+            self.keystream_used = take
+
+    def xor_blocks_into(self, src, out, offset):
+        size, mask = self.block_size, self.counter_mask
+        if self.use_batch(len(src)):
+            num_blocks = len(src) // size
+            keystream = self.batch.ctr_keystream(self.counter.to_bytes(size, 'big'), num_blocks).reshape(-1)
+            xor_bulk_into(out, offset, src, keystream)
+            self.counter = (self.counter + num_blocks) & mask
+            return
+        # Keystream for the whole chunk first, then one XOR
+        n = len(src)
+        encrypt_into, counter = self.cipher.encrypt_into, self.counter
+        keystream = bytearray(n)
+        for i in range(0, n, size):
+            encrypt_into(counter.to_bytes(size, 'big'), keystream, 0, i)
+            counter = (counter + 1) & mask
+        self.counter = counter
+        xor_bulk_into(out, offset, src, keystream)
+        self.keystream_used = size
+
+
+class CTRDecryptor(CTREncryptor):
+    iv_needed = True
+
+    def __init__(self, cipher, batch=None):
+        super().__init__(cipher, batch, None)
+
+    def finish(self):
+        if self.iv is None:
+            raise ValueError("Ciphertext is too short for CTR mode (missing IV).")
+        return b''
+
+
+ENCRYPTORS = {"ECB": ECBEncryptor, "CBC": CBCEncryptor, "CFB": CFBEncryptor, "OFB": OFBEncryptor, "CTR": CTREncryptor}
+DECRYPTORS = {"ECB": ECBDecryptor, "CBC": CBCDecryptor, "CFB": CFBDecryptor, "OFB": OFBDecryptor, "CTR": CTRDecryptor}
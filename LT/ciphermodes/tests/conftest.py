@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from toy import toy_modes
+
+
+@pytest.fixture(params=[8, 16], ids=["8-byte", "16-byte"])
+def block_size(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False], ids=["batch", "no-batch"])
+def modes_obj(request, block_size):
+    return toy_modes(block_size, request.param, os.urandom(block_size))
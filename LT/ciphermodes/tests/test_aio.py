@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import random
+import pytest
+from ciphermodes import aio
+
+
+async def feed(reader, data, rng, error=None):
+    """Deliver data to a StreamReader in random pieces, like a socket would."""
+    pos = 0
+    while pos < len(data):
+        step = rng.randrange(1, 700)
+        reader.feed_data(data[pos:pos + step])
+        pos += step
+        await asyncio.sleep(0)
+    if error is not None:
+        reader.set_exception(error)
+    else:
+        reader.feed_eof()
+
+
+class Writer:
+    def __init__(self):
+        self.data = bytearray()
+        self.drains = 0
+
+    def write(self, chunk):
+        self.data += chunk
+
+    async def drain(self):
+        self.drains += 1
+
+
+def crypt(make_stream, data, seed, error=None):
+    async def run():
+        reader = asyncio.StreamReader()
+        feeder = asyncio.create_task(feed(reader, data, random.Random(seed), error))
+        writer = Writer()
+        written = await aio.awrite_stream(make_stream(reader), writer)
+        await feeder
+        assert written == len(writer.data)
+        return bytes(writer.data)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC", "CFB", "OFB", "CTR"])
+@pytest.mark.parametrize("length", [0, 1, 5000])
+def test_round_trip_matches_one_shot(modes_obj, mode, length):
+    data = os.urandom(length)
+    encrypted = crypt(lambda r: modes_obj.aencrypt_stream(r, mode, chunk_size=97, max_in_flight=2), data, 1)
+    assert encrypted == modes_obj.encrypt(mode, data)
+    assert crypt(lambda r: modes_obj.adecrypt_stream(r, mode, chunk_size=64), encrypted, 2) == data
+
+
+def test_reader_error_is_raised(modes_obj):
+    with pytest.raises(ConnectionResetError):
+        crypt(lambda r: modes_obj.aencrypt_stream(r, "CTR", chunk_size=50), os.urandom(300), 3,
+              ConnectionResetError("peer went away"))
+
+
+def test_cipher_error_is_raised(modes_obj, block_size):
+    ciphertext = modes_obj.encrypt("CBC", os.urandom(300))[:-1]
+    with pytest.raises(ValueError):
+        crypt(lambda r: modes_obj.adecrypt_stream(r, "CBC"), ciphertext, 4)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from ciphermodes.blockmodes import BulkBlockCipher, BulkBatch
+from ciphermodes.stream import StreamCipher
+from toy import ToyCipher, toy_modes
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+
+
+def xor(a, b):
+    return bytes(x ^ y for x, y in zip(a, b))
+
+
+def pad(data, size):
+    n = size - len(data) % size
+    return data + bytes([n]) * n
+
+
+def reference_encrypt(cipher, mode, iv, data):
+    """Textbook definitions of the modes, one block at a time."""
+    size = cipher.block_size
+    e = cipher.encrypt
+    if mode in ("ECB", "CBC", "OFB"):
+        data = pad(data, size)
+    blocks = [data[i:i + size] for i in range(0, len(data), size)]
+    out, feedback = [], iv
+    for i, block in enumerate(blocks):
+        if mode == "ECB":
+            out.append(e(block))
+        elif mode == "CBC":
+            feedback = e(xor(block, feedback))
+            out.append(feedback)
+        elif mode == "CFB":
+            c = xor(block, e(feedback))
+            feedback = c
+            out.append(c)
+        elif mode == "OFB":
+            feedback = e(feedback)
+            out.append(xor(block, feedback))
+        else:
+            counter = (int.from_bytes(iv, 'big') + i) % (1 << (8 * size))
+            out.append(xor(block, e(counter.to_bytes(size, 'big'))))
+    prefix = b'' if mode == "ECB" else iv
+    return prefix + b''.join(out)
+
+
+def test_abstract_interfaces():
+    with pytest.raises(TypeError):
+        BulkBlockCipher()
+    with pytest.raises(TypeError):
+        StreamCipher(ToyCipher(bytes(8)))
+
+    class Half(BulkBlockCipher):
+        def encrypt_blocks(self, data):
+            return data
+    with pytest.raises(TypeError):
+        Half()
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("length", [0, 1, 15, 16, 17, 100, 1000])
+def test_matches_reference(modes_obj, mode, length):
+    data = os.urandom(length)
+    ct = modes_obj.encrypt(mode, data)
+    assert bytes(ct) == reference_encrypt(modes_obj.cipher, mode, modes_obj.iv, data)
+    assert bytes(modes_obj.decrypt(mode, ct)) == data
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_batch_engine_matches_single_blocks(block_size, mode):
+    iv = os.urandom(block_size)
+    data = os.urandom(50 * block_size + 3)
+    batched, single = toy_modes(block_size, True, iv), toy_modes(block_size, False, iv)
+    assert batched.encrypt(mode, data) == single.encrypt(mode, data)
+
+
+def test_bulk_batch_arrays(block_size):
+    np = pytest.importorskip("numpy")
+    cipher = ToyCipher(bytes(range(block_size)))
+    batch = BulkBatch(cipher)
+    blocks = np.frombuffer(os.urandom(10 * block_size), np.uint8).reshape(10, block_size)
+    out = batch.encrypt_blocks(blocks)
+    assert out.tobytes() == cipher.encrypt_blocks(blocks.tobytes())
+    assert (batch.decrypt_blocks(out) == blocks).all()
+    keystream = batch.ctr_keystream(bytes(block_size - 1) + b'\xff', 2)
+    assert keystream[1].tobytes() == cipher.encrypt((0x100).to_bytes(block_size, 'big'))
+
+
+def test_pkcs7_helpers(modes_obj):
+    size = modes_obj.block_size
+    padded = modes_obj.pkcs7_padding(b"abc")
+    assert len(padded) == size and padded[-1] == size - 3
+    unpadded = modes_obj.pkcs7_unpadding(padded)
+    assert unpadded is padded and unpadded == b"abc"  # trimmed in place
+    unpadded = modes_obj.pkcs7_unpadding(b"abc" + bytes([size - 3]) * (size - 3))
+    assert type(unpadded) is bytes and unpadded == b"abc"
+    assert len(modes_obj.pkcs7_padding(bytes(size))) == 2 * size
+    with pytest.raises(ValueError):
+        modes_obj.pkcs7_unpadding(bytes(size))
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC", "CFB", "OFB", "CTR"])
+def test_one_shot_returns_bytearray(modes_obj, mode):
+    ciphertext = modes_obj.encrypt(mode, b"hello world")
+    plaintext = modes_obj.decrypt(mode, bytes(ciphertext))
+    assert type(ciphertext) is bytearray and type(plaintext) is bytearray
+    assert plaintext.decode() == "hello world"
+
+
+def test_unsupported_mode(modes_obj):
+    with pytest.raises(ValueError):
+        modes_obj.encryptor("XTS")
+    with pytest.raises(ValueError):
+        modes_obj.decryptor("GCM")
+
+
+def test_spec_rebuilds_equal_object(modes_obj):
+    factory, args = modes_obj.spec()
+    clone = factory(*args)
+    clone.iv = modes_obj.iv
+    assert clone.encrypt("CBC", b"spec") == modes_obj.encrypt("CBC", b"spec")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import pytest
+from ciphermodes import dedup
+
+
+def feed(cipher, data, rng):
+    """Run data through a streaming cipher in random chunk sizes."""
+    out, pos = bytearray(), 0
+    while pos < len(data):
+        step = rng.randrange(1, 3000)
+        out += cipher.update(data[pos:pos + step])
+        pos += step
+    return out + cipher.finalize()
+
+
+def redundant_data(block_size, num_blocks, distinct, rng):
+    palette = [os.urandom(block_size) for _ in range(distinct)]
+    return b''.join(rng.choice(palette) for _ in range(num_blocks)) + b"tail"
+
+
+@pytest.mark.parametrize("kind", ["redundant", "random"])
+def test_matches_plain_ecb(modes_obj, block_size, kind):
+    rng = random.Random(kind)
+    if kind == "redundant":
+        data = redundant_data(block_size, 3000, 5, rng)
+    else:
+        data = os.urandom(3000 * block_size + 3)
+    expected = bytes(modes_obj.encrypt("ECB", data))
+    encryptor = modes_obj.encryptor("ECB", dedup=True)
+    assert feed(encryptor, data, rng) == expected
+    decryptor = modes_obj.decryptor("ECB", dedup=True)
+    assert feed(decryptor, expected, rng) == data
+
+
+def test_redundant_chunks_use_the_cache(block_size):
+    from toy import toy_modes
+    modes_obj = toy_modes(block_size)
+    data = redundant_data(block_size, 4000, 3, random.Random(1))
+    encryptor = modes_obj.encryptor("ECB", dedup=True)
+    feed(encryptor, data, random.Random(2))
+    assert encryptor.skipped == 0
+    assert encryptor.cache.info()["size"] <= 4
+    assert encryptor.cache.hits > 0
+
+
+def test_random_chunks_skip_deduplication(modes_obj, block_size):
+    encryptor = modes_obj.encryptor("ECB", dedup=True)
+    data = os.urandom(500 * block_size)
+    assert encryptor.update(data) == modes_obj.encrypt("ECB", data)[:len(data)]
+    assert encryptor.skipped == 500
+    assert encryptor.cache.info()["size"] == 0
+
+
+def test_cache_bypassed_without_reuse(block_size):
+    from toy import toy_modes
+    modes_obj = toy_modes(block_size)
+    encryptor = dedup.DedupECBEncryptor(modes_obj.cipher, modes_obj.batch, cache_size=8)
+    rng = random.Random(3)
+    for _ in range(3):
+        # Redundant within each chunk, but no block repeats across chunks
+        chunk = redundant_data(block_size, 200, 20, rng)[:200 * block_size]
+        assert encryptor.update(chunk) == modes_obj.encrypt("ECB", chunk)[:len(chunk)]
+    assert encryptor.cache.hits == 0
+    assert encryptor.cache.misses == 20
+
+
+def test_bad_length_raises(modes_obj, block_size):
+    decryptor = modes_obj.decryptor("ECB", dedup=True)
+    decryptor.update(bytes(3 * block_size + 1))
+    with pytest.raises(ValueError):
+        decryptor.finalize()
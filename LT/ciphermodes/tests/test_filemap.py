@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from ciphermodes import filemap
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("length", [0, 1, 100, 5000])
+def test_round_trip_matches_one_shot(tmp_path, modes_obj, mode, length):
+    data = os.urandom(length)
+    plain, enc, dec = tmp_path / "p", tmp_path / "e", tmp_path / "d"
+    plain.write_bytes(data)
+    size = filemap.crypt_file(modes_obj.encryptor(mode), str(plain), str(enc), chunk_size=96)
+    assert enc.read_bytes() == bytes(modes_obj.encrypt(mode, data))
+    assert size == os.path.getsize(enc)
+    filemap.crypt_file(modes_obj.decryptor(mode), str(enc), str(dec), chunk_size=80)
+    assert dec.read_bytes() == data
+
+
+def test_header_skip_and_bytes_source(tmp_path, modes_obj):
+    data = os.urandom(777)
+    header = b"HDR:"
+    enc, dec = tmp_path / "e", tmp_path / "d"
+    filemap.crypt_file(modes_obj.encryptor("CBC"), data, str(enc), header=header, chunk_size=64)
+    assert enc.read_bytes() == header + bytes(modes_obj.encrypt("CBC", data))
+    filemap.crypt_file(modes_obj.decryptor("CBC"), str(enc), str(dec), skip=len(header), chunk_size=64)
+    assert dec.read_bytes() == data
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC"])
+@pytest.mark.parametrize("damage", ["padding", "length"])
+def test_failure_raises_and_removes_output(tmp_path, modes_obj, block_size, mode, damage):
+    ciphertext = bytearray(modes_obj.encrypt(mode, os.urandom(5 * block_size)))
+    if damage == "padding" and mode == "CBC":
+        # Flips the top bit of the last plaintext byte: pad value > block size
+        ciphertext[-block_size - 1] ^= 0x80
+    elif damage == "padding":
+        ciphertext[-block_size:] = modes_obj.cipher.encrypt_blocks(bytes(block_size))
+    else:
+        ciphertext += bytes(3)
+    enc, out = tmp_path / "e", tmp_path / "d"
+    enc.write_bytes(bytes(ciphertext))
+    with pytest.raises(ValueError):
+        filemap.crypt_file(modes_obj.decryptor(mode), str(enc), str(out), chunk_size=2 * block_size)
+    assert not out.exists()
+
+
+def test_missing_source_keeps_existing_output(tmp_path, modes_obj):
+    out = tmp_path / "d"
+    out.write_bytes(b"keep me")
+    with pytest.raises(FileNotFoundError):
+        filemap.crypt_file(modes_obj.encryptor("CBC"), str(tmp_path / "missing"), str(out))
+    assert out.read_bytes() == b"keep me"
+
+
+@pytest.mark.parametrize("target", ["missing_dir/out", "."])
+def test_unopenable_output_raises_original_error(tmp_path, modes_obj, target):
+    plain = tmp_path / "p"
+    plain.write_bytes(b"data")
+    output = tmp_path / target
+    with pytest.raises(OSError) as info:
+        filemap.crypt_file(modes_obj.encryptor("CBC"), str(plain), str(output))
+    assert info.value.__context__ is None
+    assert os.path.exists(output) == (target == ".")
+
+
+@pytest.mark.parametrize("length", [0, 300])
+def test_crypt_to_memory(tmp_path, modes_obj, length):
+    data = os.urandom(length)
+    enc = tmp_path / "e"
+    enc.write_bytes(b"HDR:" + bytes(modes_obj.encrypt("CBC", data)))
+    assert bytes(filemap.crypt_to_memory(modes_obj.decryptor("CBC"), str(enc), skip=4)) == data
+
+
+def test_crypt_to_memory_reports_padding_error(tmp_path, modes_obj, block_size):
+    ciphertext = bytearray(modes_obj.encrypt("CBC", bytes(3 * block_size)))
+    ciphertext[-block_size - 1] ^= 0x80
+    enc = tmp_path / "e"
+    enc.write_bytes(bytes(ciphertext))
+    with pytest.raises(ValueError, match="padding") as info:
+        filemap.crypt_to_memory(modes_obj.decryptor("CBC"), str(enc))
+    assert info.value.__context__ is None
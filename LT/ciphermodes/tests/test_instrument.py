@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import os
+import pytest
+from ciphermodes import instrument
+
+
+def test_off_by_default_costs_nothing(modes_obj):
+    assert instrument.start() is None
+    before = instrument.stats()
+    modes_obj.encrypt("CTR", b"data")
+    assert instrument.stats() == before
+
+
+def test_collect_records_calls(modes_obj, block_size):
+    data = os.urandom(10 * block_size + 1)
+    with instrument.collect() as recorder:
+        ciphertext = modes_obj.encrypt("CBC", data)
+        modes_obj.decrypt("CBC", ciphertext)
+        modes_obj.decrypt("CBC", ciphertext)
+    assert not instrument.ENABLED
+    stats = recorder.stats()
+    bits = 8 * len(modes_obj.cipher.key)
+    encrypt = stats[("TOY", "CBC", "encrypt", bits)]
+    decrypt = stats[("TOY", "CBC", "decrypt", bits)]
+    assert (encrypt["calls"], encrypt["bytes"], encrypt["blocks"]) == (1, len(data), 11)
+    assert (decrypt["calls"], decrypt["bytes"]) == (2, 2 * len(ciphertext))
+    assert sum(decrypt["histogram"].values()) == 2
+    assert encrypt["bytes_per_second"] > 0
+    # Calls after the block are not recorded
+    modes_obj.encrypt("CBC", data)
+    assert recorder.stats()[("TOY", "CBC", "encrypt", bits)]["calls"] == 1
+
+
+def test_sinks_get_events(modes_obj, capsys):
+    events = []
+    instrument.add_sink(events.append)
+    instrument.add_sink(instrument.print_iv)
+    try:
+        with instrument.collect():
+            modes_obj.encrypt("OFB", b"x")
+            modes_obj.encrypt("ECB", b"x")
+    finally:
+        instrument.remove_sink(events.append)
+        instrument.remove_sink(instrument.print_iv)
+    assert [(e.mode, e.direction, e.iv) for e in events] == [("OFB", "encrypt", modes_obj.iv), ("ECB", "encrypt", None)]
+    assert capsys.readouterr().out.strip() == "The Initial Vector (IV): " + bytes(modes_obj.iv).hex()
+
+
+def test_enable_disable_and_reset(modes_obj):
+    instrument.reset()
+    instrument.enable()
+    try:
+        modes_obj.encrypt("CTR", b"abc")
+    finally:
+        instrument.disable()
+    assert sum(entry["calls"] for entry in instrument.stats().values()) == 1
+    instrument.reset()
+    assert instrument.stats() == {}
+
+
+@pytest.mark.parametrize("seconds, bucket", [(0, 1), (0.5e-6, 1), (1e-6, 2), (3e-6, 4), (1e-3, 1024)])
+def test_latency_buckets(seconds, bucket):
+    assert instrument.latency_bucket(seconds) == bucket
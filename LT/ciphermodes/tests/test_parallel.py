@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import pytest
+from ciphermodes import parallel
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize("length", [0, 1, 1000, 4099])
+def test_ctr_matches_serial(modes_obj, executor, length):
+    data = os.urandom(length)
+    expected = modes_obj.encrypt("CTR", data)
+    # Small shards so that several workers each take a counter range
+    keystream_xor = parallel.ctr_parallel(modes_obj, modes_obj.iv, data, executor=executor, shard_bytes=256)
+    assert modes_obj.iv + keystream_xor == expected
+    assert modes_obj.encrypt_parallel(data, executor=executor) == expected
+    assert modes_obj.decrypt_parallel("CTR", expected, executor=executor) == data
+
+
+def test_ctr_counter_wraps(block_size, executor):
+    from toy import toy_modes
+    modes_obj = toy_modes(block_size, iv=b"\xff" * block_size)
+    data = os.urandom(40 * block_size)
+    shards = parallel.ctr_parallel(modes_obj, modes_obj.iv, data, executor=executor, shard_bytes=8 * block_size)
+    assert modes_obj.iv + shards == modes_obj.encrypt("CTR", data)
+
+
+@pytest.mark.parametrize("mode", ["CBC", "CFB"])
+@pytest.mark.parametrize("length", [0, 5, 1000, 4099])
+def test_chained_decrypt_matches_serial(modes_obj, executor, mode, length):
+    data = os.urandom(length)
+    ciphertext = modes_obj.encrypt(mode, data)
+    out = parallel.chained_decrypt_parallel(modes_obj, mode, ciphertext, executor=executor, shard_bytes=256)
+    assert out == data
+    assert modes_obj.decrypt_parallel(mode, ciphertext, workers=1) == data
+
+
+def test_errors_in_workers_and_arguments(modes_obj, block_size, executor):
+    ciphertext = bytearray(modes_obj.encrypt("CBC", os.urandom(100 * block_size)))
+    ciphertext[-block_size - 1] ^= 0x80  # pad value > block size
+    with pytest.raises(ValueError):
+        parallel.chained_decrypt_parallel(modes_obj, "CBC", ciphertext, executor=executor, shard_bytes=256)
+    with pytest.raises(ValueError):
+        modes_obj.decrypt_parallel("CBC", ciphertext[:-1], executor=executor)
+    with pytest.raises(ValueError):
+        modes_obj.decrypt_parallel("CTR", bytes(block_size - 1))
+    with pytest.raises(ValueError):
+        modes_obj.decrypt_parallel("OFB", ciphertext)
+
+
+def test_failed_output_segment_unlinks_input(modes_obj, monkeypatch):
+    created = []
+
+    def shared_memory(create=False, size=0, name=None):
+        if create and created:
+            raise OSError("no space for the output segment")
+        shm = SharedMemory(create=create, size=size, name=name)
+        created.append(shm.name)
+        return shm
+
+    monkeypatch.setattr(parallel, "SharedMemory", shared_memory)
+    with pytest.raises(OSError, match="output segment"):
+        parallel.ctr_parallel(modes_obj, modes_obj.iv, os.urandom(1000), workers=2, shard_bytes=256)
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=created[0])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import time
+import pytest
+from ciphermodes.prefetch import KeystreamSession
+from toy import toy_modes
+
+
+def session_output(modes_obj, mode, sizes, pause, **kwargs):
+    """Encrypt zero messages of the given sizes in one session; returns the joined output and the stats."""
+    with KeystreamSession(modes_obj, mode, **kwargs) as session:
+        out = bytearray()
+        for n in sizes:
+            out += session.encrypt(bytes(n))
+            if pause:
+                # Give the producer thread time to top the ring up between messages
+                time.sleep(pause)
+        return out, session.stats()
+
+
+@pytest.mark.parametrize("mode", ["CTR", "OFB"])
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_one_shot_keystream_with_misses(block_size, mode, seed):
+    # buffer_size <= refill_bytes, and messages larger than the ring, used to
+    # let the producer overwrite unread keystream after a miss
+    rng = random.Random(seed)
+    modes_obj = toy_modes(block_size, iv=os.urandom(block_size))
+    sizes = [rng.choice([1, 7, 500, 4096, 70000 // block_size, rng.randrange(1, 9000)]) for _ in range(25)]
+    out, stats = session_output(modes_obj, mode, sizes, rng.choice([0, 0.001]),
+                                buffer_size=64 * block_size, refill_bytes=64 * block_size)
+    expected = modes_obj.encrypt(mode, bytes(len(out)))[block_size:block_size + len(out)]
+    assert out == expected
+    assert stats["position"] == sum(sizes)
+    assert stats["buffered"] <= stats["capacity"]
+
+
+def test_hits_after_prefetch(block_size):
+    modes_obj = toy_modes(block_size, iv=os.urandom(block_size))
+    with KeystreamSession(modes_obj, "CTR", buffer_size=1024, refill_bytes=256) as session:
+        deadline = time.time() + 5
+        while session.stats()["buffered"] < 1024 and time.time() < deadline:
+            time.sleep(0.01)
+        first = session.encrypt(b"x" * 100)
+        assert session.stats()["hits"] == 1
+    # A peer session with the same key and IV decrypts the messages in order
+    with KeystreamSession(modes_obj, "CTR") as peer:
+        assert peer.decrypt(first) == bytearray(b"x" * 100)
+
+
+def test_invalid_arguments(block_size):
+    modes_obj = toy_modes(block_size)
+    with pytest.raises(ValueError):
+        KeystreamSession(modes_obj, "CBC")
+    with pytest.raises(ValueError):
+        KeystreamSession(modes_obj, "CTR", refill_bytes=block_size + 1)
+    session = KeystreamSession(modes_obj, "CTR")
+    session.close()
+    with pytest.raises(ValueError):
+        session.encrypt(b"closed")
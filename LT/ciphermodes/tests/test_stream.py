@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import pytest
+
+MODES = ["ECB", "CBC", "CFB", "OFB", "CTR"]
+
+
+def feed(cipher, data, rng, max_step):
+    """Run data through a streaming cipher in random chunk sizes (empty chunks included)."""
+    out, pos = bytearray(), 0
+    while pos < len(data):
+        step = rng.randrange(0, max_step)
+        out += cipher.update(data[pos:pos + step])
+        pos += step
+    return out + cipher.finalize()
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("seed", range(4))
+def test_random_chunks_match_one_shot(modes_obj, block_size, mode, seed):
+    rng = random.Random(seed)
+    data = os.urandom(rng.randrange(0, 40 * block_size))
+    expected = bytes(modes_obj.encrypt(mode, data))
+    max_step = rng.choice([2, block_size + 1, 5 * block_size])
+    assert feed(modes_obj.encryptor(mode), data, rng, max_step) == expected
+    assert feed(modes_obj.decryptor(mode), expected, rng, max_step) == data
+
+
+def test_cfb_half_block_segments(modes_obj, block_size):
+    if block_size != 16:
+        pytest.skip("64-bit segments are the full block here")
+    rng = random.Random(5)
+    data = os.urandom(301)
+    expected = bytes(modes_obj.encrypt("CFB", data, segment_size=64))
+    assert expected != bytes(modes_obj.encrypt("CFB", data))
+    assert feed(modes_obj.encryptor("CFB", segment_size=64), data, rng, 20) == expected
+    assert feed(modes_obj.decryptor("CFB", segment_size=64), expected, rng, 20) == data
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_update_into_and_final_flag(modes_obj, block_size, mode):
+    data = os.urandom(10 * block_size + 3)
+    expected = bytes(modes_obj.encrypt(mode, data))
+    assert modes_obj.encryptor(mode).update(data, final=True) == expected
+    out = bytearray(len(data) + 3 * block_size)
+    encryptor = modes_obj.encryptor(mode)
+    written = encryptor.update_into(data[:7], out)
+    written += encryptor.update_into(data[7:], out, written, final=True)
+    assert out[:written] == expected
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_use_after_finalize(modes_obj, mode):
+    encryptor = modes_obj.encryptor(mode)
+    encryptor.update(b"abc")
+    encryptor.finalize()
+    with pytest.raises(ValueError):
+        encryptor.update(b"more")
+    with pytest.raises(ValueError):
+        encryptor.finalize()
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC", "OFB"])
+def test_bad_length_is_rejected(modes_obj, block_size, mode):
+    ciphertext = bytes(modes_obj.encrypt(mode, os.urandom(3 * block_size)))
+    decryptor = modes_obj.decryptor(mode)
+    decryptor.update(ciphertext[:-1])
+    with pytest.raises(ValueError):
+        decryptor.finalize()
+
+
+@pytest.mark.parametrize("mode", ["CBC", "OFB", "CTR"])
+def test_missing_iv_is_rejected(modes_obj, block_size, mode):
+    decryptor = modes_obj.decryptor(mode)
+    decryptor.update(bytes(block_size - 1))
+    with pytest.raises(ValueError):
+        decryptor.finalize()
+
+
+@pytest.mark.parametrize("mode", ["ECB", "CBC"])
+def test_bad_padding_is_rejected(modes_obj, block_size, mode):
+    # The last plaintext byte (the pad length) is zero
+    ciphertext = bytes(modes_obj.encrypt(mode, os.urandom(2 * block_size - 1) + b"\x00"))
+    with pytest.raises(ValueError):
+        modes_obj.decrypt(mode, ciphertext[:-block_size])
+
+
+def test_invalid_cfb_segment_size(modes_obj):
+    with pytest.raises(ValueError):
+        modes_obj.encryptor("CFB", segment_size=8)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+A toy block cipher for testing the mode layer on its own: every block is
+XORed with the key and rotated left by 5 bits. It is a permutation of the
+blocks, which is all the modes need; it is of course not secure.
+"""
+from ciphermodes.blockmodes import BlockModes, BulkBlockCipher, BulkBatch
+
+
+class ToyCipher(BulkBlockCipher):
+    name = "TOY"
+
+    def __init__(self, key):
+        self.key = bytes(key)
+        self.block_size = len(key)
+        self.bits = 8 * self.block_size
+        self.mask = (1 << self.bits) - 1
+        self.k = int.from_bytes(self.key, 'big')
+
+    def encrypt_block_int(self, x):
+        x ^= self.k
+        return ((x << 5) | (x >> (self.bits - 5))) & self.mask
+
+    def decrypt_block_int(self, x):
+        x = ((x >> 5) | (x << (self.bits - 5))) & self.mask
+        return x ^ self.k
+
+    def crypt(self, crypt_int, data):
+        size = self.block_size
+        if len(data) % size:
+            raise ValueError("Data must be whole blocks.")
+        return b''.join(crypt_int(int.from_bytes(data[i:i + size], 'big')).to_bytes(size, 'big')
+                        for i in range(0, len(data), size))
+
+    def encrypt_blocks(self, data):
+        return self.crypt(self.encrypt_block_int, data)
+
+    def decrypt_blocks(self, data):
+        return self.crypt(self.decrypt_block_int, data)
+
+
+def toy_modes(block_size, batch=True, iv=None):
+    cipher = ToyCipher(bytes(range(1, block_size + 1)))
+    modes_obj = BlockModes(cipher, BulkBatch(cipher) if batch else None)
+    if iv is not None:
+        modes_obj.iv = iv
+    return modes_obj
+